@@ -3,11 +3,29 @@ Analyzer module for scanning Kubernetes YAML files and detecting breaking change
 """
 
 import os
+import sys
 import logging
-import yaml
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
-from packaging.version import Version
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Iterable, Callable, Sequence, Union
+from packaging.version import InvalidVersion, Version
+
+from kupa import yaml_io
+from kupa.config import load_config, get_kubernetes_version
+from kupa.analyzer.concurrency import provider_slot, resolve_max_in_flight
+from kupa.analyzer.prescan import DocumentFilter, Span, prescan_documents, prescan_data, load_span
+from kupa.analyzer.walker import iter_yaml_files
+from kupa.analyzer.rules import get_api_removal_index
+from kupa.analyzer.fields import get_field_rule_index
+from kupa.analyzer.converters import ConversionError, convert
+from kupa.analyzer.runs import RunState, bind_run
+from kupa.analyzer.tiers import (
+    resolve_tier_order, skip_stable_enabled, record_tier_call, record_tier_hit, record_tier_error,
+    pop_tier_errors, format_tier_stats
+)
 
 # Import these later to avoid circular imports
 # from kupa.mcp.model_client import query_model_for_changes
@@ -16,16 +34,53 @@ from packaging.version import Version
 logger = logging.getLogger('kupa.analyzer')
 
 class K8sResource:
-    """Class representing a Kubernetes resource found in a YAML file."""
+    """
+    Class representing a Kubernetes resource found in a YAML file.
+    
+    Large scans hold hundreds of thousands of these, so the class uses
+    ``__slots__``, interns the kind, apiVersion and namespace strings (they
+    repeat across resources), and can drop its parsed content. A resource
+    that knows the byte span of its document in the file parses the
+    document again the next time ``content`` is read.
+    """
+    
+    __slots__ = ('kind', 'api_version', 'name', 'namespace', 'file_path', 'span', '_content')
     
     def __init__(self, kind: str, api_version: str, name: str, namespace: Optional[str], 
-                 file_path: str, content: Dict[str, Any]):
-        self.kind = kind
-        self.api_version = api_version
+                 file_path: str, content: Optional[Dict[str, Any]] = None, 
+                 span: Optional[Span] = None):
+        if content is None and span is None:
+            raise ValueError("A resource needs its content or the span of its document")
+        self.kind = _intern(kind)
+        self.api_version = _intern(api_version)
         self.name = name
-        self.namespace = namespace
+        self.namespace = _intern(namespace)
         self.file_path = file_path
-        self.content = content
+        self.span = span
+        self._content = content
+
+    @property
+    def content(self) -> Dict[str, Any]:
+        """The parsed document, loaded again from the file if it was released."""
+        if self._content is None:
+            self._content = load_span(self.file_path, self.span)
+        return self._content
+
+    @content.setter
+    def content(self, content: Dict[str, Any]) -> None:
+        self._content = content
+
+    def release(self) -> None:
+        """Drop the parsed content if it can be loaded again from the file."""
+        if self.span is not None:
+            self._content = None
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
     def __str__(self):
         if self.namespace:
@@ -36,227 +91,473 @@ class K8sResource:
 class BreakingChange:
     """Class representing a breaking change detected in a Kubernetes resource."""
     
+    __slots__ = ('resource', 'change_type', 'description', 'recommended_action', 'updated_content', 'complete')
+    
     def __init__(self, resource: K8sResource, change_type: str, description: str, 
-                 recommended_action: str, updated_content: Dict[str, Any]):
+                 recommended_action: str, updated_content: Dict[str, Any], complete: bool = True):
         self.resource = resource
         self.change_type = change_type  # e.g., 'API_DEPRECATED', 'FIELD_REMOVED', etc.
         self.description = description
         self.recommended_action = recommended_action
         self.updated_content = updated_content
+        # False if updated_content still needs fixing up beyond what the static rules could do
+        self.complete = complete
+
+
+def _intern(value: Any) -> Any:
+    """Intern a string so equal values share one object; other values are returned as is."""
+    return sys.intern(value) if type(value) is str else value
 
 
 def find_yaml_files(path: str) -> List[str]:
-    """Find all YAML files in a directory recursively or return the path if it's a file."""
-    yaml_files = []
-    
-    # Check if path is a file
-    if os.path.isfile(path):
-        if path.endswith(('.yaml', '.yml')):
-            yaml_files.append(path)
-        return yaml_files
+    """
+    Find all YAML files in a directory recursively or return the path if it's a file.
     
-    # If path is a directory, walk through it
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith(('.yaml', '.yml')):
-                yaml_files.append(os.path.join(root, file))
-    return yaml_files
+    Ignore files, excluded directories and the size and depth limits of
+    iter_yaml_files() apply.
+    """
+    return list(iter_yaml_files(path))
 
 
-def parse_k8s_yaml(file_path: str) -> List[K8sResource]:
-    """Parse a YAML file and extract Kubernetes resources."""
-    resources = []
+def parse_k8s_yaml(file_path: str, document_filter: Optional[DocumentFilter] = None) -> List[K8sResource]:
+    """
+    Parse a YAML file and extract Kubernetes resources.
     
+    Documents are parsed one by one and each resource keeps the byte span of
+    its document, so its content can be released and loaded again later.
+    With a document filter, only the documents the filter wants are parsed.
+    If the pre-scan is ambiguous the whole file is parsed as usual, and the
+    resources keep their content.
+    """
     try:
-        with open(file_path, 'r') as f:
-            # Parse multi-document YAML file
-            docs = list(yaml.safe_load_all(f))
-        
-        for doc in docs:
-            if not doc:
-                continue
-                
-            # Check if this is a Kubernetes resource
-            if not (isinstance(doc, dict) and doc.get('kind') and doc.get('apiVersion')):
-                continue
-                
-            kind = doc.get('kind')
-            api_version = doc.get('apiVersion')
+        docs = prescan_documents(file_path, document_filter)
+        if docs is None:
+            with open(file_path, 'r') as f:
+                # Parse multi-document YAML file
+                docs = [(doc, None) for doc in yaml_io.load_all(f)]
+        return _resources_from_documents(docs, file_path)
             
-            # Extract name and namespace
-            metadata = doc.get('metadata', {})
-            name = metadata.get('name', 'unnamed')
-            namespace = metadata.get('namespace')
-            
-            resource = K8sResource(
-                kind=kind,
-                api_version=api_version,
-                name=name,
-                namespace=namespace,
-                file_path=file_path,
-                content=doc
-            )
-            resources.append(resource)
+    except Exception as e:
+        logger.warning(f"Error parsing YAML file {file_path}: {e}")
+        return []
+
+
+def parse_k8s_yaml_data(data: bytes, file_path: str, 
+                        document_filter: Optional[DocumentFilter] = None) -> List[K8sResource]:
+    """
+    Parse in-memory YAML content and extract Kubernetes resources.
+    
+    The resources keep the byte spans of their documents within ``data``,
+    for splicing updated documents into it, but there is no file to load
+    them again from: they must not be released.
+    
+    Args:
+        data: The content of a YAML file
+        file_path: The name reported for the resources
+        document_filter: Decides which documents need to be parsed
+        
+    Returns:
+        The Kubernetes resources, in document order
+    """
+    try:
+        docs = prescan_data(data, document_filter)
+        if docs is None:
+            docs = [(doc, None) for doc in yaml_io.load_all(data)]
+        return _resources_from_documents(docs, file_path)
             
     except Exception as e:
         logger.warning(f"Error parsing YAML file {file_path}: {e}")
+        return []
+
+
+def _resources_from_documents(docs: Iterable[Tuple[Any, Optional[Span]]], file_path: str) -> List[K8sResource]:
+    """Build resources from parsed (document, span) pairs, skipping documents that aren't Kubernetes resources."""
+    resources = []
+    for doc, span in docs:
+        if not doc:
+            continue
+            
+        # Check if this is a Kubernetes resource
+        if not (isinstance(doc, dict) and doc.get('kind') and doc.get('apiVersion')):
+            continue
+            
+        kind = doc.get('kind')
+        api_version = doc.get('apiVersion')
         
+        # Extract name and namespace
+        metadata = doc.get('metadata', {})
+        name = metadata.get('name', 'unnamed')
+        namespace = metadata.get('namespace')
+        
+        resource = K8sResource(
+            kind=kind,
+            api_version=api_version,
+            name=name,
+            namespace=namespace,
+            file_path=file_path,
+            content=doc,
+            span=span
+        )
+        resources.append(resource)
     return resources
 
 
-# Add a static fallback for deprecated/removed API versions
+def resolve_worker_count(workers: Optional[int] = None) -> int:
+    """
+    Resolve the number of parser processes to use.
+    
+    Args:
+        workers: Requested number of workers. If None, the value from the
+            ``analysis.workers`` configuration setting is used. A value of 0
+            means one worker per CPU core.
+        
+    Returns:
+        The number of worker processes (always at least 1)
+    """
+    if workers is None:
+        config = load_config()
+        workers = config.get("analysis", {}).get("workers", 1)
+    
+    if workers == 0:
+        workers = os.cpu_count() or 1
+        
+    return max(1, int(workers))
+
+
+def parse_yaml_files(yaml_files: List[str], workers: int = 1, 
+                     chunk_size: Optional[int] = None,
+                     document_filter: Optional[DocumentFilter] = None) -> List[K8sResource]:
+    """
+    Parse a list of YAML files into Kubernetes resources.
+    
+    A list-returning wrapper around iter_parsed_files(). Resources are
+    returned in file order, then document order within a file.
+    
+    Args:
+        yaml_files: Paths of the YAML files to parse
+        workers: Number of worker processes to use
+        chunk_size: Largest number of files handed to a worker at a time. If
+            None, the value from the ``analysis.parse_chunk_size`` setting is used.
+        document_filter: If given, files are pre-scanned and only the
+            documents the filter wants are parsed
+        
+    Returns:
+        List of Kubernetes resources found in the files
+    """
+    return [
+        resource
+        for _, resources in iter_parsed_files(yaml_files, workers, chunk_size, document_filter)
+        for resource in resources
+    ]
+
+
+def _parse_files(yaml_files: List[str], 
+                 document_filter: Optional[DocumentFilter] = None) -> List[List[K8sResource]]:
+    """Parse a chunk of YAML files in a worker process, keeping the resources of each file apart."""
+    return [parse_k8s_yaml(yaml_file, document_filter) for yaml_file in yaml_files]
+
+
+def iter_parsed_files(yaml_files: Iterable[str], workers: int = 1, 
+                      chunk_size: Optional[int] = None,
+                      document_filter: Optional[DocumentFilter] = None,
+                      skip: Optional[Callable[[str], bool]] = None
+                      ) -> Iterator[Tuple[str, Optional[List[K8sResource]]]]:
+    """
+    Parse YAML files lazily, yielding each file's resources in file order.
+    
+    ``yaml_files`` may itself be lazy (e.g. iter_yaml_files()), so parsing
+    starts before the walk finishes. With more than one worker, chunks of
+    files are parsed ahead on a process pool, but only a few chunks per
+    worker are in flight at a time, so memory stays bounded however many
+    files there are. Chunks start at one file and double up to
+    ``chunk_size``, so the first results arrive quickly.
+    
+    Args:
+        yaml_files: Paths of the YAML files to parse
+        workers: Number of worker processes to use
+        chunk_size: Largest number of files handed to a worker at a time. If
+            None, the value from the ``analysis.parse_chunk_size`` setting is used.
+        document_filter: If given, files are pre-scanned and only the
+            documents the filter wants are parsed
+        skip: Predicate for files that shouldn't be parsed; they are yielded
+            with None instead of their resources
+        
+    Yields:
+        (file path, resources found in the file or None) tuples
+    """
+    files = iter(yaml_files)
+    if skip is None:
+        skip = lambda yaml_file: False
+    
+    if workers <= 1:
+        for yaml_file in files:
+            yield yaml_file, None if skip(yaml_file) else parse_k8s_yaml(yaml_file, document_filter)
+        return
+    
+    if chunk_size is None:
+        config = load_config()
+        chunk_size = config.get("analysis", {}).get("parse_chunk_size", 64)
+    chunk_size = max(1, chunk_size)
+    next_size = 1
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        
+        def submit_next() -> bool:
+            nonlocal next_size
+            chunk = list(islice(files, next_size))
+            if not chunk:
+                return False
+            next_size = min(chunk_size, next_size * 2)
+            to_parse = [yaml_file for yaml_file in chunk if not skip(yaml_file)]
+            future = executor.submit(_parse_files, to_parse, document_filter) if to_parse else None
+            pending.append((chunk, to_parse, future))
+            return True
+        
+        while len(pending) < workers * 2 and submit_next():
+            pass
+        
+        while pending:
+            chunk, to_parse, future = pending.popleft()
+            submit_next()
+            parsed = dict(zip(to_parse, future.result())) if future is not None else {}
+            for yaml_file in chunk:
+                yield yaml_file, parsed.get(yaml_file)
+
+
+# Removed API versions, as loaded by the rule engine in kupa.analyzer.rules:
+# (kind, apiVersion) -> removal release, replacement and description
 DEPRECATED_API_VERSIONS = {
-    # Deployments
-    ("Deployment", "apps/v1beta1"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "apps/v1beta1 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    ("Deployment", "apps/v1beta2"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "apps/v1beta2 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    ("Deployment", "extensions/v1beta1"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "extensions/v1beta1 for Deployments was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    
-    # StatefulSets
-    ("StatefulSet", "apps/v1beta1"): {
-        "removed_in": "v1.16.0", 
-        "replacement": "apps/v1",
-        "description": "apps/v1beta1 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    ("StatefulSet", "apps/v1beta2"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "apps/v1beta2 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    
-    # DaemonSets
-    ("DaemonSet", "apps/v1beta2"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "apps/v1beta2 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    ("DaemonSet", "extensions/v1beta1"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "extensions/v1beta1 for DaemonSets was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    
-    # ReplicaSets
-    ("ReplicaSet", "apps/v1beta2"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "apps/v1beta2 was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    ("ReplicaSet", "extensions/v1beta1"): {
-        "removed_in": "v1.16.0",
-        "replacement": "apps/v1",
-        "description": "extensions/v1beta1 for ReplicaSets was removed in Kubernetes v1.16. Use apps/v1 instead."
-    },
-    
-    # Ingress
-    ("Ingress", "extensions/v1beta1"): {
-        "removed_in": "v1.22.0",
-        "replacement": "networking.k8s.io/v1",
-        "description": "extensions/v1beta1 was removed in Kubernetes v1.22. Use networking.k8s.io/v1 instead."
-    },
-    ("Ingress", "networking.k8s.io/v1beta1"): {
-        "removed_in": "v1.22.0",
-        "replacement": "networking.k8s.io/v1",
-        "description": "networking.k8s.io/v1beta1 was removed in Kubernetes v1.22. Use networking.k8s.io/v1 instead."
-    },
-    
-    # NetworkPolicies
-    ("NetworkPolicy", "extensions/v1beta1"): {
-        "removed_in": "v1.16.0",
-        "replacement": "networking.k8s.io/v1",
-        "description": "extensions/v1beta1 for NetworkPolicies was removed in Kubernetes v1.16. Use networking.k8s.io/v1 instead."
-    },
-    
-    # PodSecurityPolicies
-    ("PodSecurityPolicy", "extensions/v1beta1"): {
-        "removed_in": "v1.21.0",
-        "replacement": "policy/v1beta1",
-        "description": "extensions/v1beta1 for PodSecurityPolicies was removed in Kubernetes v1.21. Use policy/v1beta1 instead."
-    },
-    ("PodSecurityPolicy", "policy/v1beta1"): {
-        "removed_in": "v1.25.0", 
-        "replacement": "None - PSPs are removed entirely",
-        "description": "PodSecurityPolicy was entirely removed in Kubernetes v1.25. Use Pod Security Standards and Admission instead."
-    },
-    
-    # CRDs
-    ("CustomResourceDefinition", "apiextensions.k8s.io/v1beta1"): {
-        "removed_in": "v1.22.0",
-        "replacement": "apiextensions.k8s.io/v1",
-        "description": "apiextensions.k8s.io/v1beta1 was removed in Kubernetes v1.22. Use apiextensions.k8s.io/v1 instead."
+    rule.key: {
+        "removed_in": rule.removed_in_label,
+        "replacement": rule.replacement,
+        "description": rule.description
     }
+    for rule in get_api_removal_index().rules
+}
+
+# API versions that are generally available and have no removal scheduled,
+# with the Kubernetes version they became available in
+STABLE_API_VERSIONS = {
+    ("Pod", "v1"): "v1.0.0",
+    ("Service", "v1"): "v1.0.0",
+    ("ConfigMap", "v1"): "v1.2.0",
+    ("Secret", "v1"): "v1.0.0",
+    ("Namespace", "v1"): "v1.0.0",
+    ("ServiceAccount", "v1"): "v1.0.0",
+    ("PersistentVolume", "v1"): "v1.0.0",
+    ("PersistentVolumeClaim", "v1"): "v1.0.0",
+    ("Endpoints", "v1"): "v1.0.0",
+    ("LimitRange", "v1"): "v1.0.0",
+    ("ResourceQuota", "v1"): "v1.0.0",
+    ("ReplicationController", "v1"): "v1.0.0",
+    ("Deployment", "apps/v1"): "v1.9.0",
+    ("StatefulSet", "apps/v1"): "v1.9.0",
+    ("DaemonSet", "apps/v1"): "v1.9.0",
+    ("ReplicaSet", "apps/v1"): "v1.9.0",
+    ("Job", "batch/v1"): "v1.2.0",
+    ("CronJob", "batch/v1"): "v1.21.0",
+    ("Ingress", "networking.k8s.io/v1"): "v1.19.0",
+    ("IngressClass", "networking.k8s.io/v1"): "v1.19.0",
+    ("NetworkPolicy", "networking.k8s.io/v1"): "v1.7.0",
+    ("Role", "rbac.authorization.k8s.io/v1"): "v1.8.0",
+    ("RoleBinding", "rbac.authorization.k8s.io/v1"): "v1.8.0",
+    ("ClusterRole", "rbac.authorization.k8s.io/v1"): "v1.8.0",
+    ("ClusterRoleBinding", "rbac.authorization.k8s.io/v1"): "v1.8.0",
+    ("StorageClass", "storage.k8s.io/v1"): "v1.6.0",
+    ("PodDisruptionBudget", "policy/v1"): "v1.21.0",
+    ("HorizontalPodAutoscaler", "autoscaling/v2"): "v1.23.0",
+    ("CustomResourceDefinition", "apiextensions.k8s.io/v1"): "v1.16.0",
+    ("ValidatingWebhookConfiguration", "admissionregistration.k8s.io/v1"): "v1.16.0",
+    ("MutatingWebhookConfiguration", "admissionregistration.k8s.io/v1"): "v1.16.0",
+    ("PriorityClass", "scheduling.k8s.io/v1"): "v1.14.0"
 }
 
-def check_for_breaking_changes(resource: K8sResource, target_k8s_version: str) -> Optional[BreakingChange]:
+
+@lru_cache(maxsize=None)
+def parse_k8s_version(version: str) -> Version:
     """
-    Check if a Kubernetes resource has breaking changes in the target version.
+    Parse a Kubernetes version such as ``v1.25`` or ``1.25.3``.
     
-    This function checks for breaking changes using AI models if available,
-    with fallback to external K8s documentation. If no API key is available,
-    it directly uses the external documentation.
+    Parsed versions are cached, since the same few versions are compared
+    for every resource.
     """
-    # Import here to avoid circular imports
-    import os
-    from kupa.mcp.model_client import query_model_for_changes
-    from kupa.mcp.external_fetcher import fetch_from_k8s_docs
+    return Version(version.lstrip('v'))
+
+
+# STABLE_API_VERSIONS with the versions parsed once, for the per-resource comparisons
+_STABLE_SINCE = {key: parse_k8s_version(since) for key, since in STABLE_API_VERSIONS.items()}
+
+
+def is_known_stable(resource: K8sResource, target_k8s_version: str) -> bool:
+    """
+    Check whether a resource's (kind, apiVersion) is known to be stable in the target version.
     
-    # Check if we have an OpenAI API key (required for model queries)
+    Args:
+        resource: The Kubernetes resource
+        target_k8s_version: The target Kubernetes version
+        
+    Returns:
+        True if the API version is generally available in the target version
+    """
+    available_since = _STABLE_SINCE.get((resource.kind, resource.api_version))
+    if available_since is None:
+        return False
+    try:
+        return parse_k8s_version(target_k8s_version) >= available_since
+    except InvalidVersion:
+        return False
+
+
+def build_document_filter(target_k8s_version: str, tiers: Optional[List[str]] = None) -> DocumentFilter:
+    """
+    Build the pre-scan filter for documents that some enabled tier could flag.
+    
+    When only the static tier is enabled, only (kind, apiVersion) pairs the
+    static rules remove by the target version, and kinds with field rules
+    for it, are wanted. Otherwise every document is wanted except known-stable
+    ones that skip the network tiers and that no field rule applies to.
+    
+    Args:
+        target_k8s_version: The target Kubernetes version
+        tiers: Tier names in resolution order. If None, the
+            ``analysis.resolution_order`` configuration setting is used.
+        
+    Returns:
+        The document filter
+    """
+    tier_order = resolve_tier_order(tiers)
     api_key_available = os.environ.get('OPENAI_API_KEY') not in [None, '', 'your-api-key']
+    use_ollama = os.environ.get("MODEL_PROVIDER") == "ollama"
+    network_tiers = ("docs" in tier_order or 
+                     ("openai" in tier_order and api_key_available) or 
+                     ("ollama" in tier_order and use_ollama))
+    target = parse_k8s_version(target_k8s_version)
+    
+    if not network_tiers:
+        include, include_kinds = frozenset(), frozenset()
+        if "static" in tier_order:
+            field_pairs, include_kinds = get_field_rule_index().document_keys(target_k8s_version)
+            include = frozenset(get_api_removal_index().for_target(target_k8s_version)) | field_pairs
+        return DocumentFilter(include=include, include_kinds=include_kinds)
     
-    if os.environ.get("MODEL_PROVIDER") == "ollama":
-        logger.info("Using Ollama model provider.")
+    exclude = frozenset()
+    if skip_stable_enabled():
+        field_pairs, field_kinds = frozenset(), frozenset()
+        if "static" in tier_order:
+            # Stable APIs skip the network tiers, but the field rules still apply to them
+            field_pairs, field_kinds = get_field_rule_index().document_keys(target_k8s_version)
+        exclude = frozenset(
+            key for key, available_since in _STABLE_SINCE.items()
+            if target >= available_since and key not in field_pairs and key[0] not in field_kinds
+        )
+    return DocumentFilter(exclude=exclude)
 
-        try:
-            model_result = query_model_for_changes(resource, target_k8s_version)
-            if model_result.get('is_confident', False) and model_result.get('has_breaking_change', False):
-                logger.info(f"Ollama model found breaking change for {resource}")
-                return BreakingChange(
-                    resource=resource,
-                    change_type=model_result.get('change_type'),
-                    description=model_result.get('description'),
-                    recommended_action=model_result.get('recommended_action'),
-                    updated_content=model_result.get('updated_content')
-                )
-        except Exception as e:
-            logger.warning(f"Error querying Ollama model: {e}. Falling back to external sources.")
 
-    # If API key is available, first try with the AI model
-    if api_key_available:
-        logger.info(f"API key available. Querying AI model for {resource}")
+def check_static(resource: K8sResource, target_k8s_version: str) -> Optional[BreakingChange]:
+    """
+    Check a resource against the static rules for removed API versions and fields.
+    
+    Removed and deprecated fields are reported with their exact paths. When
+    both the API version and some fields are affected, a single breaking
+    change describes all of them. Known migrations are converted to a
+    complete manifest by kupa.analyzer.converters; otherwise only the
+    apiVersion is swapped, and the change is marked incomplete if removed
+    fields are left in place.
+    
+    Args:
+        resource: The Kubernetes resource to check
+        target_k8s_version: The target Kubernetes version
+        
+    Returns:
+        The breaking change, or None if no rule applies to the resource
+    """
+    rule = get_api_removal_index().lookup(resource.kind, resource.api_version, target_k8s_version)
+    findings = get_field_rule_index().match(resource.content, resource.kind, resource.api_version, 
+                                            target_k8s_version)
+    if rule is None and not findings:
+        return None
+    
+    descriptions, actions = [], []
+    if rule is not None:
+        logger.info(f"Static rule matched for {resource}: removed in {rule.removed_in_label}")
+        change_type = "API_REMOVED"
+        descriptions.append(rule.description)
+        actions.append(rule.recommended_action)
+    elif any(finding.change_type == "FIELD_REMOVED" for finding in findings):
+        change_type = "FIELD_REMOVED"
+    else:
+        change_type = "FIELD_DEPRECATED"
+    
+    for finding in findings:
+        logger.info(f"Field rule {finding.rule.id} matched {finding.path} in {resource}")
+        descriptions.append(f"{finding.description}.")
+        if finding.rule.replacement:
+            actions.append(f"Replace {finding.path} with {finding.rule.replacement}")
+    
+    # A converter rewrites the whole manifest; without one, only the apiVersion can be swapped
+    converted = None
+    complete = not any(finding.change_type == "FIELD_REMOVED" for finding in findings)
+    if rule is not None and rule.replacement:
         try:
-            model_result = query_model_for_changes(resource, target_k8s_version)
-            
-            # If model is confident about a breaking change, use its results
-            if model_result.get('is_confident', False) and model_result.get('has_breaking_change', False):
-                logger.info(f"AI model found breaking change for {resource}")
-                return BreakingChange(
-                    resource=resource,
-                    change_type=model_result.get('change_type'),
-                    description=model_result.get('description'),
-                    recommended_action=model_result.get('recommended_action'),
-                    updated_content=model_result.get('updated_content')
-                )
-        except Exception as e:
-            logger.warning(f"Error querying AI model: {e}. Falling back to external sources.")
-            # Continue to external sources if model query fails
+            converted = convert(resource.content, rule.replacement)
+        except ConversionError as e:
+            logger.info(f"Could not convert {resource} to {rule.replacement}: {e}")
+            complete = False
+    
+    if converted is not None:
+        updated_content = converted
+        # The converter only migrates the API; fields it doesn't touch may still be removed
+        complete = not any(
+            finding.change_type == "FIELD_REMOVED"
+            for finding in get_field_rule_index().match(converted, resource.kind, converted["apiVersion"],
+                                                        target_k8s_version)
+        )
+    else:
+        updated_content = resource.content.copy()
+        if rule is not None and rule.replacement:
+            updated_content["apiVersion"] = rule.replacement
+    return BreakingChange(
+        resource=resource,
+        change_type=change_type,
+        description=" ".join(descriptions),
+        recommended_action="; ".join(actions) or "Remove the deprecated fields",
+        updated_content=updated_content,
+        complete=complete
+    )
+
+
+def _check_model(resource: K8sResource, target_k8s_version: str, provider: str) -> Optional[BreakingChange]:
+    """Ask the model for a verdict, returning a breaking change only if it is confident."""
+    from kupa.mcp.model_client import query_model_for_changes
     
-    # Always check external K8s documentation
-    logger.info(f"Checking external K8s documentation for {resource}")
-    external_result = fetch_from_k8s_docs(resource, target_k8s_version)
+    with provider_slot(provider):
+        model_result = query_model_for_changes(resource, target_k8s_version)
+    if model_result.get('error'):
+        raise RuntimeError(model_result['error'])
+    if model_result.get('is_confident', False) and model_result.get('has_breaking_change', False):
+        return BreakingChange(
+            resource=resource,
+            change_type=model_result.get('change_type'),
+            description=model_result.get('description'),
+            recommended_action=model_result.get('recommended_action'),
+            updated_content=model_result.get('updated_content')
+        )
+    return None
+
+
+def _check_docs(resource: K8sResource, target_k8s_version: str) -> Optional[BreakingChange]:
+    """Look the resource up in the external Kubernetes documentation."""
+    from kupa.mcp.external_fetcher import fetch_from_k8s_docs
     
+    with provider_slot("docs"):
+        external_result = fetch_from_k8s_docs(resource, target_k8s_version)
+    if external_result.get('error'):
+        if not external_result.get('found_breaking_change'):
+            raise RuntimeError(external_result['error'])
+        # A finding from the sources that could be fetched still stands
+        record_tier_error("docs", resource)
     if external_result.get('found_breaking_change'):
-        logger.info(f"External sources found breaking change for {resource}")
         return BreakingChange(
             resource=resource,
             change_type=external_result.get('change_type'),
@@ -264,56 +565,534 @@ def check_for_breaking_changes(resource: K8sResource, target_k8s_version: str) -
             recommended_action=external_result.get('recommended_action'),
             updated_content=external_result.get('updated_content')
         )
+    return None
+
+
+def _resolved_without_network(resource: K8sResource, target_k8s_version: str, 
+                              tier_order: List[str]) -> bool:
+    """Check whether a resource will be settled before any model tier is consulted."""
+    if skip_stable_enabled() and is_known_stable(resource, target_k8s_version):
+        return True
+    for tier in tier_order:
+        if tier == "static":
+            static_change = check_static(resource, target_k8s_version)
+            if static_change is not None and static_change.complete:
+                return True
+        elif tier in ("ollama", "openai"):
+            return False
+    return False
+
+
+def check_for_breaking_changes(resource: K8sResource, target_k8s_version: str, 
+                               tiers: Optional[List[str]] = None) -> Optional[BreakingChange]:
+    """
+    Check if a Kubernetes resource has breaking changes in the target version.
+    
+    The resolution tiers (static table, Ollama, OpenAI, external K8s
+    documentation) are consulted in the configured order, and the first one
+    that finds a breaking change wins. The model tiers are only used when
+    the corresponding provider is available. Resources whose API version is
+    known to be stable in the target version skip the model and docs tiers
+    unless ``analysis.skip_stable`` is turned off. A static finding whose
+    manifest the converters couldn't complete is passed on to the model
+    tiers, if any follow, for the rewrite.
+    
+    Args:
+        resource: The Kubernetes resource to check
+        target_k8s_version: Target Kubernetes version to check against
+        tiers: Tier names in the order to try them. If None, the
+            ``analysis.resolution_order`` configuration setting is used.
+        
+    Returns:
+        The breaking change, or None if no tier found one
+    """
+    return _check_tiers(resource, target_k8s_version, tiers, _UNCHECKED)
+
+
+# Marks a static result that _check_tiers() has to compute itself
+_UNCHECKED = object()
+
+
+def _check_tiers(resource: K8sResource, target_k8s_version: str, tiers: Optional[List[str]],
+                 static_result: Any) -> Optional[BreakingChange]:
+    """
+    Run check_for_breaking_changes(), with the check_static() result if the caller already has it.
+    
+    Args:
+        resource: The Kubernetes resource to check
+        target_k8s_version: Target Kubernetes version to check against
+        tiers: Tier names in the order to try them, or None for the configured order
+        static_result: The check_static() result for the resource and
+            version, or _UNCHECKED to run it when the static tier's turn comes
+        
+    Returns:
+        The breaking change, or None if no tier found one
+    """
+    # Check if we have an OpenAI API key (required for model queries)
+    api_key_available = os.environ.get('OPENAI_API_KEY') not in [None, '', 'your-api-key']
+    use_ollama = os.environ.get("MODEL_PROVIDER") == "ollama"
+    skip_network = skip_stable_enabled() and is_known_stable(resource, target_k8s_version)
+    # A static finding the converters couldn't complete, waiting for a model to fix it up
+    static_change = None
+    
+    for tier in resolve_tier_order(tiers):
+        if tier != "static" and skip_network:
+            continue
+        if static_change is not None and tier not in ("ollama", "openai"):
+            continue
+        
+        try:
+            if tier == "static":
+                record_tier_call(tier)
+                breaking_change = check_static(resource, target_k8s_version) \
+                    if static_result is _UNCHECKED else static_result
+            elif tier == "ollama":
+                if not use_ollama:
+                    continue
+                logger.info("Using Ollama model provider.")
+                record_tier_call(tier)
+                breaking_change = _check_model(resource, target_k8s_version, "ollama")
+            elif tier == "openai":
+                if not api_key_available:
+                    continue
+                logger.info(f"API key available. Querying AI model for {resource}")
+                record_tier_call(tier)
+                # query_model_for_changes talks to Ollama whenever MODEL_PROVIDER says so
+                breaking_change = _check_model(resource, target_k8s_version, 
+                                               "ollama" if use_ollama else "openai")
+            else:
+                logger.info(f"Checking external K8s documentation for {resource}")
+                record_tier_call(tier)
+                breaking_change = _check_docs(resource, target_k8s_version)
+        except Exception as e:
+            logger.warning(f"Error querying the {tier} tier: {e}. Falling back to the next tier.")
+            record_tier_error(tier, resource)
+            continue
+        
+        if breaking_change is not None:
+            if tier == "static" and not breaking_change.complete:
+                static_change = breaking_change
+                continue
+            if static_change is not None:
+                # Keep the deterministic finding, with the model's rewrite of the manifest
+                breaking_change = BreakingChange(
+                    resource=resource,
+                    change_type=static_change.change_type,
+                    description=static_change.description,
+                    recommended_action=static_change.recommended_action,
+                    updated_content=breaking_change.updated_content
+                )
+            logger.info(f"The {tier} tier found breaking change for {resource}")
+            record_tier_hit(tier)
+            return breaking_change
     
-    # Static fallback: check for known deprecated/removed API versions
-    key = (resource.kind, resource.api_version)
-    if key in DEPRECATED_API_VERSIONS:
-        logger.info(f"Checking static fallback for {key}")  
-        info = DEPRECATED_API_VERSIONS[key]
-        if Version(target_k8s_version.lstrip('v')) >= Version(info["removed_in"].lstrip('v')):
-            updated_content = resource.content.copy()
-            updated_content["apiVersion"] = info["replacement"]
-            return BreakingChange(
-                resource=resource,
-                change_type="API_REMOVED",
-                description=info["description"],
-                recommended_action=f"Update apiVersion to {info['replacement']}",
-                updated_content=updated_content
-            )
+    if static_change is not None:
+        logger.info(f"The static tier found breaking change for {resource}")
+        record_tier_hit("static")
+        return static_change
     
     # No breaking change found
+    record_tier_hit("stable" if skip_network else "none")
     return None
 
 
-def analyze_directory(directory_path: str, target_k8s_version: str) -> List[BreakingChange]:
+def _model_prefetch_enabled() -> bool:
     """
-    Analyze a directory for Kubernetes resources and check for breaking changes.
+    Check whether model verdicts should be fetched before the per-resource checks.
+    
+    That is the case when a model is available and either batching
+    (``ai_model.batch.enabled``) or the asyncio client
+    (``ai_model.async_client.enabled``) is turned on.
+    """
+    config = load_config()
+    ai_config = config.get("ai_model", {})
+    if not (ai_config.get("batch", {}).get("enabled", False) or 
+            ai_config.get("async_client", {}).get("enabled", False)):
+        return False
+        
+    api_key_available = os.environ.get('OPENAI_API_KEY') not in [None, '', 'your-api-key']
+    return os.environ.get("MODEL_PROVIDER") == "ollama" or api_key_available
+
+
+def check_resources(resources: List[K8sResource], target_k8s_version: str, 
+                    max_in_flight: int = 1) -> List[Optional[BreakingChange]]:
+    """
+    Check a list of resources for breaking changes, several at a time.
+    
+    Each resource goes through check_for_breaking_changes() unchanged, so
+    the tiered fallback logic is the same as for a single check. At most
+    ``max_in_flight`` checks run at once; calls to each provider are further
+    limited by the ``concurrency.providers`` settings.
     
     Args:
-        directory_path: Path to the directory containing Kubernetes YAML files
+        resources: The Kubernetes resources to check
+        target_k8s_version: Target Kubernetes version to check against
+        max_in_flight: Maximum number of checks running at the same time
+        
+    Returns:
+        A list with the breaking change (or None) for each resource, in the
+        same order as ``resources``
+    """
+    if max_in_flight <= 1 or len(resources) < 2:
+        return [check_for_breaking_changes(resource, target_k8s_version) for resource in resources]
+    
+    def check(resource):
+        return check_for_breaking_changes(resource, target_k8s_version)
+    
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="kupa-check") as executor:
+        return list(executor.map(bind_run(check), resources))
+
+
+def _check_window(window: List[Tuple[str, List[K8sResource], Optional[list]]], target_k8s_version: str,
+                  max_in_flight: int, tier_order: List[str], 
+                  deduplicator=None) -> List[Tuple[str, list]]:
+    """
+    Check the resources of a window of files.
+    
+    Args:
+        window: (file path, parsed resources, cached results or None) tuples
         target_k8s_version: Target Kubernetes version to check against
+        max_in_flight: Maximum number of resources checked at the same time
+        tier_order: The resolution tier order, used to skip model prefetching
+            for resources settled statically
+        deduplicator: If given, a ResourceDeduplicator: only one resource per
+            distinct body is checked, across windows, and the verdict is
+            fanned out to the others
         
     Returns:
-        List of breaking changes detected
+        (file path, [(resource, breaking change or None), ...], whether a tier
+        failed for any of its resources) tuples in window order
     """
+    resources = [resource for _, parsed, cached in window if cached is None for resource in parsed]
+    to_check = resources
+    if deduplicator is not None:
+        fingerprints, check_indices = deduplicator.partition(resources)
+        to_check = [resources[i] for i in check_indices]
+    
+    # Fetch model verdicts up front when batching or the asyncio client is enabled,
+    # leaving out resources the static tier settles without the model
+    prefetching = bool(to_check) and _model_prefetch_enabled()
+    if prefetching:
+        from kupa.mcp.model_client import prefetch_model_responses
+        model_resources = [
+            resource for resource in to_check
+            if not _resolved_without_network(resource, target_k8s_version, tier_order)
+        ]
+        prefetch_model_responses(model_resources, target_k8s_version, max_in_flight=max_in_flight)
+    
+    try:
+        checked = check_resources(to_check, target_k8s_version, max_in_flight=max_in_flight)
+    finally:
+        if prefetching:
+            from kupa.mcp.model_client import clear_prefetched
+            clear_prefetched()
+    failed = pop_tier_errors(to_check)
+    
+    if deduplicator is not None:
+        for i, breaking_change, check_failed in zip(check_indices, checked, failed):
+            deduplicator.record(fingerprints[i], breaking_change, failed=check_failed)
+        checked = [deduplicator.fan_out(resource, fingerprint)
+                   for resource, fingerprint in zip(resources, fingerprints)]
+        failed = [deduplicator.failed(fingerprint) for fingerprint in fingerprints]
+    results = iter(zip(checked, failed))
+    
+    file_results = []
+    for yaml_file, parsed, cached in window:
+        if cached is not None:
+            file_results.append((yaml_file, cached, False))
+            continue
+        verdicts = [next(results) for _ in parsed]
+        file_results.append((
+            yaml_file,
+            [(resource, breaking_change) for resource, (breaking_change, _) in zip(parsed, verdicts)],
+            any(check_failed for _, check_failed in verdicts)
+        ))
+    return file_results
+
+
+def _log_run_stats() -> None:
+    """Log the tier, response cache and prompt slimming counters of a run."""
+    from kupa.mcp.response_cache import get_response_cache
+    from kupa.mcp.slimming import get_slimming_stats
+    
+    # Report which tiers resolved the resources (hits/calls)
+    tier_summary = format_tier_stats()
+    if tier_summary:
+        logger.info(f"Resolution tiers (hits/calls): {tier_summary}")
+    
+    # Report how many model queries were answered from the response cache
+    response_cache = get_response_cache()
+    if response_cache is not None and (response_cache.hits or response_cache.misses):
+        logger.info(f"Model response cache: {response_cache.hits} hits, {response_cache.misses} misses")
+    
+    # Report how much prompt slimming saved
+    slimming_stats = get_slimming_stats()
+    if slimming_stats["resources"]:
+        logger.info(f"Prompt slimming saved ~{slimming_stats['tokens_saved']} of "
+                    f"{slimming_stats['original_tokens']} resource tokens "
+                    f"across {slimming_stats['resources']} model prompts")
+
+
+def iter_breaking_changes(directory_path: str, target_k8s_version: str, 
+                          workers: Optional[int] = None, 
+                          max_in_flight: Optional[int] = None,
+                          incremental: Optional[bool] = None,
+                          dedup: Optional[bool] = None) -> Iterator[BreakingChange]:
+    """
+    Analyze a directory for breaking changes, yielding them as they are found.
+    
+    Files are parsed lazily and checked in windows of whole files. The first
+    window is small so the first findings arrive quickly; later windows grow
+    up to ``analysis.stream_window`` resources. Resources without a breaking
+    change are released once their window is done, so memory stays bounded
+    on large repositories. Findings are yielded in file order, then document
+    order, the same order as analyze_directory().
+    
+    Args:
+        directory_path: Path to the directory containing Kubernetes YAML files
+        target_k8s_version: Target Kubernetes version to check against, or an
+            alias such as ``latest``
+        workers: Number of processes used to parse YAML files. If None, the
+            ``analysis.workers`` configuration setting is used.
+        max_in_flight: Maximum number of resources checked at the same time.
+            If None, the ``concurrency.max_in_flight`` setting is used.
+        incremental: Whether to reuse the results of unchanged files from the
+            analysis cache. If None, the ``analysis.incremental.enabled``
+            setting is used.
+        dedup: Whether to check resources that only differ in their name,
+            namespace or labels once. If None, the ``analysis.dedup.enabled``
+            setting is used.
+        
+    Yields:
+        The breaking changes detected
+    """
+    from kupa.analyzer.dedup import get_deduplicator
+    from kupa.analyzer.incremental import (
+        get_analysis_cache, file_digest, knowledge_base_version,
+        serialize_file_results, deserialize_file_results
+    )
+    
+    # Aliases such as "latest" are resolved to the version they stand for
+    target_k8s_version = get_kubernetes_version(target_k8s_version)
     logger.info(f"Analyzing directory: {directory_path}")
-    yaml_files = find_yaml_files(directory_path)
-    logger.info(f"Found {len(yaml_files)} YAML files")
     
-    all_resources = []
-    for yaml_file in yaml_files:
-        resources = parse_k8s_yaml(yaml_file)
-        all_resources.extend(resources)
+    max_in_flight = resolve_max_in_flight(max_in_flight)
+    config = load_config()
+    max_window = max(1, config.get("analysis", {}).get("stream_window", 256))
+    tier_order = resolve_tier_order()
+    
+    # The run's counters and prefetched verdicts, activated around each window's checks
+    # (not across yields, since the consumer runs in between)
+    run = RunState()
+    
+    # Identical resources (e.g. copied environments) are checked once
+    deduplicator = get_deduplicator(dedup)
+    
+    # Files whose content hasn't changed since the last run are not parsed again
+    analysis_cache = get_analysis_cache(directory_path, incremental)
+    kb_version = knowledge_base_version() if analysis_cache is not None else None
+    digests = {}
+    
+    def is_cached(yaml_file: str) -> bool:
+        try:
+            digests[yaml_file] = file_digest(yaml_file)
+        except OSError as e:
+            logger.warning(f"Could not hash {yaml_file}: {e}")
+            return False
+        return analysis_cache.contains(digests[yaml_file], target_k8s_version, kb_version)
+    
+    # Only parse the documents some tier could flag
+    document_filter = None
+    if config.get("analysis", {}).get("prescan", False):
+        document_filter = build_document_filter(target_k8s_version, tier_order)
+    
+    # The walk is lazy, so parsing and checking start before it finishes
+    parsed_files = iter_parsed_files(
+        iter_yaml_files(directory_path), workers=resolve_worker_count(workers),
+        document_filter=document_filter, skip=is_cached if analysis_cache is not None else None
+    )
+    
+    counts = {"files": 0, "cached_files": 0, "resources": 0, "changes": 0}
+    window = []
+    window_limit = min(max_window, max_in_flight)
     
-    logger.info(f"Found {len(all_resources)} Kubernetes resources")
+    def flush_window():
+        with run.activate():
+            file_results = _check_window(window, target_k8s_version, max_in_flight, tier_order, deduplicator)
+        if analysis_cache is not None:
+            # Files a tier failed for are checked again next time rather than cached
+            analysis_cache.put_many([
+                (digests.pop(f), serialize_file_results(results))
+                for (f, _, cached_results), (_, results, check_failed) in zip(window, file_results)
+                if cached_results is None and f in digests and not check_failed
+            ], target_k8s_version, kb_version)
+        window.clear()
+        
+        for _, results, _ in file_results:
+            for resource, breaking_change in results:
+                if breaking_change:
+                    logger.info(f"Found breaking change in {resource}")
+                    counts["changes"] += 1
+                    yield breaking_change
+                else:
+                    resource.release()
+    
+    try:
+        window_resources = 0
+        for yaml_file, resources in parsed_files:
+            cached = None
+            if resources is None:
+                entries = analysis_cache.get(digests[yaml_file], target_k8s_version, kb_version)
+                if entries is not None:
+                    cached = deserialize_file_results(entries, yaml_file)
+                    counts["cached_files"] += 1
+                    del digests[yaml_file]
+                else:
+                    # Expired since it was looked up
+                    resources = parse_k8s_yaml(yaml_file, document_filter)
+            
+            window.append((yaml_file, resources or [], cached))
+            file_size = len(cached) if cached is not None else len(resources)
+            counts["files"] += 1
+            counts["resources"] += file_size
+            window_resources += file_size
+            
+            if window_resources >= window_limit:
+                yield from flush_window()
+                window_resources = 0
+                window_limit = min(max_window, window_limit * 2)
+        
+        if window:
+            yield from flush_window()
+    finally:
+        parsed_files.close()
+        if analysis_cache is not None:
+            analysis_cache.close()
+    
+    logger.info(f"Checked {counts['resources']} Kubernetes resources in {counts['files']} YAML files")
+    if analysis_cache is not None:
+        logger.info(f"Analysis cache: {counts['cached_files']} unchanged files reused")
+    logger.info(f"Found {counts['changes']} breaking changes")
+    if deduplicator is not None and deduplicator.resources:
+        logger.info(f"Deduplication: {deduplicator.format_stats()}")
+    with run.activate():
+        _log_run_stats()
+
+
+def analyze_documents(files: Dict[str, bytes], target_k8s_version: str, 
+                      max_in_flight: Optional[int] = None,
+                      dedup: Optional[bool] = None,
+                      checkpoint: Optional[Callable[[int], None]] = None) -> List[BreakingChange]:
+    """
+    Analyze in-memory YAML files for breaking changes, without touching disk.
+    
+    The resources of the breaking changes keep their content and the byte
+    span of their document within its file's content, so the updated files
+    can be produced in memory with kupa.output.render_updated_files().
+    Files are checked in windows of up to ``analysis.stream_window``
+    resources, with the checkpoint called before each one.
+    
+    Args:
+        files: The content of each YAML file, by file name
+        target_k8s_version: Target Kubernetes version to check against, or an
+            alias such as ``latest``
+        max_in_flight: Maximum number of resources checked at the same time.
+            If None, the ``concurrency.max_in_flight`` setting is used.
+        dedup: Whether to check resources that only differ in their name,
+            namespace or labels once. If None, the ``analysis.dedup.enabled``
+            setting is used.
+        checkpoint: Called with the number of resources checked so far
+            before each window, e.g. to report progress. An exception it
+            raises (such as kupa.api.jobs.JobCancelled) stops the analysis.
+        
+    Returns:
+        List of breaking changes detected, in file order, then document order
+    """
+    from kupa.analyzer.dedup import get_deduplicator
+    
+    target_k8s_version = get_kubernetes_version(target_k8s_version)
+    logger.info(f"Analyzing {len(files)} uploaded files")
+    
+    max_in_flight = resolve_max_in_flight(max_in_flight)
+    config = load_config()
+    max_window = max(1, config.get("analysis", {}).get("stream_window", 256))
+    tier_order = resolve_tier_order()
+    
+    run = RunState()
+    deduplicator = get_deduplicator(dedup)
+    
+    document_filter = None
+    if config.get("analysis", {}).get("prescan", False):
+        document_filter = build_document_filter(target_k8s_version, tier_order)
     
-    # Check each resource for breaking changes
     breaking_changes = []
-    for resource in all_resources:
-        breaking_change = check_for_breaking_changes(resource, target_k8s_version)
-        if breaking_change:
-            logger.info(f"Found breaking change in {resource}")
-            breaking_changes.append(breaking_change)
+    checked = 0
+    window = []
+    window_resources = 0
     
-    logger.info(f"Found {len(breaking_changes)} breaking changes")
+    def flush_window():
+        if checkpoint is not None:
+            checkpoint(checked)
+        breaking_changes.extend(
+            breaking_change
+            for _, results, _ in _check_window(window, target_k8s_version, max_in_flight, tier_order, deduplicator)
+            for _, breaking_change in results
+            if breaking_change is not None
+        )
+        window.clear()
+    
+    with run.activate():
+        for file_path, data in files.items():
+            resources = parse_k8s_yaml_data(data, file_path, document_filter)
+            window.append((file_path, resources, None))
+            window_resources += len(resources)
+            if window_resources >= max_window:
+                flush_window()
+                checked += window_resources
+                window_resources = 0
+        if window:
+            flush_window()
+            checked += window_resources
+        
+        logger.info(f"Found {len(breaking_changes)} breaking changes")
+        if deduplicator is not None and deduplicator.resources:
+            logger.info(f"Deduplication: {deduplicator.format_stats()}")
+        _log_run_stats()
     return breaking_changes
+
+
+def analyze_directory(directory_path: str, target_k8s_version: Union[str, Sequence[str]], 
+                      workers: Optional[int] = None, 
+                      max_in_flight: Optional[int] = None,
+                      incremental: Optional[bool] = None):
+    """
+    Analyze a directory for Kubernetes resources and check for breaking changes.
+    
+    Given several target versions, the directory is walked and parsed once
+    and a resource × version matrix is returned instead (see
+    kupa.analyzer.matrix.analyze_matrix()).
+    
+    Args:
+        directory_path: Path to the directory containing Kubernetes YAML files
+        target_k8s_version: Target Kubernetes version or alias to check
+            against, or a list of them
+        workers: Number of processes used to parse YAML files. If None, the
+            ``analysis.workers`` configuration setting is used.
+        max_in_flight: Maximum number of resources checked at the same time.
+            If None, the ``concurrency.max_in_flight`` setting is used.
+        incremental: Whether to reuse the results of unchanged files from the
+            analysis cache. If None, the ``analysis.incremental.enabled``
+            setting is used. Not used for a version matrix.
+        
+    Returns:
+        List of breaking changes detected, or a VersionMatrix for a list of
+        target versions
+    """
+    if not isinstance(target_k8s_version, str):
+        from kupa.analyzer.matrix import analyze_matrix
+        return analyze_matrix(directory_path, [get_kubernetes_version(v) for v in target_k8s_version],
+                              workers=workers, max_in_flight=max_in_flight)
+    
+    target_k8s_version = get_kubernetes_version(target_k8s_version)
+    return list(iter_breaking_changes(directory_path, target_k8s_version, workers=workers,
+                                      max_in_flight=max_in_flight, incremental=incremental))
@@ -0,0 +1,90 @@
+"""
+Concurrency limits for breaking change checks.
+
+Checks run on a thread pool whose size is the global in-flight limit. Each
+provider (Ollama, OpenAI, the Kubernetes docs) additionally has its own
+limit, enforced with a semaphore around every call to that provider.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from kupa.config import load_config
+
+logger = logging.getLogger('kupa.analyzer.concurrency')
+
+_provider_semaphores: Dict[str, Optional[threading.BoundedSemaphore]] = {}
+_provider_lock = threading.Lock()
+
+
+def configure_provider_limits(limits: Optional[Dict[str, int]] = None) -> None:
+    """
+    Set the per-provider concurrency limits.
+
+    Args:
+        limits: Mapping of provider name to the maximum number of concurrent
+            calls. A limit of 0 or None means unlimited. If None, the limits
+            are read from the ``concurrency.providers`` configuration setting.
+    """
+    if limits is None:
+        config = load_config()
+        limits = config.get("concurrency", {}).get("providers", {})
+
+    with _provider_lock:
+        _provider_semaphores.clear()
+        for provider, limit in limits.items():
+            _provider_semaphores[provider] = threading.BoundedSemaphore(limit) if limit else None
+
+
+def _get_semaphore(provider: str) -> Optional[threading.BoundedSemaphore]:
+    """Get the semaphore for a provider, loading the limits on first use."""
+    with _provider_lock:
+        loaded = bool(_provider_semaphores)
+    if not loaded:
+        configure_provider_limits()
+
+    with _provider_lock:
+        return _provider_semaphores.get(provider)
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """
+    Context manager that holds one of the provider's concurrency slots.
+
+    Blocks until a slot is free. Providers without a configured limit are
+    not throttled.
+
+    Args:
+        provider: The provider name (e.g. 'ollama', 'openai', 'docs')
+    """
+    semaphore = _get_semaphore(provider)
+    if semaphore is None:
+        yield
+        return
+
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def resolve_max_in_flight(max_in_flight: Optional[int] = None) -> int:
+    """
+    Resolve the global limit on concurrently running checks.
+
+    Args:
+        max_in_flight: Requested limit. If None, the value from the
+            ``concurrency.max_in_flight`` configuration setting is used.
+
+    Returns:
+        The limit (always at least 1)
+    """
+    if max_in_flight is None:
+        config = load_config()
+        max_in_flight = config.get("concurrency", {}).get("max_in_flight", 1)
+
+    return max(1, int(max_in_flight))
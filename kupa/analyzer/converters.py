@@ -0,0 +1,298 @@
+"""
+Deterministic converters for well-known API migrations.
+
+Each converter takes the parsed manifest of a resource in a removed API
+version and returns a complete manifest for the replacement version,
+moving and renaming fields as the new schema requires (for example the
+Ingress v1beta1 backends and ``pathType``, or the per-version CRD schema).
+Converters never modify their input. When a manifest can't be converted
+without guessing, a converter raises ConversionError and the model is
+asked instead.
+"""
+
+import copy
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('kupa.analyzer.converters')
+
+Manifest = Dict[str, Any]
+ConverterFunc = Callable[[Manifest], Manifest]
+
+# (kind, apiVersion) -> (apiVersion converted to, converter)
+CONVERTERS: Dict[Tuple[str, str], Tuple[str, ConverterFunc]] = {}
+
+
+class ConversionError(Exception):
+    """Raised when a manifest can't be converted deterministically."""
+
+
+def converter(kind: str, to_api_version: str, *from_api_versions: str):
+    """
+    Register a converter for a kind from one or more removed API versions.
+
+    Args:
+        kind: The resource kind
+        to_api_version: The apiVersion the converter produces
+        *from_api_versions: The apiVersions it converts from
+    """
+    def register(func: ConverterFunc) -> ConverterFunc:
+        for api_version in from_api_versions:
+            CONVERTERS[(kind, api_version)] = (to_api_version, func)
+        return func
+    return register
+
+
+def has_converter(kind: str, api_version: str, to_api_version: Optional[str] = None) -> bool:
+    """Check whether a converter exists for a kind and apiVersion (and, if given, target apiVersion)."""
+    entry = CONVERTERS.get((kind, api_version))
+    return entry is not None and (to_api_version is None or entry[0] == to_api_version)
+
+
+def convert(content: Manifest, to_api_version: Optional[str] = None) -> Optional[Manifest]:
+    """
+    Convert a manifest with the registered converter for its kind and apiVersion.
+
+    Args:
+        content: The parsed manifest. It is not modified.
+        to_api_version: The apiVersion to convert to. If given and the
+            converter produces a different one, no conversion is done.
+
+    Returns:
+        The converted manifest, or None if no converter applies
+
+    Raises:
+        ConversionError: If the manifest can't be converted deterministically
+    """
+    entry = CONVERTERS.get((content.get("kind"), content.get("apiVersion")))
+    if entry is None:
+        return None
+    produced, func = entry
+    if to_api_version is not None and produced != to_api_version:
+        return None
+
+    converted = func(copy.deepcopy(content))
+    converted["apiVersion"] = produced
+    return converted
+
+
+# Ingress
+
+def _convert_ingress_backend(backend: Dict[str, Any], where: str) -> Dict[str, Any]:
+    """Convert a v1beta1 IngressBackend (serviceName/servicePort) to the v1 form."""
+    if "resource" in backend:
+        return backend
+    if "serviceName" not in backend or "servicePort" not in backend:
+        raise ConversionError(f"{where} has neither a service nor a resource backend")
+
+    port = backend.pop("servicePort")
+    if isinstance(port, int) or (isinstance(port, str) and port.isdigit()):
+        service_port = {"number": int(port)}
+    else:
+        service_port = {"name": port}
+    converted = {"service": {"name": backend.pop("serviceName"), "port": service_port}}
+    converted.update(backend)
+    return converted
+
+
+@converter("Ingress", "networking.k8s.io/v1", "extensions/v1beta1", "networking.k8s.io/v1beta1")
+def convert_ingress(content: Manifest) -> Manifest:
+    """Ingress v1beta1 -> networking.k8s.io/v1: backends, defaultBackend and pathType."""
+    spec = content.get("spec") or {}
+
+    if "backend" in spec:
+        spec["defaultBackend"] = _convert_ingress_backend(spec.pop("backend"), "spec.backend")
+
+    for i, rule in enumerate(spec.get("rules") or []):
+        for j, path in enumerate((rule.get("http") or {}).get("paths") or []):
+            if "backend" in path:
+                path["backend"] = _convert_ingress_backend(
+                    path["backend"], f"spec.rules[{i}].http.paths[{j}].backend"
+                )
+            # Required in v1; this is how v1beta1 treated paths without one
+            path.setdefault("pathType", "ImplementationSpecific")
+    return content
+
+
+# CustomResourceDefinition
+
+_PRESERVE_UNKNOWN_SCHEMA = {"openAPIV3Schema": {"type": "object", "x-kubernetes-preserve-unknown-fields": True}}
+
+
+def _convert_printer_columns(columns: list) -> list:
+    """Rename JSONPath to jsonPath in additionalPrinterColumns."""
+    for column in columns:
+        if "JSONPath" in column:
+            column["jsonPath"] = column.pop("JSONPath")
+    return columns
+
+
+@converter("CustomResourceDefinition", "apiextensions.k8s.io/v1", "apiextensions.k8s.io/v1beta1")
+def convert_crd(content: Manifest) -> Manifest:
+    """CRD apiextensions.k8s.io/v1beta1 -> v1: per-version schemas, subresources and columns."""
+    spec = content.get("spec")
+    if not spec:
+        raise ConversionError("spec is missing")
+
+    versions = spec.get("versions")
+    if not versions:
+        if "version" not in spec:
+            raise ConversionError("neither spec.versions nor spec.version is set")
+        versions = [{"name": spec["version"], "served": True, "storage": True}]
+    spec.pop("version", None)
+
+    validation = spec.pop("validation", None)
+    subresources = spec.pop("subresources", None)
+    printer_columns = spec.pop("additionalPrinterColumns", None)
+    # Unknown fields were preserved by default in v1beta1; keep that behaviour explicit
+    preserve_unknown = spec.pop("preserveUnknownFields", True)
+
+    for version in versions:
+        schema = version.get("schema") or copy.deepcopy(validation) or copy.deepcopy(_PRESERVE_UNKNOWN_SCHEMA)
+        if preserve_unknown:
+            schema.setdefault("openAPIV3Schema", {"type": "object"})
+            schema["openAPIV3Schema"].setdefault("x-kubernetes-preserve-unknown-fields", True)
+        version["schema"] = schema
+        if subresources is not None and "subresources" not in version:
+            version["subresources"] = copy.deepcopy(subresources)
+        if printer_columns is not None and "additionalPrinterColumns" not in version:
+            version["additionalPrinterColumns"] = copy.deepcopy(printer_columns)
+        if "additionalPrinterColumns" in version:
+            _convert_printer_columns(version["additionalPrinterColumns"])
+    spec["versions"] = versions
+
+    conversion = spec.get("conversion")
+    if conversion and conversion.get("strategy") == "Webhook":
+        webhook = conversion.setdefault("webhook", {})
+        if "webhookClientConfig" in conversion:
+            webhook["clientConfig"] = conversion.pop("webhookClientConfig")
+        # The v1beta1 default; required in v1
+        webhook["conversionReviewVersions"] = conversion.pop(
+            "conversionReviewVersions", webhook.get("conversionReviewVersions", ["v1beta1"])
+        )
+    return content
+
+
+# PodDisruptionBudget
+
+@converter("PodDisruptionBudget", "policy/v1", "policy/v1beta1")
+def convert_pdb(content: Manifest) -> Manifest:
+    """PDB policy/v1beta1 -> policy/v1."""
+    selector = (content.get("spec") or {}).get("selector")
+    if selector == {}:
+        # An empty selector matches no pods in v1beta1 but every pod in the namespace in v1
+        raise ConversionError("an empty spec.selector selects every pod in policy/v1")
+    return content
+
+
+# CronJob
+
+@converter("CronJob", "batch/v1", "batch/v1beta1")
+def convert_cronjob(content: Manifest) -> Manifest:
+    """CronJob batch/v1beta1 -> batch/v1 (same schema)."""
+    if not (content.get("spec") or {}).get("jobTemplate"):
+        raise ConversionError("spec.jobTemplate is missing")
+    return content
+
+
+# HorizontalPodAutoscaler
+
+def _metric_target(metric: Dict[str, Any], value_key: str, average_key: str,
+                   utilization_key: Optional[str] = None) -> Dict[str, Any]:
+    """Build a v2 MetricTarget from the v2beta1 target fields of a metric source."""
+    if utilization_key and utilization_key in metric:
+        return {"type": "Utilization", "averageUtilization": metric.pop(utilization_key)}
+    if average_key in metric:
+        return {"type": "AverageValue", "averageValue": metric.pop(average_key)}
+    if value_key and value_key in metric:
+        return {"type": "Value", "value": metric.pop(value_key)}
+    raise ConversionError("metric has no target")
+
+
+def _metric_identifier(source: Dict[str, Any], selector_key: str) -> Dict[str, Any]:
+    """Build a v2 MetricIdentifier from the v2beta1 metricName and selector."""
+    if "metricName" not in source:
+        raise ConversionError("metric has no metricName")
+    identifier = {"name": source.pop("metricName")}
+    if selector_key in source:
+        identifier["selector"] = source.pop(selector_key)
+    return identifier
+
+
+@converter("HorizontalPodAutoscaler", "autoscaling/v2", "autoscaling/v2beta1")
+def convert_hpa_v2beta1(content: Manifest) -> Manifest:
+    """HPA autoscaling/v2beta1 -> autoscaling/v2: metric targets and identifiers."""
+    for metric in (content.get("spec") or {}).get("metrics") or []:
+        metric_type = metric.get("type")
+        source = metric.get(metric_type[0].lower() + metric_type[1:] if metric_type else "")
+        if source is None:
+            raise ConversionError(f"metric of type {metric_type} has no source")
+
+        if metric_type == "Resource":
+            source["target"] = _metric_target(source, "", "targetAverageValue", "targetAverageUtilization")
+        elif metric_type == "Pods":
+            target = _metric_target(source, "", "targetAverageValue")
+            source["metric"] = _metric_identifier(source, "selector")
+            source["target"] = target
+        elif metric_type == "Object":
+            target = _metric_target(source, "targetValue", "averageValue")
+            source["describedObject"] = source.pop("target", None)
+            source["metric"] = _metric_identifier(source, "selector")
+            source["target"] = target
+        elif metric_type == "External":
+            target = _metric_target(source, "targetValue", "targetAverageValue")
+            source["metric"] = _metric_identifier(source, "metricSelector")
+            source["target"] = target
+        else:
+            raise ConversionError(f"unknown metric type {metric_type}")
+    return content
+
+
+@converter("HorizontalPodAutoscaler", "autoscaling/v2", "autoscaling/v2beta2")
+def convert_hpa_v2beta2(content: Manifest) -> Manifest:
+    """HPA autoscaling/v2beta2 -> autoscaling/v2 (same schema)."""
+    return content
+
+
+# Workloads (extensions/v1beta1, apps/v1beta1, apps/v1beta2 -> apps/v1)
+
+def _convert_workload(content: Manifest, on_delete_default: bool = False) -> Manifest:
+    """Make the selector explicit, as apps/v1 requires, and drop fields apps/v1 doesn't have."""
+    spec = content.get("spec")
+    if not spec:
+        raise ConversionError("spec is missing")
+
+    if not spec.get("selector"):
+        labels = ((spec.get("template") or {}).get("metadata") or {}).get("labels")
+        if not labels:
+            raise ConversionError("spec.selector is missing and the pod template has no labels")
+        # The beta APIs defaulted the selector to the template labels
+        spec["selector"] = {"matchLabels": dict(labels)}
+
+    spec.pop("rollbackTo", None)
+    spec.pop("templateGeneration", None)
+    if on_delete_default and "updateStrategy" not in spec:
+        # OnDelete was the default in the beta API; apps/v1 defaults to RollingUpdate
+        spec["updateStrategy"] = {"type": "OnDelete"}
+    return content
+
+
+@converter("Deployment", "apps/v1", "extensions/v1beta1", "apps/v1beta1", "apps/v1beta2")
+@converter("ReplicaSet", "apps/v1", "extensions/v1beta1", "apps/v1beta1", "apps/v1beta2")
+def convert_deployment(content: Manifest) -> Manifest:
+    """Deployment and ReplicaSet beta APIs -> apps/v1."""
+    return _convert_workload(content)
+
+
+@converter("StatefulSet", "apps/v1", "apps/v1beta2")
+@converter("DaemonSet", "apps/v1", "apps/v1beta2")
+def convert_workload_v1beta2(content: Manifest) -> Manifest:
+    """StatefulSet and DaemonSet apps/v1beta2 -> apps/v1."""
+    return _convert_workload(content)
+
+
+@converter("StatefulSet", "apps/v1", "apps/v1beta1")
+@converter("DaemonSet", "apps/v1", "extensions/v1beta1")
+def convert_workload_on_delete(content: Manifest) -> Manifest:
+    """StatefulSet apps/v1beta1 and DaemonSet extensions/v1beta1 -> apps/v1, keeping OnDelete updates."""
+    return _convert_workload(content, on_delete_default=True)
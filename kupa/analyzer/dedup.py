@@ -0,0 +1,199 @@
+"""
+Within-run deduplication of identical resources.
+
+Kustomize overlays, copied environments and generated manifests often
+contain the same resource body many times. Each resource is fingerprinted
+by its canonical content, leaving out configurable fields such as the name,
+namespace and labels. Only the first resource with a fingerprint is
+checked, and its verdict is fanned out to the others, with the ignored
+fields of ``updated_content`` set back to each copy's own values.
+"""
+
+import copy
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from kupa.config import load_config
+
+logger = logging.getLogger('kupa.analyzer.dedup')
+
+DEFAULT_IGNORE_FIELDS = ("metadata.name", "metadata.namespace", "metadata.labels")
+
+_MISSING = object()
+
+
+def _without_fields(content: Dict[str, Any], paths: Sequence[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Return the content without the given fields, copying only the dicts along their paths."""
+    result = dict(content)
+    for path in paths:
+        parent = result
+        for key in path[:-1]:
+            child = parent.get(key)
+            if not isinstance(child, dict):
+                break
+            parent[key] = child = dict(child)
+            parent = child
+        else:
+            parent.pop(path[-1], None)
+    return result
+
+
+def _get_field(content: Any, path: Tuple[str, ...]) -> Any:
+    """Get a nested field, or _MISSING."""
+    for key in path:
+        if not isinstance(content, dict) or key not in content:
+            return _MISSING
+        content = content[key]
+    return content
+
+
+def _set_field(content: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    """Set a nested field, removing it if the value is _MISSING."""
+    for key in path[:-1]:
+        child = content.get(key)
+        if not isinstance(child, dict):
+            if value is _MISSING:
+                return
+            child = content[key] = {}
+        content = child
+    if value is _MISSING:
+        content.pop(path[-1], None)
+    else:
+        content[path[-1]] = copy.deepcopy(value)
+
+
+class ResourceDeduplicator:
+    """Remembers the verdict for each distinct resource body seen in a run."""
+
+    def __init__(self, ignore_fields: Sequence[str] = DEFAULT_IGNORE_FIELDS):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            ignore_fields: Dotted paths of fields left out of the comparison
+                (e.g. ``metadata.name``)
+        """
+        self.ignore_paths = [tuple(field.split(".")) for field in ignore_fields if field]
+        self.resources = 0
+        self.unique = 0
+        self._verdicts: Dict[str, Any] = {}
+        # Fingerprints whose check hit a tier error
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def fingerprint(self, resource) -> str:
+        """
+        Fingerprint a resource by its canonical content.
+
+        Args:
+            resource: The Kubernetes resource
+
+        Returns:
+            A hex digest identical for resources that only differ in ignored fields
+        """
+        content = resource.content
+        if isinstance(content, dict):
+            content = _without_fields(content, self.ignore_paths)
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+    def partition(self, resources: List[Any]) -> Tuple[List[str], List[int]]:
+        """
+        Fingerprint resources and pick the ones that need checking.
+
+        Args:
+            resources: The resources of a window
+
+        Returns:
+            (fingerprint of each resource, indices of the resources to check):
+            one resource per fingerprint whose verdict isn't known yet
+        """
+        fingerprints = [self.fingerprint(resource) for resource in resources]
+        to_check, seen = [], set()
+        with self._lock:
+            for i, fingerprint in enumerate(fingerprints):
+                if fingerprint not in self._verdicts and fingerprint not in seen:
+                    seen.add(fingerprint)
+                    to_check.append(i)
+            self.resources += len(resources)
+            self.unique += len(to_check)
+        return fingerprints, to_check
+
+    def record(self, fingerprint: str, breaking_change, failed: bool = False) -> None:
+        """Remember the verdict for a fingerprint, and whether a tier failed while checking it."""
+        with self._lock:
+            self._verdicts[fingerprint] = breaking_change
+            if failed:
+                self._failed.add(fingerprint)
+
+    def failed(self, fingerprint: str) -> bool:
+        """Check whether a tier failed while checking a fingerprint's resource."""
+        with self._lock:
+            return fingerprint in self._failed
+
+    def fan_out(self, resource, fingerprint: str):
+        """
+        Get a resource's verdict from the verdict recorded for its fingerprint.
+
+        Args:
+            resource: The Kubernetes resource
+            fingerprint: Its fingerprint
+
+        Returns:
+            The breaking change for this resource, or None
+        """
+        # Import here to avoid circular imports
+        from kupa.analyzer import BreakingChange
+
+        with self._lock:
+            breaking_change = self._verdicts[fingerprint]
+        if breaking_change is None or breaking_change.resource is resource:
+            return breaking_change
+
+        updated_content = breaking_change.updated_content
+        if isinstance(updated_content, dict):
+            # The ignored fields are the only ones that can differ; take this copy's values
+            updated_content = copy.deepcopy(updated_content)
+            for path in self.ignore_paths:
+                _set_field(updated_content, path, _get_field(resource.content, path))
+
+        return BreakingChange(
+            resource=resource,
+            change_type=breaking_change.change_type,
+            description=breaking_change.description,
+            recommended_action=breaking_change.recommended_action,
+            updated_content=updated_content,
+            complete=breaking_change.complete
+        )
+
+    @property
+    def ratio(self) -> float:
+        """Resources seen per resource checked."""
+        return self.resources / self.unique if self.unique else 1.0
+
+    def format_stats(self) -> str:
+        """Format the counters for a log line."""
+        return (f"{self.resources} resources, {self.unique} unique, "
+                f"{self.resources - self.unique} duplicates skipped ({self.ratio:.1f}x)")
+
+
+def get_deduplicator(enabled: Optional[bool] = None) -> Optional[ResourceDeduplicator]:
+    """
+    Create a deduplicator for a run, as configured in ``analysis.dedup``.
+
+    Args:
+        enabled: Whether to deduplicate. If None, the ``analysis.dedup.enabled``
+            setting is used.
+
+    Returns:
+        The deduplicator, or None if deduplication is off
+    """
+    dedup_config = load_config().get("analysis", {}).get("dedup", {})
+    if enabled is None:
+        enabled = dedup_config.get("enabled", True)
+    if not enabled:
+        return None
+    return ResourceDeduplicator(dedup_config.get("ignore_fields", DEFAULT_IGNORE_FIELDS))
@@ -0,0 +1,349 @@
+"""
+Field-level deprecation matcher.
+
+Rules for removed and deprecated fields are loaded from
+``kupa/analyzer/data/field_rules.yaml`` and compiled, once per target
+version and kind, into a trie of field paths. Matching a document is a
+single walk that only descends into the parts of the document some rule
+can reach, and every finding reports the exact path of the field, e.g.
+``spec.rules[0].http.paths[1].backend.serviceName``.
+"""
+
+import os
+import re
+import logging
+import threading
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from kupa import yaml_io
+from kupa.analyzer.rules import DATA_DIR, VersionTuple, version_tuple
+
+logger = logging.getLogger('kupa.analyzer.fields')
+
+FIELD_RULES_FILE = os.path.join(DATA_DIR, "field_rules.yaml")
+
+# Where each kind keeps its pod, for rules with ``scope: pod``
+POD_TEMPLATE_PATHS = {
+    "Pod": "",
+    "PodTemplate": "template",
+    "Deployment": "spec.template",
+    "StatefulSet": "spec.template",
+    "DaemonSet": "spec.template",
+    "ReplicaSet": "spec.template",
+    "ReplicationController": "spec.template",
+    "Job": "spec.template",
+    "CronJob": "spec.jobTemplate.spec.template",
+}
+
+# Path segment types
+KEY, ITEMS, ANY_KEY, KEY_PREFIX = "key", "items", "any", "prefix"
+
+_SEGMENT = re.compile(r'\.?(?:([A-Za-z0-9_$-]+)|(\[\])|(\*)|\["([^"]*)"\])')
+
+
+def parse_path(path: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Parse a field path into (segment type, value) pairs.
+
+    Args:
+        path: A path such as ``spec.rules[].http`` or ``metadata.annotations["a/b"]``
+
+    Returns:
+        The segments
+
+    Raises:
+        ValueError: If the path can't be parsed
+    """
+    segments = []
+    position = 0
+    while position < len(path):
+        match = _SEGMENT.match(path, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid field path '{path}' at position {position}")
+        name, items, any_key, quoted = match.groups()
+        if items:
+            segments.append((ITEMS, ""))
+        elif any_key:
+            segments.append((ANY_KEY, ""))
+        elif quoted is not None and quoted.endswith("*"):
+            segments.append((KEY_PREFIX, quoted[:-1]))
+        else:
+            segments.append((KEY, name if name is not None else quoted))
+        position = match.end()
+    return tuple(segments)
+
+
+def format_path(parts: List[Any]) -> str:
+    """Format the keys and list indices leading to a field as a path."""
+    path = ""
+    for part in parts:
+        if isinstance(part, int):
+            path += f"[{part}]"
+        elif isinstance(part, str) and re.fullmatch(r'[A-Za-z0-9_$-]+', part):
+            path += f".{part}" if path else part
+        else:
+            path += f'["{part}"]'
+    return path
+
+
+class FieldRule(NamedTuple):
+    """A removed or deprecated field."""
+
+    id: str
+    kinds: Tuple[str, ...]
+    path: str
+    description: str
+    api_versions: Optional[FrozenSet[str]] = None
+    deprecated_in: Optional[VersionTuple] = None
+    removed_in: Optional[VersionTuple] = None
+    replacement: Optional[str] = None
+    scope: Optional[str] = None
+
+    def change_type(self, target: VersionTuple) -> Optional[str]:
+        """Get FIELD_REMOVED or FIELD_DEPRECATED for a target version, or None if neither applies yet."""
+        if self.removed_in is not None and target >= self.removed_in:
+            return "FIELD_REMOVED"
+        if self.deprecated_in is not None and target >= self.deprecated_in:
+            return "FIELD_DEPRECATED"
+        return None
+
+
+class FieldFinding(NamedTuple):
+    """A field of a document matched by a rule."""
+
+    rule: FieldRule
+    path: str
+    change_type: str
+
+    @property
+    def description(self) -> str:
+        """The finding with its path, for reports."""
+        return f"{self.path}: {self.rule.description}"
+
+
+def load_field_rules(path: str = FIELD_RULES_FILE) -> List[FieldRule]:
+    """
+    Load field rules from a data file.
+
+    Args:
+        path: Path of the YAML data file
+
+    Returns:
+        The rules
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    with open(path, 'r') as f:
+        data = yaml_io.load(f) or {}
+
+    rules = []
+    for entry in data.get("rules", []):
+        try:
+            scope = entry.get("scope")
+            if scope not in (None, "pod"):
+                raise ValueError(f"unknown scope '{scope}'")
+            kinds = tuple(POD_TEMPLATE_PATHS) if scope == "pod" else tuple(entry["kinds"])
+            api_versions = entry.get("api_versions")
+            deprecated_in, removed_in = entry.get("deprecated_in"), entry.get("removed_in")
+            if deprecated_in is None and removed_in is None:
+                raise ValueError("deprecated_in or removed_in is required")
+            parse_path(entry["path"])
+            rules.append(FieldRule(
+                id=entry["id"],
+                kinds=kinds,
+                path=entry["path"],
+                description=entry["description"],
+                api_versions=frozenset(api_versions) if api_versions else None,
+                deprecated_in=version_tuple(str(deprecated_in)) if deprecated_in is not None else None,
+                removed_in=version_tuple(str(removed_in)) if removed_in is not None else None,
+                replacement=entry.get("replacement"),
+                scope=scope
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid field rule in {path}: {entry!r} ({e})") from e
+    return rules
+
+
+class TrieNode:
+    """A node of the field path trie."""
+
+    __slots__ = ('keys', 'items', 'any_key', 'prefixes', 'rules')
+
+    def __init__(self):
+        self.keys: Dict[str, "TrieNode"] = {}
+        self.items: Optional["TrieNode"] = None
+        self.any_key: Optional["TrieNode"] = None
+        self.prefixes: List[Tuple[str, "TrieNode"]] = []
+        # Rules whose path ends here, with the change type for the target version
+        self.rules: List[Tuple[FieldRule, str]] = []
+
+    def child(self, segment_type: str, value: str) -> "TrieNode":
+        """Get the child for a path segment, creating it if needed."""
+        if segment_type == KEY:
+            return self.keys.setdefault(value, TrieNode())
+        if segment_type == ITEMS:
+            if self.items is None:
+                self.items = TrieNode()
+            return self.items
+        if segment_type == ANY_KEY:
+            if self.any_key is None:
+                self.any_key = TrieNode()
+            return self.any_key
+        for prefix, node in self.prefixes:
+            if prefix == value:
+                return node
+        node = TrieNode()
+        self.prefixes.append((value, node))
+        return node
+
+
+def match_trie(root: TrieNode, document: Any, api_version: Optional[str] = None) -> List[FieldFinding]:
+    """
+    Match a document against a compiled trie in one walk.
+
+    Args:
+        root: The trie for the document's kind
+        document: The parsed document
+        api_version: The document's apiVersion, for rules limited to some versions
+
+    Returns:
+        The findings
+    """
+    findings = []
+    stack = [(root, document, [])]
+    while stack:
+        node, value, parts = stack.pop()
+        for rule, change_type in node.rules:
+            if rule.api_versions is None or api_version in rule.api_versions:
+                findings.append(FieldFinding(rule, format_path(parts), change_type))
+
+        children = []
+        if isinstance(value, dict):
+            for key, child in node.keys.items():
+                if key in value:
+                    children.append((child, value[key], parts + [key]))
+            if node.any_key is not None or node.prefixes:
+                for key, item in value.items():
+                    if node.any_key is not None:
+                        children.append((node.any_key, item, parts + [key]))
+                    for prefix, child in node.prefixes:
+                        if isinstance(key, str) and key.startswith(prefix):
+                            children.append((child, item, parts + [key]))
+        elif isinstance(value, list) and node.items is not None:
+            for index, item in enumerate(value):
+                children.append((node.items, item, parts + [index]))
+
+        # Reversed, so children are visited in order
+        stack.extend(reversed(children))
+    return findings
+
+
+class FieldRuleIndex:
+    """Field rules compiled into one trie per kind, per target version."""
+
+    def __init__(self, rules: List[FieldRule]):
+        """
+        Initialize the index.
+
+        Args:
+            rules: The field rules
+        """
+        self.rules = list(rules)
+        self.kinds = frozenset(kind for rule in self.rules for kind in rule.kinds)
+        self._tries: Dict[VersionTuple, Dict[str, TrieNode]] = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, target: VersionTuple) -> Dict[str, TrieNode]:
+        """Compile the rules that apply in a target version into tries."""
+        tries: Dict[str, TrieNode] = {}
+        for rule in self.rules:
+            change_type = rule.change_type(target)
+            if change_type is None:
+                continue
+            segments = parse_path(rule.path)
+            for kind in rule.kinds:
+                node = tries.setdefault(kind, TrieNode())
+                if rule.scope == "pod" and POD_TEMPLATE_PATHS[kind]:
+                    for segment in parse_path(POD_TEMPLATE_PATHS[kind]):
+                        node = node.child(*segment)
+                for segment in segments:
+                    node = node.child(*segment)
+                node.rules.append((rule, change_type))
+        return tries
+
+    def for_target(self, target_k8s_version: str) -> Dict[str, TrieNode]:
+        """
+        Get the compiled tries for a target version.
+
+        Args:
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            Mapping from kind to the root of its trie. Must not be modified.
+        """
+        target = version_tuple(target_k8s_version)
+        tries = self._tries.get(target)
+        if tries is None:
+            with self._lock:
+                tries = self._tries.get(target)
+                if tries is None:
+                    tries = self._compile(target)
+                    self._tries[target] = tries
+        return tries
+
+    def document_keys(self, target_k8s_version: str) -> Tuple[FrozenSet[Tuple[str, str]], FrozenSet[str]]:
+        """
+        Get the documents some rule could match in a target version, for the pre-scan.
+
+        Args:
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            (kind, apiVersion) pairs of rules limited to some API versions,
+            and kinds of rules that apply to any API version
+        """
+        target = version_tuple(target_k8s_version)
+        pairs, kinds = set(), set()
+        for rule in self.rules:
+            if rule.change_type(target) is None:
+                continue
+            if rule.api_versions is None:
+                kinds.update(rule.kinds)
+            else:
+                pairs.update((kind, api_version) for kind in rule.kinds for api_version in rule.api_versions)
+        return frozenset(pairs), frozenset(kinds)
+
+    def match(self, document: Any, kind: str, api_version: str,
+              target_k8s_version: str) -> List[FieldFinding]:
+        """
+        Find the removed and deprecated fields of a document.
+
+        Args:
+            document: The parsed document
+            kind: The document's kind
+            api_version: The document's apiVersion
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            The findings
+        """
+        root = self.for_target(target_k8s_version).get(kind)
+        if root is None:
+            return []
+        return match_trie(root, document, api_version)
+
+
+_index: Optional[FieldRuleIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_field_rule_index() -> FieldRuleIndex:
+    """Get the process-wide index of the packaged field rules, loading it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FieldRuleIndex(load_field_rules())
+                logger.debug(f"Loaded {len(_index.rules)} field rules")
+    return _index
@@ -0,0 +1,324 @@
+"""
+Incremental analysis cache.
+
+The parsed resources of a YAML file and the verdicts for them are stored
+under a key made of the file's content hash, the target Kubernetes version
+and a knowledge base version. The knowledge base version changes whenever
+something that affects verdicts changes: the static tables, the resolution
+tiers, the model or the prompt. Re-running an analysis then only parses and
+checks the files that changed since the last run.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from kupa.config import load_config
+
+logger = logging.getLogger('kupa.analyzer.incremental')
+
+# Bump when the format of cached entries changes
+ANALYSIS_CACHE_VERSION = "3"
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Hash the content of a file.
+
+    Args:
+        file_path: Path of the file
+
+    Returns:
+        The SHA-256 hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_digest(path: str) -> str:
+    """Hash a packaged data or source file, so editing it changes the knowledge base version."""
+    try:
+        return file_digest(path)
+    except OSError:
+        return ""
+
+
+def knowledge_base_version() -> str:
+    """
+    Get a version identifying everything, apart from the file itself, that affects verdicts.
+
+    Returns:
+        A hex digest of the static tables, rule data files, converters,
+        resolution and pre-scan settings, model settings and prompt version
+    """
+    # Import here to avoid circular imports
+    from kupa.analyzer import DEPRECATED_API_VERSIONS, STABLE_API_VERSIONS, converters
+    from kupa.analyzer.fields import FIELD_RULES_FILE, get_field_rule_index
+    from kupa.analyzer.rules import API_REMOVALS_FILE
+    from kupa.analyzer.tiers import resolve_tier_order, skip_stable_enabled
+    from kupa.mcp.model_client import PROMPT_VERSION
+
+    config = load_config()
+    ai_config = config.get("ai_model", {})
+    api_key_available = os.environ.get('OPENAI_API_KEY') not in [None, '', 'your-api-key']
+
+    canonical = json.dumps({
+        "cache_version": ANALYSIS_CACHE_VERSION,
+        "deprecated": sorted([list(key), value] for key, value in DEPRECATED_API_VERSIONS.items()),
+        "stable": sorted([list(key), value] for key, value in STABLE_API_VERSIONS.items()),
+        "fields": [list(rule) for rule in get_field_rule_index().rules],
+        "field_rules_file": _source_digest(FIELD_RULES_FILE),
+        "api_removals_file": _source_digest(API_REMOVALS_FILE),
+        "converters": sorted([list(key), to_api_version, func.__qualname__]
+                             for key, (to_api_version, func) in converters.CONVERTERS.items()),
+        "converters_source": _source_digest(converters.__file__),
+        "tiers": resolve_tier_order(),
+        "skip_stable": skip_stable_enabled(),
+        "prescan": config.get("analysis", {}).get("prescan", False),
+        "model_provider": os.environ.get("MODEL_PROVIDER", ai_config.get("provider", "openai")),
+        "model": ai_config.get("model"),
+        "api_key_available": api_key_available,
+        "prompt_version": PROMPT_VERSION
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def serialize_file_results(results) -> List[Dict[str, Any]]:
+    """
+    Convert the resources of a file and their verdicts to cacheable entries.
+
+    Args:
+        results: (K8sResource, BreakingChange or None) pairs, in document order
+
+    Returns:
+        JSON-serializable entries
+    """
+    entries = []
+    for resource, breaking_change in results:
+        entry = {
+            "kind": resource.kind,
+            "api_version": resource.api_version,
+            "name": resource.name,
+            "namespace": resource.namespace,
+            "breaking_change": None
+        }
+        # The file content is identical on a hit, so the span is enough to load it again
+        if resource.span is not None:
+            entry["span"] = list(resource.span)
+        else:
+            entry["content"] = resource.content
+        if breaking_change is not None:
+            entry["breaking_change"] = {
+                "change_type": breaking_change.change_type,
+                "description": breaking_change.description,
+                "recommended_action": breaking_change.recommended_action,
+                "updated_content": breaking_change.updated_content,
+                "complete": breaking_change.complete
+            }
+        entries.append(entry)
+    return entries
+
+
+def deserialize_file_results(entries: List[Dict[str, Any]], file_path: str) -> List[Tuple[Any, Any]]:
+    """
+    Rebuild the resources of a file and their verdicts from cached entries.
+
+    Args:
+        entries: Entries from serialize_file_results()
+        file_path: Current path of the file (identical content may have moved)
+
+    Returns:
+        (K8sResource, BreakingChange or None) pairs, in document order
+    """
+    # Import here to avoid circular imports
+    from kupa.analyzer import K8sResource, BreakingChange
+
+    results = []
+    for entry in entries:
+        resource = K8sResource(
+            kind=entry["kind"],
+            api_version=entry["api_version"],
+            name=entry["name"],
+            namespace=entry["namespace"],
+            file_path=file_path,
+            content=entry.get("content"),
+            span=tuple(entry["span"]) if entry.get("span") is not None else None
+        )
+        breaking_change = None
+        if entry.get("breaking_change") is not None:
+            breaking_change = BreakingChange(resource=resource, **entry["breaking_change"])
+        results.append((resource, breaking_change))
+    return results
+
+
+class AnalysisCache:
+    """SQLite-backed cache of per-file analysis results."""
+
+    def __init__(self, directory: str, ttl: float = 2592000):
+        """
+        Initialize the cache. The database is opened on first use.
+
+        Args:
+            directory: Directory the cache database is stored in
+            ttl: Seconds an entry stays valid
+        """
+        self.directory = os.path.expanduser(directory)
+        self.path = os.path.join(self.directory, "analysis.sqlite")
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating it if needed. Must be called with the lock held."""
+        if self._connection is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Keep the cache out of version control, like other tool caches do
+            gitignore = os.path.join(self.directory, ".gitignore")
+            if not os.path.exists(gitignore):
+                with open(gitignore, 'w') as f:
+                    f.write("# Created by kupa\n*\n")
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT PRIMARY KEY, results TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _key(digest: str, target_k8s_version: str, kb_version: str) -> str:
+        return f"{digest}:{target_k8s_version.lstrip('v')}:{kb_version}"
+
+    def get(self, digest: str, target_k8s_version: str, kb_version: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up the cached results for a file.
+
+        Args:
+            digest: Content hash from file_digest()
+            target_k8s_version: The target Kubernetes version
+            kb_version: Knowledge base version from knowledge_base_version()
+
+        Returns:
+            The cached entries, or None on a miss
+        """
+        key = self._key(digest, target_k8s_version, kb_version)
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT results, created_at FROM files WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading analysis cache: {e}")
+            row = None
+
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def contains(self, digest: str, target_k8s_version: str, kb_version: str) -> bool:
+        """
+        Check whether fresh results for a file are cached, without loading them.
+
+        Args:
+            digest: Content hash from file_digest()
+            target_k8s_version: The target Kubernetes version
+            kb_version: Knowledge base version from knowledge_base_version()
+
+        Returns:
+            True if get() would return the file's results
+        """
+        key = self._key(digest, target_k8s_version, kb_version)
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT created_at FROM files WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading analysis cache: {e}")
+            return False
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, digest: str, target_k8s_version: str, kb_version: str,
+            entries: List[Dict[str, Any]]) -> None:
+        """
+        Store the results for a file.
+
+        Args:
+            digest: Content hash from file_digest()
+            target_k8s_version: The target Kubernetes version
+            kb_version: Knowledge base version from knowledge_base_version()
+            entries: Entries from serialize_file_results()
+        """
+        self.put_many([(digest, entries)], target_k8s_version, kb_version)
+
+    def put_many(self, items: List[Tuple[str, List[Dict[str, Any]]]], target_k8s_version: str,
+                 kb_version: str) -> None:
+        """
+        Store the results for several files in one transaction, dropping expired entries.
+
+        Args:
+            items: (digest, entries) pairs
+            target_k8s_version: The target Kubernetes version
+            kb_version: Knowledge base version from knowledge_base_version()
+        """
+        now = time.time()
+        rows = [
+            (self._key(digest, target_k8s_version, kb_version), json.dumps(entries, default=str), now)
+            for digest, entries in items
+        ]
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.executemany(
+                    "INSERT OR REPLACE INTO files (key, results, created_at) VALUES (?, ?, ?)", rows
+                )
+                connection.execute("DELETE FROM files WHERE created_at < ?", (now - self.ttl,))
+                connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error writing analysis cache: {e}")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def get_analysis_cache(directory_path: str, enabled: Optional[bool] = None) -> Optional[AnalysisCache]:
+    """
+    Get the analysis cache for a directory, as configured in ``analysis.incremental``.
+
+    Args:
+        directory_path: The directory being analyzed. A relative cache
+            directory is resolved against it.
+        enabled: Whether incremental analysis is on. If None, the
+            ``analysis.incremental.enabled`` setting is used.
+
+    Returns:
+        The analysis cache, or None if incremental analysis is off
+    """
+    config = load_config()
+    cache_config = config.get("analysis", {}).get("incremental", {})
+    if enabled is None:
+        enabled = cache_config.get("enabled", False)
+    if not enabled:
+        return None
+
+    base = directory_path if os.path.isdir(directory_path) else os.path.dirname(directory_path)
+    directory = os.path.join(base, os.path.expanduser(cache_config.get("directory", ".kupa-cache")))
+    return AnalysisCache(directory, cache_config.get("ttl", 2592000))
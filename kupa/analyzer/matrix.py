@@ -0,0 +1,286 @@
+"""
+Multi-version matrix analysis.
+
+Checks every resource against several target Kubernetes versions from a
+single walk and parse of the repository. Versions are checked in ascending
+order. The static rules are cheap and their findings depend on the version
+(replacement APIs get removed in turn, field removals start at later
+versions), so they are applied for every version. A finding from the model
+or docs tiers is reused for later versions instead of repeating those
+lookups, as long as no static rule applies there. Lookups that don't depend
+on the version (the API reference page) are shared through the docs cache
+as usual.
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from kupa.config import load_config, get_kubernetes_version
+from kupa.analyzer import (
+    K8sResource, BreakingChange, DocumentFilter, parse_k8s_version, build_document_filter,
+    check_static, iter_parsed_files, iter_yaml_files, resolve_worker_count, resolve_tier_order,
+    _check_tiers, _log_run_stats, _UNCHECKED
+)
+from kupa.analyzer.runs import RunState, bind_run
+from kupa.analyzer.concurrency import resolve_max_in_flight
+
+logger = logging.getLogger('kupa.analyzer.matrix')
+
+
+def parse_version_spec(spec: str) -> List[str]:
+    """
+    Expand a version specification into a sorted list of target versions.
+
+    The specification is a comma-separated list of versions, aliases (such
+    as ``latest``) and inclusive minor-version ranges written ``A..B``, e.g.
+    ``v1.22,v1.25`` or ``v1.22..latest``.
+
+    Args:
+        spec: The version specification
+
+    Returns:
+        The target versions in ascending order, without duplicates
+
+    Raises:
+        ValueError: If a range is malformed or spans major versions
+    """
+    versions = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if ".." not in item:
+            versions.append(get_kubernetes_version(item))
+            continue
+
+        start, _, end = item.partition("..")
+        start, end = get_kubernetes_version(start.strip()), get_kubernetes_version(end.strip())
+        first, last = parse_k8s_version(start), parse_k8s_version(end)
+        if first.major != last.major or first > last:
+            raise ValueError(f"Invalid version range '{item}'")
+        versions.append(start)
+        versions.extend(f"v{first.major}.{minor}" for minor in range(first.minor + 1, last.minor))
+        versions.append(end)
+
+    unique = {}
+    for version in versions:
+        unique.setdefault(parse_k8s_version(version), version)
+    if not unique:
+        raise ValueError(f"No Kubernetes versions in '{spec}'")
+    return [unique[key] for key in sorted(unique)]
+
+
+class MatrixRow:
+    """The verdicts for one resource across the target versions."""
+
+    __slots__ = ('resource', 'changes')
+
+    def __init__(self, resource: K8sResource, changes: List[Optional[BreakingChange]]):
+        self.resource = resource
+        self.changes = changes
+
+    @property
+    def first_breaking_index(self) -> Optional[int]:
+        """Index of the first version the resource breaks in, or None if it never breaks."""
+        return next((i for i, change in enumerate(self.changes) if change is not None), None)
+
+
+class VersionMatrix:
+    """Resource × version matrix of breaking changes."""
+
+    def __init__(self, versions: List[str], rows: List[MatrixRow]):
+        """
+        Initialize the matrix.
+
+        Args:
+            versions: The target versions, in ascending order
+            rows: One row per resource, in file order, then document order
+        """
+        self.versions = versions
+        self.rows = rows
+
+    def first_breaking_version(self, row: MatrixRow) -> Optional[str]:
+        """Get the first target version a row's resource breaks in, or None."""
+        index = row.first_breaking_index
+        return self.versions[index] if index is not None else None
+
+    def breaking_changes(self, version: str) -> List[BreakingChange]:
+        """
+        Get the breaking changes for one of the target versions.
+
+        Args:
+            version: One of the matrix's versions
+
+        Returns:
+            The breaking changes, in the same order as analyze_directory()
+        """
+        column = self.versions.index(version)
+        return [row.changes[column] for row in self.rows if row.changes[column] is not None]
+
+    def format_table(self, base_dir: Optional[str] = None, include_ok: bool = False) -> str:
+        """
+        Format the matrix as a compact text table.
+
+        Each row shows a resource, the first version it breaks in, and an
+        ``X`` for each version it is broken in (``.`` where it is fine).
+
+        Args:
+            base_dir: File paths are shown relative to this directory
+            include_ok: Whether to include resources that break in none of the versions
+
+        Returns:
+            The table
+        """
+        rows = [row for row in self.rows if include_ok or row.first_breaking_index is not None]
+
+        def file_label(path: str) -> str:
+            return os.path.relpath(path, base_dir) if base_dir else path
+
+        table = [["FILE", "RESOURCE", "BREAKS IN"] + self.versions]
+        for row in rows:
+            table.append(
+                [file_label(row.resource.file_path), str(row.resource),
+                 self.first_breaking_version(row) or "-"] +
+                ["X" if change is not None else "." for change in row.changes]
+            )
+        widths = [max(len(line[i]) for line in table) for i in range(len(table[0]))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in table]
+
+        broken = sum(1 for row in self.rows if row.first_breaking_index is not None)
+        lines.append(f"{broken} of {len(self.rows)} resources break in at least one version")
+        return "\n".join(lines)
+
+
+def check_resource_versions(resource: K8sResource, versions: Sequence[str],
+                            tiers: Optional[List[str]] = None) -> List[Optional[BreakingChange]]:
+    """
+    Check a resource against several target versions.
+    
+    The versions are checked in ascending order. Every version gets the
+    static rules for that version, which are run once per version. A
+    breaking change found by the model or docs tiers is reused for the later
+    versions without asking them again, until a static rule applies; API and
+    field deprecations are checked again for every version, since they can
+    become removals.
+
+    Args:
+        resource: The Kubernetes resource to check
+        versions: The target versions, in ascending order
+        tiers: Tier names in the order to try them. If None, the
+            ``analysis.resolution_order`` configuration setting is used.
+
+    Returns:
+        The breaking change (or None) for each version
+    """
+    use_static = "static" in resolve_tier_order(tiers)
+    changes = []
+    # A network finding that doesn't depend on the version
+    reusable = None
+    for version in versions:
+        static_change = check_static(resource, version) if use_static else None
+        if reusable is not None and static_change is None:
+            changes.append(reusable)
+            continue
+        
+        breaking_change = _check_tiers(resource, version, tiers, static_change if use_static else _UNCHECKED)
+        reusable = None
+        if (breaking_change is not None and static_change is None and
+                breaking_change.change_type not in ("API_DEPRECATED", "FIELD_DEPRECATED")):
+            reusable = breaking_change
+        changes.append(breaking_change)
+    return changes
+
+
+def _build_matrix_filter(versions: Sequence[str], tier_order: List[str]) -> DocumentFilter:
+    """Build a pre-scan filter wanting every document some version could flag."""
+    # Removals only accumulate and stable APIs stay stable, so the newest
+    # version has the widest include set and the oldest the narrowest exclude set
+    newest = build_document_filter(versions[-1], tier_order)
+    oldest = build_document_filter(versions[0], tier_order)
+    return DocumentFilter(include=newest.include, exclude=oldest.exclude, include_kinds=newest.include_kinds)
+
+
+def analyze_matrix(directory_path: str, target_k8s_versions: Sequence[str],
+                   workers: Optional[int] = None,
+                   max_in_flight: Optional[int] = None) -> VersionMatrix:
+    """
+    Analyze a directory against several target Kubernetes versions at once.
+
+    The repository is walked and parsed once, and each resource is checked
+    against every version. Model prefetching and the incremental analysis
+    cache are not used.
+
+    Args:
+        directory_path: Path to the directory containing Kubernetes YAML files
+        target_k8s_versions: Target Kubernetes versions to check against
+        workers: Number of processes used to parse YAML files. If None, the
+            ``analysis.workers`` configuration setting is used.
+        max_in_flight: Maximum number of resources checked at the same time.
+            If None, the ``concurrency.max_in_flight`` setting is used.
+
+    Returns:
+        The resource × version matrix
+    """
+    versions = sorted(dict.fromkeys(target_k8s_versions), key=parse_k8s_version)
+    if not versions:
+        raise ValueError("At least one target Kubernetes version is required")
+    logger.info(f"Analyzing directory: {directory_path} against {', '.join(versions)}")
+
+    with RunState().activate():
+        return _analyze_matrix(directory_path, versions, workers, max_in_flight)
+
+
+def _analyze_matrix(directory_path: str, versions: List[str], workers: Optional[int],
+                    max_in_flight: Optional[int]) -> VersionMatrix:
+    """Run analyze_matrix() in the current run."""
+    max_in_flight = resolve_max_in_flight(max_in_flight)
+    config = load_config()
+    max_window = max(1, config.get("analysis", {}).get("stream_window", 256))
+    tier_order = resolve_tier_order()
+
+    document_filter = None
+    if config.get("analysis", {}).get("prescan", False):
+        document_filter = _build_matrix_filter(versions, tier_order)
+
+    parsed_files = iter_parsed_files(
+        iter_yaml_files(directory_path), workers=resolve_worker_count(workers),
+        document_filter=document_filter
+    )
+
+    def check(resource: K8sResource) -> List[Optional[BreakingChange]]:
+        return check_resource_versions(resource, versions, tier_order)
+
+    rows = []
+    window = []
+
+    def flush_window():
+        if max_in_flight > 1 and len(window) > 1:
+            with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="kupa-check") as executor:
+                all_changes = list(executor.map(bind_run(check), window))
+        else:
+            all_changes = [check(resource) for resource in window]
+
+        for resource, changes in zip(window, all_changes):
+            if not any(changes):
+                resource.release()
+            rows.append(MatrixRow(resource, changes))
+        window.clear()
+
+    try:
+        for _, resources in parsed_files:
+            window.extend(resources)
+            if len(window) >= max_window:
+                flush_window()
+        if window:
+            flush_window()
+    finally:
+        parsed_files.close()
+
+    matrix = VersionMatrix(versions, rows)
+    for column, version in enumerate(versions):
+        broken = sum(1 for row in rows if row.changes[column] is not None)
+        logger.info(f"{version}: {broken} breaking changes")
+    _log_run_stats()
+    return matrix
@@ -0,0 +1,246 @@
+"""
+Header pre-scan for YAML manifests.
+
+Multi-document files are split on ``---`` document markers and the
+top-level ``apiVersion`` and ``kind`` of each document are read with a
+byte-level scan, without parsing the YAML. Only documents whose
+(kind, apiVersion) could produce a finding are then fully parsed, so large
+ConfigMaps and CRD schemas that can never be flagged are skipped. Whenever
+the scan can't be sure what a document contains, the caller falls back to a
+full parse of the file.
+
+Documents are parsed one at a time, and the byte span of each one is kept,
+so a resource's content can be dropped and parsed again from its file on
+demand.
+"""
+
+import os
+import re
+import mmap
+import zlib
+import logging
+from typing import Any, FrozenSet, List, Optional, Tuple
+
+from kupa import yaml_io
+
+logger = logging.getLogger('kupa.analyzer.prescan')
+
+# (byte offset, length, CRC-32) of a document within its file
+Span = Tuple[int, int, int]
+
+# Files at least this large are scanned through mmap instead of being read into memory
+MMAP_THRESHOLD = 1 << 20
+
+# A document marker: "---" at the start of a line, followed by whitespace or the end of the line
+_DOCUMENT_MARKER = re.compile(rb'^---[ \t]*(?:#[^\r\n]*)?(?:\r?\n|$)', re.MULTILINE)
+_MARKER_WITH_CONTENT = re.compile(rb'^---[ \t]+[^#\s]', re.MULTILINE)
+_DOCUMENT_END = re.compile(rb'^\.\.\.[ \t]*(?:#[^\r\n]*)?$', re.MULTILINE)
+_DIRECTIVE = re.compile(rb'^%', re.MULTILINE)
+
+# A top-level "key: value" line for the two header fields
+_HEADER_FIELD = re.compile(
+    rb'^(apiVersion|kind)[ \t]*:[ \t]*([^\r\n]*?)[ \t]*(?:[ \t]#[^\r\n]*)?\r?$', re.MULTILINE
+)
+# Plain scalars that need no YAML interpretation, optionally in simple quotes
+_SIMPLE_VALUE = re.compile(rb'^(?:"([A-Za-z0-9./_-]+)"|\'([A-Za-z0-9./_-]+)\'|([A-Za-z0-9][A-Za-z0-9./_-]*))$')
+
+
+class DocumentFilter:
+    """Decides from its (kind, apiVersion) whether a document needs to be parsed."""
+
+    def __init__(self, include: Optional[FrozenSet[Tuple[str, str]]] = None,
+                 exclude: FrozenSet[Tuple[str, str]] = frozenset(),
+                 include_kinds: FrozenSet[str] = frozenset()):
+        """
+        Initialize the filter.
+
+        Args:
+            include: If not None, only these (kind, apiVersion) pairs are parsed
+            exclude: (kind, apiVersion) pairs that are never parsed
+            include_kinds: With ``include``, kinds that are parsed whatever
+                their apiVersion
+        """
+        self.include = include
+        self.exclude = exclude
+        self.include_kinds = include_kinds
+
+    def wants(self, kind: str, api_version: str) -> bool:
+        """Check whether a document with this kind and apiVersion should be parsed."""
+        key = (kind, api_version)
+        if key in self.exclude:
+            return False
+        return self.include is None or key in self.include or kind in self.include_kinds
+
+
+def _header_value(raw: bytes) -> Optional[str]:
+    """Get the value of a header field, or None if it isn't a simple scalar."""
+    match = _SIMPLE_VALUE.match(raw)
+    if match is None:
+        return None
+    value = next(group for group in match.groups() if group is not None)
+    # Plain scalars YAML would resolve to something other than a string
+    if value.lower() in (b"null", b"true", b"false", b"yes", b"no", b"on", b"off", b"y", b"n", b"~"):
+        return None
+    return value.decode('ascii')
+
+
+def scan_header(document: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Read the top-level kind and apiVersion of a single YAML document.
+
+    Args:
+        document: The bytes of the document, without its ``---`` marker
+
+    Returns:
+        (kind, apiVersion), or None if the scan is ambiguous
+    """
+    fields = {}
+    for match in _HEADER_FIELD.finditer(document):
+        name = match.group(1)
+        if name in fields:
+            # Duplicate keys: let the parser decide which one wins
+            return None
+        fields[name] = _header_value(match.group(2))
+
+    kind = fields.get(b"kind")
+    api_version = fields.get(b"apiVersion")
+    if kind is None or api_version is None:
+        return None
+    return kind, api_version
+
+
+def split_documents(data: Any) -> Optional[List[Tuple[int, int]]]:
+    """
+    Split a multi-document YAML stream on its ``---`` markers.
+
+    Args:
+        data: The file content (bytes or mmap)
+
+    Returns:
+        (start, end) byte offsets of each document's content, or None if
+        the stream uses constructs the split can't handle (directives,
+        content on a marker line, explicit document end markers)
+    """
+    if _DIRECTIVE.search(data) or _MARKER_WITH_CONTENT.search(data) or _DOCUMENT_END.search(data):
+        return None
+
+    spans = []
+    start = 0
+    for marker in _DOCUMENT_MARKER.finditer(data):
+        spans.append((start, marker.start()))
+        start = marker.end()
+    spans.append((start, len(data)))
+    return spans
+
+
+def _is_blank(document: bytes) -> bool:
+    """Check whether a document has nothing but whitespace and comments."""
+    return all(not line.strip() or line.lstrip().startswith(b"#") for line in document.splitlines())
+
+
+def _load_relevant(data: Any, document_filter: Optional[DocumentFilter]) -> Optional[List[Tuple[Any, Span]]]:
+    """Parse the documents of a stream that the filter wants, or None if the scan is ambiguous."""
+    if data[:3] == b'\xef\xbb\xbf':
+        return None
+
+    spans = split_documents(data)
+    if spans is None:
+        return None
+
+    documents = []
+    for start, end in spans:
+        document = data[start:end]
+        if _is_blank(document):
+            continue
+
+        header = None
+        if document_filter is not None:
+            header = scan_header(document)
+            if header is None:
+                return None
+            if not document_filter.wants(*header):
+                continue
+
+        parsed = yaml_io.load(document)
+        # The header scan has to agree with the parser, or the scan can't be trusted
+        if header is not None and (not isinstance(parsed, dict) or
+                                   (parsed.get("kind"), parsed.get("apiVersion")) != header):
+            return None
+        documents.append((parsed, (start, end - start, zlib.crc32(document))))
+    return documents
+
+
+def prescan_documents(file_path: str,
+                      document_filter: Optional[DocumentFilter] = None) -> Optional[List[Tuple[Any, Span]]]:
+    """
+    Parse the documents of a YAML file one by one, keeping where each one is.
+
+    With a filter, only the documents the filter wants are parsed.
+
+    Args:
+        file_path: Path of the YAML file
+        document_filter: Decides which documents need to be parsed. If None,
+            every document is parsed.
+
+    Returns:
+        (document, span) pairs in file order, where span is the document's
+        (byte offset, length, CRC-32), or None if the file has to be parsed
+        in full because the pre-scan was ambiguous
+
+    Raises:
+        OSError: If the file can't be read
+        yaml.YAMLError: If a wanted document isn't valid YAML
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        if size < MMAP_THRESHOLD:
+            return _load_relevant(f.read(), document_filter)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _load_relevant(data, document_filter)
+
+
+def prescan_data(data: bytes, document_filter: Optional[DocumentFilter] = None) -> Optional[List[Tuple[Any, Span]]]:
+    """
+    Parse the documents of in-memory YAML content one by one, keeping where each one is.
+
+    Args:
+        data: The content of a YAML file
+        document_filter: Decides which documents need to be parsed. If None,
+            every document is parsed.
+
+    Returns:
+        (document, span) pairs in order, as prescan_documents() returns
+        them, or None if the content has to be parsed in full
+
+    Raises:
+        yaml.YAMLError: If a wanted document isn't valid YAML
+    """
+    if not data:
+        return []
+    return _load_relevant(data, document_filter)
+
+
+def load_span(file_path: str, span: Span) -> Any:
+    """
+    Parse a single document again from its span in a file.
+
+    Args:
+        file_path: Path of the YAML file
+        span: (byte offset, length, CRC-32) from prescan_documents()
+
+    Returns:
+        The parsed document
+
+    Raises:
+        ValueError: If the file changed since the span was recorded
+    """
+    offset, length, checksum = span
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        document = f.read(length)
+    if len(document) != length or zlib.crc32(document) != checksum:
+        raise ValueError(f"{file_path} changed since it was parsed")
+    return yaml_io.load(document)
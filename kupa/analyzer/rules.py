@@ -0,0 +1,217 @@
+"""
+Static rule engine for removed Kubernetes API versions.
+
+Rules are loaded from data files shipped in ``kupa/analyzer/data`` and
+indexed by group/version/kind. Version boundaries are parsed into integer
+tuples once, when the rules are loaded, and a dispatch table from
+(kind, apiVersion) to the applicable removal is built once per target
+version, so checking a resource is a single dictionary lookup.
+"""
+
+import os
+import re
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from kupa import yaml_io
+
+logger = logging.getLogger('kupa.analyzer.rules')
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+API_REMOVALS_FILE = os.path.join(DATA_DIR, "api_removals.yaml")
+
+VersionTuple = Tuple[int, int, int]
+
+_VERSION_NUMBER = re.compile(r'^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?')
+
+
+@lru_cache(maxsize=None)
+def version_tuple(version: str) -> VersionTuple:
+    """
+    Parse a Kubernetes version into a (major, minor, patch) tuple.
+
+    Args:
+        version: A version such as ``v1.25``, ``1.25.3`` or ``v1.28.0-rc.1``
+            (pre-release suffixes are ignored)
+
+    Returns:
+        The version as a tuple of integers
+
+    Raises:
+        ValueError: If the version doesn't start with a version number
+    """
+    match = _VERSION_NUMBER.match(version.strip())
+    if match is None:
+        raise ValueError(f"Invalid Kubernetes version '{version}'")
+    return tuple(int(part or 0) for part in match.groups())
+
+
+def split_api_version(api_version: str) -> Tuple[str, str]:
+    """Split an apiVersion into its group ('' for the core group) and version."""
+    group, _, version = api_version.rpartition("/")
+    return group, version
+
+
+class ApiRemoval(NamedTuple):
+    """A group/version that is no longer served for a kind."""
+
+    group: str
+    version: str
+    kind: str
+    removed_in: VersionTuple
+    replacement: Optional[str]
+    action: Optional[str] = None
+
+    @property
+    def api_version(self) -> str:
+        """The removed apiVersion, as written in manifests."""
+        return f"{self.group}/{self.version}" if self.group else self.version
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """The (kind, apiVersion) the removal applies to."""
+        return self.kind, self.api_version
+
+    @property
+    def removed_in_label(self) -> str:
+        """The Kubernetes release the API was removed in, e.g. ``v1.22``."""
+        return f"v{self.removed_in[0]}.{self.removed_in[1]}"
+
+    @property
+    def description(self) -> str:
+        """A human-readable description of the removal."""
+        removed = f"{self.api_version} {self.kind} was removed in Kubernetes {self.removed_in_label}."
+        if self.replacement:
+            return f"{removed} Use {self.replacement} instead."
+        return f"{removed} There is no replacement API."
+
+    @property
+    def recommended_action(self) -> str:
+        """What to do about the removal."""
+        if self.replacement:
+            return f"Update apiVersion to {self.replacement}"
+        return self.action or f"Remove the {self.kind}"
+
+
+def load_api_removals(path: str = API_REMOVALS_FILE) -> List[ApiRemoval]:
+    """
+    Load API removal rules from a data file.
+
+    Args:
+        path: Path of the YAML data file
+
+    Returns:
+        One rule per (group, version, kind)
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    with open(path, 'r') as f:
+        data = yaml_io.load(f) or {}
+
+    rules = []
+    for entry in data.get("removals", []):
+        try:
+            removed_in = version_tuple(str(entry["removed_in"]))
+            for kind in entry["kinds"]:
+                rules.append(ApiRemoval(
+                    group=entry.get("group") or "",
+                    version=entry["version"],
+                    kind=kind,
+                    removed_in=removed_in,
+                    replacement=entry.get("replacement"),
+                    action=entry.get("action")
+                ))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid API removal rule in {path}: {entry!r}") from e
+    return rules
+
+
+class ApiRemovalIndex:
+    """API removal rules indexed by group/version/kind, with a dispatch table per target version."""
+
+    def __init__(self, rules: Iterable[ApiRemoval]):
+        """
+        Index the rules.
+
+        Args:
+            rules: The API removal rules. For duplicate (group, version, kind)
+                entries the last one wins.
+        """
+        self.by_gvk: Dict[Tuple[str, str, str], ApiRemoval] = {}
+        for rule in rules:
+            self.by_gvk[(rule.group, rule.version, rule.kind)] = rule
+        self._dispatch: Dict[VersionTuple, Dict[Tuple[str, str], ApiRemoval]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self) -> List[ApiRemoval]:
+        """All rules, in load order."""
+        return list(self.by_gvk.values())
+
+    def _build_dispatch(self, target: VersionTuple) -> Dict[Tuple[str, str], ApiRemoval]:
+        """Build the (kind, apiVersion) -> removal table for a target version."""
+        removed = {rule.key: rule for rule in self.by_gvk.values() if rule.removed_in <= target}
+
+        dispatch = {}
+        for key, rule in removed.items():
+            # Follow replacements that are themselves removed by the target version
+            replacement, seen = rule.replacement, {key}
+            while replacement and (rule.kind, replacement) in removed and (rule.kind, replacement) not in seen:
+                seen.add((rule.kind, replacement))
+                replacement = removed[(rule.kind, replacement)].replacement
+            dispatch[key] = rule._replace(replacement=replacement)
+        return dispatch
+
+    def for_target(self, target_k8s_version: str) -> Dict[Tuple[str, str], ApiRemoval]:
+        """
+        Get the dispatch table for a target version.
+
+        Args:
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            Mapping from (kind, apiVersion) to the removal that applies in the
+            target version, with the replacement resolved to an apiVersion
+            still served in it. Must not be modified.
+        """
+        target = version_tuple(target_k8s_version)
+        dispatch = self._dispatch.get(target)
+        if dispatch is None:
+            with self._lock:
+                dispatch = self._dispatch.get(target)
+                if dispatch is None:
+                    dispatch = self._build_dispatch(target)
+                    self._dispatch[target] = dispatch
+        return dispatch
+
+    def lookup(self, kind: str, api_version: str, target_k8s_version: str) -> Optional[ApiRemoval]:
+        """
+        Find the removal that applies to a resource in a target version.
+
+        Args:
+            kind: The resource kind
+            api_version: The resource apiVersion
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            The removal, or None if the apiVersion is still served
+        """
+        return self.for_target(target_k8s_version).get((kind, api_version))
+
+
+_index: Optional[ApiRemovalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_api_removal_index() -> ApiRemovalIndex:
+    """Get the process-wide index of the packaged API removal rules, loading it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ApiRemovalIndex(load_api_removals())
+                logger.debug(f"Loaded {len(_index.by_gvk)} API removal rules")
+    return _index
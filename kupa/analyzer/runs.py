@@ -0,0 +1,75 @@
+"""
+Per-run state for analyses.
+
+Each analysis run (a directory, a version matrix, a set of uploads) has its
+own tier counters, prompt slimming counters and prefetched model verdicts,
+so runs in the same process, such as concurrent API jobs, don't clear or
+count into each other's state. The active run is tracked with a context
+variable; code running on pool threads sees it when the callable is wrapped
+with bind_run(). Outside any run, a process-wide default run is used.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger('kupa.analyzer.runs')
+
+
+class RunState:
+    """The counters, prefetched verdicts and fetched docs of one analysis run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Resources checked and resolved per tier (see kupa.analyzer.tiers)
+        self.tier_calls: Dict[str, int] = {}
+        self.tier_hits: Dict[str, int] = {}
+        self.tier_errors: Dict[str, int] = {}
+        # The resources (by id) a tier failed for while they were checked
+        self.failed_resources: Set[int] = set()
+        # Prompt slimming counters (see kupa.mcp.slimming)
+        self.slimming = {"resources": 0, "original_tokens": 0, "slimmed_tokens": 0}
+        # Model verdicts fetched ahead of the per-resource checks, by cache key (None if the fetch failed)
+        self.prefetched: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Changelog and API reference documents fetched during the run (see kupa.mcp.external_fetcher)
+        self.docs_cache = None
+
+    @contextmanager
+    def activate(self):
+        """Make this the current run for the code in the ``with`` block."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+_current: ContextVar[Optional[RunState]] = ContextVar('kupa_run', default=None)
+_default_run = RunState()
+
+
+def current_run() -> RunState:
+    """Get the active run, or the process-wide default run outside of one."""
+    return _current.get() or _default_run
+
+
+def bind_run(func: Callable) -> Callable:
+    """
+    Bind a callable to the current run, for calling it on another thread.
+
+    Args:
+        func: The callable, e.g. a task for a thread pool
+
+    Returns:
+        A wrapper that runs func with the run that was current when bind_run() was called
+    """
+    run = current_run()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with run.activate():
+            return func(*args, **kwargs)
+    return wrapper
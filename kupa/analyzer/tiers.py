@@ -0,0 +1,154 @@
+"""
+Resolution tiers for breaking change checks.
+
+A resource is checked against a sequence of tiers: the static rules for
+removed API versions, the Ollama model, the OpenAI model and the
+Kubernetes documentation. The first tier that finds a breaking change
+wins, so the order decides how many model and network calls are made.
+Hits, calls and errors are counted per tier, in the current run's state
+(see kupa.analyzer.runs), so a run can report what was avoided. The
+resources a tier failed for are remembered too, so their verdicts aren't
+cached as if every tier had answered.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from kupa.config import load_config
+from kupa.analyzer.runs import current_run
+
+logger = logging.getLogger('kupa.analyzer.tiers')
+
+TIERS = ("static", "ollama", "openai", "docs")
+
+# Cheapest first: a deterministic static hit never needs the network
+DEFAULT_TIER_ORDER = ("static", "ollama", "openai", "docs")
+
+
+def resolve_tier_order(tiers: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Resolve the order in which the resolution tiers are consulted.
+
+    Args:
+        tiers: Tier names in the order to try them. If None, the
+            ``analysis.resolution_order`` configuration setting is used.
+
+    Returns:
+        The tier names, with unknown and duplicate names removed
+    """
+    if tiers is None:
+        config = load_config()
+        tiers = config.get("analysis", {}).get("resolution_order", DEFAULT_TIER_ORDER)
+
+    order = []
+    for tier in tiers:
+        if tier not in TIERS:
+            logger.warning(f"Ignoring unknown resolution tier '{tier}'. Known tiers: {', '.join(TIERS)}")
+        elif tier not in order:
+            order.append(tier)
+    return order
+
+
+def skip_stable_enabled() -> bool:
+    """Check whether known-stable resources skip the model and docs tiers (``analysis.skip_stable``)."""
+    config = load_config()
+    return config.get("analysis", {}).get("skip_stable", True)
+
+
+def record_tier_call(tier: str) -> None:
+    """Count a resource being checked by a tier."""
+    run = current_run()
+    with run.lock:
+        run.tier_calls[tier] = run.tier_calls.get(tier, 0) + 1
+
+
+def record_tier_hit(tier: str) -> None:
+    """
+    Count a resource being resolved by a tier.
+
+    Besides the tier names, ``stable`` counts resources skipped because
+    their API version is known to be stable and ``none`` counts resources
+    no tier found a breaking change for.
+    """
+    run = current_run()
+    with run.lock:
+        run.tier_hits[tier] = run.tier_hits.get(tier, 0) + 1
+
+
+def record_tier_error(tier: str, resource: Any) -> None:
+    """Count a tier failing for a resource, and remember the resource."""
+    run = current_run()
+    with run.lock:
+        run.tier_errors[tier] = run.tier_errors.get(tier, 0) + 1
+        run.failed_resources.add(id(resource))
+
+
+def pop_tier_errors(resources: Sequence[Any]) -> List[bool]:
+    """
+    Check which resources a tier failed for, and forget them.
+
+    Resources are remembered by identity, so call this while the checked
+    resources are still referenced.
+
+    Args:
+        resources: The checked resources
+
+    Returns:
+        Whether a tier failed while checking each resource
+    """
+    run = current_run()
+    with run.lock:
+        failed = [id(resource) in run.failed_resources for resource in resources]
+        run.failed_resources.difference_update(id(resource) for resource in resources)
+    return failed
+
+
+def get_tier_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get the per-tier counters of the current run.
+
+    Returns:
+        Dictionary with ``calls`` (resources checked per tier), ``hits``
+        (resources resolved per tier, plus ``stable`` and ``none``) and
+        ``errors`` (resources a tier failed for)
+    """
+    run = current_run()
+    with run.lock:
+        return {"calls": dict(run.tier_calls), "hits": dict(run.tier_hits), "errors": dict(run.tier_errors)}
+
+
+def reset_tier_stats() -> None:
+    """Reset the per-tier counters of the current run."""
+    run = current_run()
+    with run.lock:
+        run.tier_calls.clear()
+        run.tier_hits.clear()
+        run.tier_errors.clear()
+        run.failed_resources.clear()
+
+
+def format_tier_stats(stats: Optional[Dict[str, Dict[str, int]]] = None) -> str:
+    """
+    Format the per-tier counters for a log line.
+
+    Args:
+        stats: Counters from get_tier_stats(). Fetched if None.
+
+    Returns:
+        A summary such as ``static 3/10, openai 1/7 (2 errors), docs 0/6, stable 2, none 4``
+    """
+    if stats is None:
+        stats = get_tier_stats()
+    calls, hits, errors = stats["calls"], stats["hits"], stats.get("errors", {})
+
+    parts = []
+    for tier in TIERS:
+        if calls.get(tier):
+            part = f"{tier} {hits.get(tier, 0)}/{calls[tier]}"
+            if errors.get(tier):
+                part += f" ({errors[tier]} errors)"
+            parts.append(part)
+    for outcome in ("stable", "none"):
+        if hits.get(outcome):
+            parts.append(f"{outcome} {hits[outcome]}")
+    return ", ".join(parts)
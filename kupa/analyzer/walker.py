@@ -0,0 +1,272 @@
+"""
+Repository walker for finding Kubernetes YAML files.
+
+The walk is built on ``os.scandir`` and yields paths lazily, so parsing can
+start before the walk finishes. Known-heavy directories (``.git``,
+``node_modules``, vendored dependencies, build output) are pruned, patterns
+from ``.gitignore`` and ``.kupaignore`` files are honoured, oversized files
+and overly deep directories are skipped, and symlinked directories are
+followed at most once so symlink loops can't make the walk run forever.
+"""
+
+import os
+import re
+import logging
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from kupa.config import load_config
+
+logger = logging.getLogger('kupa.analyzer.walker')
+
+IGNORE_FILES = (".gitignore", ".kupaignore")
+
+DEFAULT_EXCLUDE_DIRS = (
+    ".git", ".hg", ".svn", "node_modules", "vendor", "__pycache__", ".venv", "venv",
+    ".tox", ".terraform", "dist", "build", "target", ".kupa-cache"
+)
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+def _translate_pattern(pattern: str) -> str:
+    """Translate the glob part of a gitignore pattern to a regular expression."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+
+class IgnoreRules:
+    """Patterns from one ignore file, applying to the directory it is in and below."""
+
+    def __init__(self, base: str, lines: Sequence[str]):
+        """
+        Parse the patterns of an ignore file, using gitignore syntax.
+
+        Args:
+            base: Directory of the ignore file, relative to the walk root
+                ('' for the root itself), with '/' separators
+            lines: The lines of the ignore file
+        """
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+
+        for line in lines:
+            line = line.rstrip("\n").rstrip("\r")
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            # A slash anywhere but the end anchors the pattern to the ignore file's directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            prefix = "" if anchored else "(?:.*/)?"
+            regex = re.compile(f"^{prefix}{_translate_pattern(line)}$")
+            self.rules.append((regex, negated, dir_only))
+
+    @classmethod
+    def from_file(cls, path: str, base: str) -> Optional["IgnoreRules"]:
+        """Load the rules of an ignore file, or None if it can't be read or is empty."""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                rules = cls(base, f.readlines())
+        except OSError as e:
+            logger.warning(f"Could not read ignore file {path}: {e}")
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against the rules. The last matching rule wins.
+
+        Args:
+            rel_path: Path relative to the walk root, with '/' separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path is ignored, False if a negated rule re-includes
+            it, or None if no rule matches
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+def _is_ignored(rules: List[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+    """Apply the ignore files from the root down; deeper files override shallower ones."""
+    ignored = False
+    for ignore_rules in rules:
+        result = ignore_rules.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def _get_walk_config() -> dict:
+    """Get the ``analysis.walk`` configuration section."""
+    return load_config().get("analysis", {}).get("walk", {})
+
+
+def iter_yaml_files(path: str, max_file_size: Optional[int] = None, max_depth: Optional[int] = None,
+                    exclude_dirs: Optional[Sequence[str]] = None,
+                    follow_symlinks: Optional[bool] = None,
+                    use_ignore_files: Optional[bool] = None) -> Iterator[str]:
+    """
+    Find YAML files under a path, lazily.
+
+    Files are yielded in a stable order: the files of a directory (sorted by
+    name) before its subdirectories (also sorted). Settings left as None are
+    read from the ``analysis.walk`` configuration section.
+
+    Args:
+        path: Directory to walk, or a single YAML file
+        max_file_size: Files larger than this many bytes are skipped (0 = no limit)
+        max_depth: Directories nested deeper than this are skipped (0 = no limit)
+        exclude_dirs: Directory names that are never entered
+        follow_symlinks: Whether to descend into symlinked directories
+        use_ignore_files: Whether to honour .gitignore and .kupaignore files
+
+    Yields:
+        Paths of the YAML files found
+    """
+    walk_config = _get_walk_config()
+    if max_file_size is None:
+        max_file_size = walk_config.get("max_file_size", 10 * 1024 * 1024)
+    if max_depth is None:
+        max_depth = walk_config.get("max_depth", 50)
+    if exclude_dirs is None:
+        exclude_dirs = walk_config.get("exclude_dirs", DEFAULT_EXCLUDE_DIRS)
+    if follow_symlinks is None:
+        follow_symlinks = walk_config.get("follow_symlinks", True)
+    if use_ignore_files is None:
+        use_ignore_files = walk_config.get("ignore_files", True)
+    exclude_dirs = set(exclude_dirs)
+
+    def size_ok(file_path: str, size: int) -> bool:
+        if max_file_size and size > max_file_size:
+            logger.warning(f"Skipping {file_path}: {size} bytes exceeds the {max_file_size} byte limit")
+            return False
+        return True
+
+    # Check if path is a file
+    if os.path.isfile(path):
+        if path.endswith(YAML_EXTENSIONS) and size_ok(path, os.path.getsize(path)):
+            yield path
+        return
+
+    try:
+        root_stat = os.stat(path)
+    except OSError as e:
+        logger.warning(f"Cannot access {path}: {e}")
+        return
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+
+    # Depth-first, with each directory's ignore rules stacked on its parent's
+    stack = [(path, "", 0, [])]
+    while stack:
+        directory, rel_dir, depth, rules = stack.pop()
+
+        if use_ignore_files:
+            rules = list(rules)
+            for ignore_file in IGNORE_FILES:
+                ignore_path = os.path.join(directory, ignore_file)
+                if os.path.isfile(ignore_path):
+                    ignore_rules = IgnoreRules.from_file(ignore_path, rel_dir)
+                    if ignore_rules is not None:
+                        rules.append(ignore_rules)
+
+        try:
+            with os.scandir(directory) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Cannot read directory {directory}: {e}")
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if is_dir:
+                if entry.name in exclude_dirs or (rules and _is_ignored(rules, rel_path, True)):
+                    continue
+                if max_depth and depth + 1 > max_depth:
+                    logger.warning(f"Skipping {entry.path}: deeper than the maximum depth of {max_depth}")
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                key = (stat.st_dev, stat.st_ino)
+                if key in visited:
+                    logger.warning(f"Skipping {entry.path}: directory already visited (symlink loop)")
+                    continue
+                visited.add(key)
+                subdirectories.append((entry.path, rel_path, depth + 1, rules))
+
+            elif is_file and entry.name.endswith(YAML_EXTENSIONS):
+                if rules and _is_ignored(rules, rel_path, False):
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if size_ok(entry.path, size):
+                    yield entry.path
+
+        # Reversed, so subdirectories are popped in sorted order
+        stack.extend(reversed(subdirectories))
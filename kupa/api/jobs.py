@@ -0,0 +1,255 @@
+"""
+Background jobs for the API.
+
+Analyses can take minutes on large repositories, and the analyzer, git and
+the GitHub client all block. The API therefore queues each analysis as a
+job, runs it on a bounded pool of worker threads off the event loop, and
+lets clients poll for its status, progress and result. The number of jobs
+waiting for a worker is limited, finished jobs are forgotten once their TTL
+has passed, and jobs can be cancelled: a queued job never starts, and a
+running job stops at its next cancellation check.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from kupa.config import load_config
+
+logger = logging.getLogger('kupa.api.jobs')
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    """Format a time.time() value for the API, or None."""
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+class Job:
+    """An analysis run in the background."""
+
+    def __init__(self, kind: str):
+        """
+        Initialize the job.
+
+        Args:
+            kind: What the job does (e.g. ``upload`` or ``github``)
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job succeeded, failed or was cancelled."""
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Whether the job has been asked to stop."""
+        return self._cancel.is_set()
+
+    def update(self, **progress) -> None:
+        """Update the progress reported for the job (e.g. ``stage`` or counters)."""
+        self.progress = dict(self.progress, **progress)
+
+    def check_cancelled(self) -> None:
+        """
+        Stop the job if it has been cancelled. Jobs call this between steps.
+
+        Raises:
+            JobCancelled: If the job has been cancelled
+        """
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the job to the JSON format returned by the API."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": _timestamp(self.created_at),
+            "started_at": _timestamp(self.started_at),
+            "finished_at": _timestamp(self.finished_at)
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded worker pool and keeps them until their TTL expires."""
+
+    def __init__(self, workers: int = 2, max_queued: int = 16, ttl: float = 3600):
+        """
+        Initialize the manager.
+
+        Args:
+            workers: Number of jobs run at the same time
+            max_queued: Number of jobs that can wait for a worker
+            ttl: Seconds a finished job is kept for clients to fetch
+        """
+        self.workers = max(1, workers)
+        self.max_queued = max(0, max_queued)
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kupa-job")
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: What the job does
+            func: Called as ``func(job, *args, **kwargs)`` on a worker thread.
+                Its return value becomes the job's result. It should call
+                ``job.check_cancelled()`` between steps and may report
+                progress with ``job.update()``.
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobQueueFull: If ``max_queued`` jobs are already waiting for a worker
+        """
+        self.purge_expired()
+        job = Job(kind)
+        with self._lock:
+            queued = sum(1 for other in self._jobs.values() if other.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs are already waiting")
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """Run a job on a worker thread and record how it ended."""
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+
+        try:
+            result = func(job, *args, **kwargs)
+            status, error = SUCCEEDED, None
+        except JobCancelled:
+            result, status, error = None, CANCELLED, None
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            result, status, error = None, FAILED, str(e)
+
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = status
+            job.finished_at = time.time()
+        logger.info(f"Job {job.id} {status} after {job.finished_at - job.started_at:.1f}s")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id, or None if it doesn't exist or has expired."""
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job.
+
+        A queued job is cancelled at once. A running job is cancelled the
+        next time it checks; until then its status stays ``running``.
+
+        Args:
+            job_id: The job id
+
+        Returns:
+            The job, or None if it doesn't exist or has expired
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.finished:
+                return job
+            job._cancel.set()
+            if job.status == QUEUED:
+                job.future.cancel()
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        logger.info(f"Cancelling job {job.id}")
+        return job
+
+    def purge_expired(self) -> int:
+        """
+        Forget the finished jobs whose TTL has passed.
+
+        Returns:
+            The number of jobs forgotten
+        """
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished_at >= self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def shutdown(self, cancel: bool = True) -> None:
+        """
+        Stop the worker pool.
+
+        Args:
+            cancel: Whether to cancel the queued and running jobs first
+        """
+        if cancel:
+            with self._lock:
+                job_ids = [job_id for job_id, job in self._jobs.items() if not job.finished]
+            for job_id in job_ids:
+                self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Get the process-wide job manager, created from the ``api.jobs`` settings on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                jobs_config = load_config().get("api", {}).get("jobs", {})
+                _manager = JobManager(
+                    workers=jobs_config.get("workers", 2),
+                    max_queued=jobs_config.get("max_queued", 16),
+                    ttl=jobs_config.get("ttl", 3600)
+                )
+    return _manager
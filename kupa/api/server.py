@@ -2,22 +2,27 @@
 API server for providing a web interface to the KuPa tool.
 """
 
+import asyncio
+import json
 import logging
-import tempfile
 import os
+import queue
 import shutil
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from packaging.version import InvalidVersion
 from pydantic import BaseModel
 
-from kupa.analyzer import analyze_directory
+from kupa.analyzer import analyze_documents, iter_breaking_changes, parse_k8s_version, BreakingChange
+from kupa.config import get_kubernetes_version
+from kupa.api.jobs import Job, JobQueueFull, SUCCEEDED, CANCELLED, get_job_manager
 from kupa.github_integration import clone_repo, create_pull_request
-from kupa.output import write_local_results
+from kupa.output import render_updated_files
 
 # Initialize the logger
 logger = logging.getLogger('kupa.api.server')
@@ -41,6 +46,32 @@ class AnalysisResponse(BaseModel):
     pr_url: Optional[str] = None
     file_changes: Optional[List[Dict[str, str]]] = None
 
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    progress: Dict[str, Any] = {}
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+def serialize_breaking_change(change: BreakingChange, base_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Convert a breaking change to the JSON format returned by the API."""
+    file_path = change.resource.file_path
+    return {
+        "resource_kind": change.resource.kind,
+        "resource_api_version": change.resource.api_version,
+        "resource_name": change.resource.name,
+        "resource_namespace": change.resource.namespace,
+        "file_path": os.path.relpath(file_path, base_dir) if base_dir else file_path,
+        "change_type": change.change_type,
+        "description": change.description,
+        "recommended_action": change.recommended_action
+    }
+
 
 @app.get("/")
 def read_root():
@@ -59,153 +90,230 @@ def health_check():
     }
 
 
-@app.post("/analyze/upload", response_model=AnalysisResponse)
-async def analyze_upload(
-    background_tasks: BackgroundTasks,
-    files: List[UploadFile] = File(...),
-    kube_version: str = Form("latest")
-):
-    """Analyze uploaded YAML files for Kubernetes breaking changes."""
+def run_upload_analysis(job: Job, contents: Dict[str, bytes], kube_version: str) -> AnalysisResponse:
+    """Job: analyze uploaded YAML files in memory."""
+    job.update(stage="analyzing", files=len(contents), resources_checked=0)
+    
+    # Stop between windows once cancelled
+    def checkpoint(checked: int) -> None:
+        job.check_cancelled()
+        job.update(resources_checked=checked)
+    
+    results = analyze_documents(contents, kube_version, checkpoint=checkpoint)
+    job.check_cancelled()
+    job.update(stage="rendering", breaking_changes=len(results))
+    
+    if not results:
+        return AnalysisResponse(
+            status="success",
+            message="Analysis complete. No breaking changes found."
+        )
+    return AnalysisResponse(
+        status="success",
+        message=f"Analysis complete. Found {len(results)} breaking changes.",
+        breaking_changes=[serialize_breaking_change(change) for change in results],
+        file_changes=render_updated_files(contents, results)
+    )
+
+
+def run_github_analysis(job: Job, github_request: GithubRequest) -> AnalysisResponse:
+    """Job: analyze a GitHub repository, and create a pull request if requested."""
+    job.update(stage="cloning")
+    temp_dir = clone_repo(github_request.repo_url)
+    
     try:
-        # Create a temp directory for the uploaded files
-        temp_dir = tempfile.mkdtemp()
-        
-        # Save the uploaded files
-        for file in files:
-            if file.filename.endswith(('.yaml', '.yml')):
-                file_path = os.path.join(temp_dir, file.filename)
-                
-                # Make sure the directory exists
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                # Save the file
-                with open(file_path, 'wb') as f:
-                    f.write(await file.read())
+        job.check_cancelled()
+        job.update(stage="analyzing", breaking_changes=0)
         
-        # Analyze the directory
-        results = analyze_directory(temp_dir, kube_version)
+        # Stream the analysis, so progress is reported and cancellation is checked as it goes
+        results = []
+        changes = iter_breaking_changes(temp_dir, github_request.kube_version)
+        try:
+            for change in changes:
+                job.check_cancelled()
+                results.append(change)
+                job.update(breaking_changes=len(results))
+        finally:
+            changes.close()
+        job.check_cancelled()
         
-        if results:
-            # Write the results to files with timestamps
-            write_local_results(temp_dir, results)
-            
-            # Convert results to a serializable format
-            serializable_results = []
-            file_changes = []
-            
-            for change in results:
-                # Add the breaking change info
-                serializable_results.append({
-                    "resource_kind": change.resource.kind,
-                    "resource_api_version": change.resource.api_version,
-                    "resource_name": change.resource.name,
-                    "resource_namespace": change.resource.namespace,
-                    "file_path": os.path.basename(change.resource.file_path),
-                    "change_type": change.change_type,
-                    "description": change.description,
-                    "recommended_action": change.recommended_action
-                })
-                
-                # Check if we've already added this file
-                file_path = os.path.basename(change.resource.file_path)
-                if not any(fc["original_file"] == file_path for fc in file_changes):
-                    # Find the updated file
-                    dir_path = os.path.dirname(change.resource.file_path)
-                    original_name = os.path.basename(change.resource.file_path)
-                    name, ext = os.path.splitext(original_name)
-                    
-                    # Look for updated files
-                    updated_files = [f for f in os.listdir(dir_path) 
-                                     if f.startswith(f"{name}-updated-") and f.endswith(ext)]
-                    
-                    if updated_files:
-                        # Sort by timestamp (part of the filename)
-                        updated_files.sort(reverse=True)
-                        file_changes.append({
-                            "original_file": file_path,
-                            "updated_file": updated_files[0],
-                            "diff_file": f"{updated_files[0]}.diff.txt"
-                        })
-            
-            # Schedule cleanup
-            background_tasks.add_task(lambda: shutil.rmtree(temp_dir))
-            
-            return AnalysisResponse(
-                status="success",
-                message=f"Analysis complete. Found {len(results)} breaking changes.",
-                breaking_changes=serializable_results,
-                file_changes=file_changes
-            )
-        else:
-            # Schedule cleanup
-            background_tasks.add_task(lambda: shutil.rmtree(temp_dir))
-            
+        if not results:
             return AnalysisResponse(
                 status="success",
                 message="Analysis complete. No breaking changes found."
             )
+        
+        # Create PR if requested
+        pr_url = None
+        if github_request.create_pr:
+            job.update(stage="creating_pr")
+            pr_url = create_pull_request(
+                github_request.repo_url, 
+                temp_dir, 
+                results, 
+                github_request.kube_version
+            )
             
-    except Exception as e:
-        logger.error(f"Error analyzing uploaded files: {e}")
-        raise HTTPException(status_code=500, detail=f"Error analyzing files: {str(e)}")
+        return AnalysisResponse(
+            status="success",
+            message=f"Analysis complete. Found {len(results)} breaking changes.{' Pull request created: ' + pr_url if pr_url else ''}",
+            breaking_changes=[serialize_breaking_change(change, temp_dir) for change in results],
+            pr_url=pr_url
+        )
+        
+    finally:
+        # Clean up the temp directory
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-@app.post("/analyze/github", response_model=AnalysisResponse)
-async def analyze_github(github_request: GithubRequest):
-    """Analyze a GitHub repository for Kubernetes breaking changes."""
+def run_github_stream(job: Job, github_request: GithubRequest, output: queue.Queue) -> AnalysisResponse:
+    """Job: analyze a GitHub repository, passing each breaking change to the streaming response."""
+    job.update(stage="cloning")
+    temp_dir = clone_repo(github_request.repo_url)
+    
     try:
-        # Clone the repository
-        temp_dir = clone_repo(github_request.repo_url)
+        job.check_cancelled()
+        job.update(stage="analyzing", breaking_changes=0)
         
+        total = 0
+        changes = iter_breaking_changes(temp_dir, github_request.kube_version)
         try:
-            # Analyze the cloned repo
-            results = analyze_directory(temp_dir, github_request.kube_version)
+            for change in changes:
+                item = serialize_breaking_change(change, temp_dir)
+                # Wait for the client to catch up, but stop if it went away
+                while True:
+                    job.check_cancelled()
+                    try:
+                        output.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                total += 1
+                job.update(breaking_changes=total)
+        finally:
+            changes.close()
+        
+        return AnalysisResponse(
+            status="success",
+            message=f"Analysis complete. Found {total} breaking changes."
+        )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def resolve_kube_version(kube_version: str) -> str:
+    """Resolve a version alias such as ``latest``, answering 422 for a version that doesn't parse."""
+    resolved = get_kubernetes_version(kube_version)
+    try:
+        parse_k8s_version(resolved)
+    except InvalidVersion:
+        raise HTTPException(status_code=422, detail=f"Invalid Kubernetes version: {kube_version}")
+    return resolved
+
+
+def queue_job(kind: str, func, *args) -> Job:
+    """Queue a job, answering 503 when the queue is full."""
+    try:
+        return get_job_manager().submit(kind, func, *args)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Too many queued analyses, try again later ({e})")
+
+
+def submit_job(kind: str, func, *args) -> JobResponse:
+    """Queue a job and describe it for the response."""
+    return JobResponse(**queue_job(kind, func, *args).to_dict())
+
+
+@app.post("/analyze/upload", response_model=JobResponse, status_code=202)
+async def analyze_upload(
+    files: List[UploadFile] = File(...),
+    kube_version: str = Form("latest")
+):
+    """
+    Queue an analysis of uploaded YAML files for Kubernetes breaking changes.
+    
+    The uploads are analyzed in memory and nothing is written to disk. Poll
+    ``GET /jobs/{job_id}`` for the result, which carries the updated
+    content, a unified diff and an explanation for each changed file.
+    """
+    # Read the uploaded YAML files
+    contents = {}
+    for file in files:
+        if file.filename.endswith(('.yaml', '.yml')):
+            contents[file.filename] = await file.read()
+    
+    return submit_job("upload", run_upload_analysis, contents, resolve_kube_version(kube_version))
+
+
+@app.post("/analyze/github", response_model=JobResponse, status_code=202)
+async def analyze_github(github_request: GithubRequest):
+    """
+    Queue an analysis of a GitHub repository for Kubernetes breaking changes.
+    
+    Poll ``GET /jobs/{job_id}`` for the progress and the result.
+    """
+    github_request.kube_version = resolve_kube_version(github_request.kube_version)
+    return submit_job("github", run_github_analysis, github_request)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    """Get the status, progress and (once finished) result of an analysis job."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse(**job.to_dict())
+
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+def cancel_job(job_id: str):
+    """Cancel an analysis job. A running job stops at its next checkpoint."""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse(**job.to_dict())
+
+
+@app.post("/analyze/github/stream")
+def analyze_github_stream(github_request: GithubRequest):
+    """
+    Analyze a GitHub repository and stream the breaking changes as they are found.
+    
+    The response is newline-delimited JSON: one object per breaking change,
+    followed by a final object with ``status`` and ``total``. Pull requests
+    are not created from this endpoint. The analysis runs as a job on the
+    same worker pool as the other analyses; its id is returned in the
+    ``X-Job-Id`` header, and it is cancelled if the client disconnects.
+    """
+    github_request.kube_version = resolve_kube_version(github_request.kube_version)
+    output: queue.Queue = queue.Queue(maxsize=256)
+    job = queue_job("github_stream", run_github_stream, github_request, output)
+    
+    async def stream():
+        try:
+            while True:
+                try:
+                    item = output.get_nowait()
+                except queue.Empty:
+                    # The job puts its last change before it finishes
+                    if job.finished and output.empty():
+                        break
+                    await asyncio.sleep(0.05)
+                    continue
+                yield json.dumps(item) + "\n"
             
-            if results:
-                # Convert results to a serializable format
-                serializable_results = []
-                
-                for change in results:
-                    serializable_results.append({
-                        "resource_kind": change.resource.kind,
-                        "resource_api_version": change.resource.api_version,
-                        "resource_name": change.resource.name,
-                        "resource_namespace": change.resource.namespace,
-                        "file_path": os.path.relpath(change.resource.file_path, temp_dir),
-                        "change_type": change.change_type,
-                        "description": change.description,
-                        "recommended_action": change.recommended_action
-                    })
-                
-                # Create PR if requested
-                pr_url = None
-                if github_request.create_pr:
-                    pr_url = create_pull_request(
-                        github_request.repo_url, 
-                        temp_dir, 
-                        results, 
-                        github_request.kube_version
-                    )
-                    
-                return AnalysisResponse(
-                    status="success",
-                    message=f"Analysis complete. Found {len(results)} breaking changes.{' Pull request created: ' + pr_url if pr_url else ''}",
-                    breaking_changes=serializable_results,
-                    pr_url=pr_url
-                )
+            total = job.progress.get("breaking_changes", 0)
+            if job.status == SUCCEEDED:
+                yield json.dumps({"status": "success", "total": total}) + "\n"
             else:
-                return AnalysisResponse(
-                    status="success",
-                    message="Analysis complete. No breaking changes found."
-                )
-                
+                message = "Analysis was cancelled" if job.status == CANCELLED else job.error
+                logger.error(f"Error analyzing GitHub repository: {message}")
+                yield json.dumps({"status": "error", "message": message, "total": total}) + "\n"
         finally:
-            # Clean up the temp directory
-            shutil.rmtree(temp_dir)
-            
-    except Exception as e:
-        logger.error(f"Error analyzing GitHub repository: {e}")
-        raise HTTPException(status_code=500, detail=f"Error analyzing repository: {str(e)}")
+            if not job.finished:
+                get_job_manager().cancel(job.id)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"X-Job-Id": job.id})
 
 
 def start_server(port: int = 8080):
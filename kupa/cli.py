@@ -12,7 +12,8 @@ from pathlib import Path
 
 # Import configs first
 from kupa.config import load_config, get_kubernetes_version
-from kupa.analyzer import analyze_directory
+from kupa.analyzer import analyze_directory, iter_breaking_changes
+from kupa.analyzer.matrix import parse_version_spec
 from kupa.output import write_local_results
 from kupa.github_integration import clone_repo, create_pull_request
 from kupa.api import start_server
@@ -36,9 +37,15 @@ def cli():
 
 @cli.command()
 @click.option('--path', type=click.Path(exists=True), help='Path to local directory containing Kubernetes YAML files')
-@click.option('--kube-version', default='latest', help='Target Kubernetes version to check against')
+@click.option('--kube-version', default='latest', 
+              help='Target Kubernetes version to check against, or a list/range such as v1.22,v1.25 or v1.22..v1.28')
 @click.option('--config', type=click.Path(exists=True), help='Path to the configuration file')
-def analyze_local(path, kube_version, config):
+@click.option('--workers', type=int, default=None, help='Processes used to parse YAML files (0 = one per CPU core)')
+@click.option('--concurrency', type=int, default=None, help='Resources checked for breaking changes at the same time')
+@click.option('--offline', is_flag=True, help='Serve Kubernetes docs from the local HTTP cache only')
+@click.option('--incremental/--no-incremental', default=None,
+              help='Only analyze files that changed since the last run (cached in .kupa-cache/)')
+def analyze_local(path, kube_version, config, workers, concurrency, offline, incremental):
     """Analyze local directory for K8s breaking changes."""
     if not path:
         logger.error("Error: --path must be specified")
@@ -46,16 +53,40 @@ def analyze_local(path, kube_version, config):
 
     # Load configuration
     load_config(config)
+    if offline:
+        os.environ["KUPA_OFFLINE"] = "1"
     
-    # Get actual Kubernetes version
-    actual_kube_version = get_kubernetes_version(kube_version)
+    # Get actual Kubernetes versions; several versions are analyzed as a matrix
+    try:
+        kube_versions = parse_version_spec(kube_version)
+    except ValueError as e:
+        logger.error(f"Error: {e}")
+        sys.exit(1)
     
     abs_path = os.path.abspath(path)
+    if len(kube_versions) > 1:
+        logger.info(f"Analyzing Kubernetes resources in: {abs_path}")
+        logger.info(f"Target Kubernetes versions: {', '.join(kube_versions)}")
+        try:
+            matrix = analyze_directory(abs_path, kube_versions, workers=workers, max_in_flight=concurrency)
+        except Exception as e:
+            logger.error(f"Error analyzing directory: {e}")
+            sys.exit(1)
+        click.echo(matrix.format_table(base_dir=abs_path))
+        logger.info("Run with a single --kube-version to create updated files.")
+        return
+    
+    actual_kube_version = kube_versions[0]
     logger.info(f"Analyzing Kubernetes resources in: {abs_path}")
     logger.info(f"Target Kubernetes version: {actual_kube_version}")
     
     try:
-        results = analyze_directory(abs_path, actual_kube_version)
+        # Report findings as they are found rather than at the end
+        results = []
+        for change in iter_breaking_changes(abs_path, actual_kube_version, workers=workers, 
+                                            max_in_flight=concurrency, incremental=incremental):
+            logger.info(f"{change.resource.file_path}: {change.resource}: {change.description}")
+            results.append(change)
         if results:
             write_local_results(abs_path, results)
             logger.info(f"Analysis complete! Found {len(results)} breaking changes.")
@@ -72,10 +103,15 @@ def analyze_local(path, kube_version, config):
 @click.option('--create-pr', is_flag=True, help='Create a PR for changes')
 @click.option('--kube-version', default='latest', help='Target Kubernetes version to check against')
 @click.option('--config', type=click.Path(exists=True), help='Path to the configuration file')
-def analyze_github(repo, create_pr, kube_version, config):
+@click.option('--workers', type=int, default=None, help='Processes used to parse YAML files (0 = one per CPU core)')
+@click.option('--concurrency', type=int, default=None, help='Resources checked for breaking changes at the same time')
+@click.option('--offline', is_flag=True, help='Serve Kubernetes docs from the local HTTP cache only')
+def analyze_github(repo, create_pr, kube_version, config, workers, concurrency, offline):
     """Analyze GitHub repo for K8s breaking changes."""
     # Load configuration
     load_config(config)
+    if offline:
+        os.environ["KUPA_OFFLINE"] = "1"
     
     # Get actual Kubernetes version
     actual_kube_version = get_kubernetes_version(kube_version)
@@ -88,7 +124,8 @@ def analyze_github(repo, create_pr, kube_version, config):
         temp_dir = clone_repo(repo)
         
         # Analyze the cloned repo
-        results = analyze_directory(temp_dir, actual_kube_version)
+        results = analyze_directory(temp_dir, actual_kube_version, workers=workers, 
+                                    max_in_flight=concurrency)
         
         if not results:
             logger.info("Analysis complete! No breaking changes found.")
@@ -3,9 +3,12 @@ Configuration loader for KuPa.
 """
 
 import os
-import yaml
+import copy
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Tuple
+
+from kupa import yaml_io
 
 logger = logging.getLogger('kupa.config')
 
@@ -19,12 +22,103 @@ DEFAULT_CONFIG = {
         "provider": "openai",
         "model": "gpt-4-turbo",
         "temperature": 0.1,
-        "max_tokens": 4000
+        "max_tokens": 4000,
+        "response_cache": {
+            "enabled": True,
+            "path": "~/.cache/kupa/responses.sqlite",
+            "ttl": 604800,
+            "max_entries": 50000
+        },
+        "slimming": {
+            "enabled": True,
+            "compact_json": True,
+            "max_value_length": 256,
+            "drop_fields": [
+                "status",
+                "metadata.managedFields",
+                "metadata.creationTimestamp",
+                "metadata.resourceVersion",
+                "metadata.uid",
+                "metadata.generation",
+                "metadata.selfLink"
+            ],
+            "drop_annotations": [
+                "kubectl.kubernetes.io/last-applied-configuration",
+                "deployment.kubernetes.io/revision"
+            ]
+        },
+        "read_timeout": 120,
+        "ollama_model_ttl": 300,
+        "batch": {
+            "enabled": False,
+            "token_budget": 12000,
+            "max_resources": 20
+        },
+        "async_client": {
+            "enabled": False,
+            "max_concurrency": 16,
+            "requests_per_minute": 500,
+            "tokens_per_minute": 150000,
+            "max_retries": 6,
+            "backoff_base": 1.0,
+            "backoff_max": 60.0
+        }
+    },
+    "analysis": {
+        "workers": 1,
+        "parse_chunk_size": 64,
+        "resolution_order": ["static", "ollama", "openai", "docs"],
+        "skip_stable": True,
+        "stream_window": 256,
+        "prescan": False,
+        "walk": {
+            "exclude_dirs": [".git", ".hg", ".svn", "node_modules", "vendor", "__pycache__", ".venv",
+                             "venv", ".tox", ".terraform", "dist", "build", "target", ".kupa-cache"],
+            "ignore_files": True,
+            "max_file_size": 10485760,
+            "max_depth": 50,
+            "follow_symlinks": True
+        },
+        "incremental": {
+            "enabled": False,
+            "directory": ".kupa-cache",
+            "ttl": 2592000
+        },
+        "dedup": {
+            "enabled": True,
+            "ignore_fields": ["metadata.name", "metadata.namespace", "metadata.labels"]
+        }
+    },
+    "concurrency": {
+        "max_in_flight": 8,
+        "providers": {
+            "ollama": 2,
+            "openai": 4,
+            "docs": 4
+        }
     },
     "external_sources": {
         "docs_url": "https://kubernetes.io/docs",
         "api_reference_url": "https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.28/",
-        "changelog_url": "https://github.com/kubernetes/kubernetes/tree/master/CHANGELOG"
+        "changelog_url": "https://github.com/kubernetes/kubernetes/tree/master/CHANGELOG",
+        "http_cache": {
+            "enabled": True,
+            "directory": "~/.cache/kupa/http",
+            "ttl": 86400,
+            "offline": False
+        }
+    },
+    "http": {
+        "connect_timeout": 5,
+        "read_timeout": 60,
+        "pool_size": 16
+    },
+    "api": {
+        "jobs": {
+            "workers": 2,
+            "max_queued": 16,
+            "ttl": 3600
+        }
     },
     "github": {
         "default_branch_prefix": "kupa-k8s-upgrade-",
@@ -44,7 +138,8 @@ def load_config(config_path: str = None) -> Dict[str, Any]:
     Returns:
         The loaded configuration as a dictionary.
     """
-    config = DEFAULT_CONFIG.copy()
+    # A deep copy, so user settings never leak into the defaults
+    config = copy.deepcopy(DEFAULT_CONFIG)
     
     # Try to find configuration file
     if not config_path:
@@ -64,14 +159,13 @@ def load_config(config_path: str = None) -> Dict[str, Any]:
     # Load configuration if found
     if config_path and os.path.exists(config_path):
         try:
-            with open(config_path, 'r') as f:
-                user_config = yaml.safe_load(f)
+            user_config = _read_config_file(config_path)
+            
+            # Update configuration with user settings
+            if user_config:
+                _update_dict_recursive(config, copy.deepcopy(user_config))
                 
-                # Update configuration with user settings
-                if user_config:
-                    _update_dict_recursive(config, user_config)
-                    
-                logger.info(f"Loaded configuration from {config_path}")
+            logger.debug(f"Loaded configuration from {config_path}")
         except Exception as e:
             logger.warning(f"Error loading configuration from {config_path}: {e}")
     else:
@@ -80,6 +174,40 @@ def load_config(config_path: str = None) -> Dict[str, Any]:
     return config
 
 
+# Parsed configuration files, keyed by path, with the (mtime, size) they were read at
+_config_files: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_config_files_lock = threading.Lock()
+
+
+def _read_config_file(config_path: str) -> Any:
+    """
+    Read and parse a configuration file, reusing the result while the file is unchanged.
+    
+    load_config() is called on hot paths (for every resource checked), so
+    the file is only parsed again when its modification time or size changes.
+    
+    Args:
+        config_path: Path of the configuration file
+        
+    Returns:
+        The parsed configuration. Callers must not modify it.
+    """
+    stat = os.stat(config_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _config_files_lock:
+        cached = _config_files.get(config_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    with open(config_path, 'r') as f:
+        user_config = yaml_io.load(f)
+    logger.info(f"Loaded configuration from {config_path}")
+    
+    with _config_files_lock:
+        _config_files[config_path] = (signature, user_config)
+    return user_config
+
+
 def _update_dict_recursive(target: Dict[str, Any], source: Dict[str, Any]) -> None:
     """
     Update a dictionary recursively.
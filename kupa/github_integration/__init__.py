@@ -13,7 +13,7 @@ import git
 from github import Github
 
 from kupa.analyzer import BreakingChange
-from kupa.output import write_yaml_file
+from kupa.output import write_updated_file
 
 # Initialize the logger
 logger = logging.getLogger('kupa.github_integration')
@@ -105,13 +105,12 @@ def create_pull_request(repo_url: str, repo_path: str, breaking_changes: List[Br
         # Create a new branch from the default branch
         git_repo.git.checkout("-b", branch_name, f"origin/{default_branch}")
         
-        # Apply fixes to files
+        # Apply fixes to files, splicing the updated documents into each file
+        file_changes = {}
         for change in breaking_changes:
-            resource = change.resource
-            updated_content = change.updated_content
-            
-            # Write the updated YAML file
-            write_yaml_file(resource.file_path, updated_content)
+            file_changes.setdefault(change.resource.file_path, []).append(change)
+        for file_path, changes in file_changes.items():
+            write_updated_file(file_path, changes)
             
         # Commit the changes
         git_repo.git.add(".")
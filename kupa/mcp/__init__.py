@@ -2,4 +2,4 @@
 MCP module initialization.
 """
 
-__all__ = ['model_client', 'external_fetcher']
+__all__ = ['model_client', 'external_fetcher', 'http_cache', 'response_cache', 'clients', 'async_client', 'slimming']
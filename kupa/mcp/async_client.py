@@ -0,0 +1,385 @@
+"""
+Asyncio client for querying OpenAI-compatible models at high throughput.
+
+Requests are paced by token buckets for requests per minute and tokens per
+minute, so concurrent queries stay under the provider's rate limits. When
+the provider still answers with 429 or a 5xx error, the request is retried
+with jittered exponential backoff, honouring any Retry-After header, and the
+whole client pauses so the other in-flight requests back off as well.
+
+The limits belong to the provider account, not to one batch of queries, so
+a single rate limiter per provider and limit settings is shared by every
+client in the process (see get_rate_limiter()). Its buckets and pauses carry
+over from one stream window to the next, and across event loops.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import openai
+from openai import AsyncOpenAI
+
+from kupa.analyzer import K8sResource
+from kupa.analyzer.runs import bind_run
+from kupa.config import load_config
+from kupa.mcp.clients import get_timeout
+from kupa.mcp.model_client import (
+    SYSTEM_PROMPT, _build_prompt, _build_batch_prompt, _parse_batch_reply,
+    _add_confidence, _cache_key, _store_response, _estimate_tokens
+)
+from kupa.mcp.response_cache import get_response_cache
+
+# Initialize the logger
+logger = logging.getLogger('kupa.mcp.async_client')
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket refilled at a constant rate.
+
+    The state is guarded by a thread lock rather than an asyncio lock, so
+    one bucket can be shared by event loops running in different threads.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate_per_minute: Tokens added per minute
+            capacity: Maximum number of tokens held. Defaults to one minute's worth.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until ``amount`` tokens are available and take them.
+
+        Requests larger than the capacity wait for a full bucket instead of
+        waiting forever.
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+
+    def debit(self, amount: float) -> None:
+        """Take tokens without waiting, e.g. to account for usage above an estimate."""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits with a shared pause."""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """
+        Initialize the limiter. A limit of 0 disables that bucket.
+
+        Args:
+            requests_per_minute: Maximum requests per minute
+            tokens_per_minute: Maximum (estimated) tokens per minute
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request for ``seconds``, e.g. after a 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request using ``tokens`` tokens may be sent."""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(tokens)
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        """Charge the tokens a request used beyond its estimate."""
+        if self.tokens is not None and actual and actual > estimated:
+            self.tokens.debit(actual - estimated)
+
+
+_limiters: Dict[Tuple[str, float, float], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: Optional[str], requests_per_minute: float,
+                     tokens_per_minute: float) -> RateLimiter:
+    """
+    Get the process-wide rate limiter for a provider and its limits.
+
+    Args:
+        base_url: The provider's API base URL (None for OpenAI)
+        requests_per_minute: Maximum requests per minute
+        tokens_per_minute: Maximum (estimated) tokens per minute
+
+    Returns:
+        The limiter shared by every client with the same provider and limits
+    """
+    key = (base_url or "openai", requests_per_minute, tokens_per_minute)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Get the delay requested by a Retry-After (or retry-after-ms) header, in seconds."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Check whether a failed request should be retried."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class AsyncModelClient:
+    """Rate-limited asyncio client for OpenAI-compatible chat completion APIs."""
+
+    def __init__(self, ai_config: Optional[Dict[str, Any]] = None, api_key: Optional[str] = None):
+        """
+        Initialize the client from the ``ai_model`` configuration section.
+
+        Must be created inside the event loop it is used from.
+
+        Args:
+            ai_config: The ``ai_model`` configuration section. Loaded if None.
+            api_key: The API key. Defaults to the OPENAI_API_KEY environment variable.
+        """
+        if ai_config is None:
+            ai_config = load_config().get("ai_model", {})
+        self.ai_config = ai_config
+        async_config = ai_config.get("async_client", {})
+
+        self.max_retries = async_config.get("max_retries", 6)
+        self.backoff_base = async_config.get("backoff_base", 1.0)
+        self.backoff_max = async_config.get("backoff_max", 60.0)
+        self.limiter = get_rate_limiter(
+            ai_config.get("base_url"),
+            async_config.get("requests_per_minute", 500),
+            async_config.get("tokens_per_minute", 150000)
+        )
+        self._semaphore = asyncio.Semaphore(async_config.get("max_concurrency", 16))
+
+        connect_timeout, read_timeout = get_timeout(ai_config.get("read_timeout", 120))
+        kwargs = {
+            "api_key": api_key or os.environ.get('OPENAI_API_KEY', 'your-api-key'),
+            "timeout": openai.Timeout(read_timeout, connect=connect_timeout),
+            # Retries are handled here so they go through the rate limiter
+            "max_retries": 0
+        }
+        if ai_config.get("base_url"):
+            kwargs["base_url"] = ai_config["base_url"]
+        self._client = AsyncOpenAI(**kwargs)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Get the delay before retry number ``attempt`` (starting at 0)."""
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        # Full jitter keeps concurrent retries from arriving in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def complete(self, prompt: str) -> str:
+        """
+        Send a prompt and return the raw text of the reply.
+
+        Args:
+            prompt: The prompt to send
+
+        Returns:
+            The model's reply
+
+        Raises:
+            openai.OpenAIError: If the request still fails after all retries
+        """
+        estimated = _estimate_tokens(SYSTEM_PROMPT + prompt)
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.limiter.acquire(estimated)
+                try:
+                    response = await self._client.chat.completions.create(
+                        model=self.ai_config.get("model", "gpt-4-turbo"),
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        response_format={"type": "json_object"},
+                        temperature=self.ai_config.get("temperature", 0.1),
+                        max_tokens=self.ai_config.get("max_tokens", 4000)
+                    )
+                except Exception as e:
+                    if not _is_retryable(e) or attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+                    logger.warning(f"Model request failed ({e}). Retrying in {delay:.1f}s")
+                    if isinstance(e, openai.RateLimitError):
+                        self.limiter.pause(delay)
+                    await asyncio.sleep(delay)
+                    continue
+
+                usage = getattr(response, "usage", None)
+                self.limiter.record_usage(estimated, getattr(usage, "total_tokens", None))
+                return response.choices[0].message.content
+
+    async def query(self, resource: K8sResource, target_k8s_version: str) -> Dict[str, Any]:
+        """
+        Query the model about a single resource.
+
+        Args:
+            resource: The Kubernetes resource to check
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            The model's verdict, in the same format as query_model_for_changes()
+        """
+        response_text = await self.complete(_build_prompt(resource, target_k8s_version))
+        model_response = _add_confidence(json.loads(response_text))
+        _store_response(_cache_key(resource, target_k8s_version, self.ai_config), model_response)
+        return model_response
+
+    async def query_batch(self, resources: List[K8sResource],
+                          target_k8s_version: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        Query the model about several resources, in one request where possible.
+
+        Verdicts that are missing from a batched reply are queried individually.
+
+        Args:
+            resources: The Kubernetes resources to check
+            target_k8s_version: The target Kubernetes version
+
+        Returns:
+            List with the verdict for each resource, or None where the query failed
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(resources)
+        response_cache = get_response_cache()
+
+        pending = {}
+        for index, resource in enumerate(resources):
+            cached_response = response_cache.get(_cache_key(resource, target_k8s_version, self.ai_config)) \
+                if response_cache is not None else None
+            if cached_response is not None:
+                results[index] = cached_response
+            else:
+                pending[str(index)] = resource
+
+        verdicts = {}
+        if len(pending) > 1:
+            try:
+                reply = await self.complete(_build_batch_prompt(pending, target_k8s_version))
+                verdicts = _parse_batch_reply(reply)
+            except Exception as e:
+                logger.warning(f"Error querying AI model with a batch: {e}. Retrying resources individually.")
+
+        async def resolve(resource_id, resource):
+            verdict = verdicts.get(resource_id)
+            if verdict is not None:
+                verdict = _add_confidence(verdict)
+                _store_response(_cache_key(resource, target_k8s_version, self.ai_config), verdict)
+                return verdict
+            try:
+                return await self.query(resource, target_k8s_version)
+            except Exception as e:
+                logger.warning(f"Error querying AI model for {resource}: {e}")
+                return None
+
+        resolved = await asyncio.gather(*(resolve(rid, r) for rid, r in pending.items()))
+        for resource_id, verdict in zip(pending, resolved):
+            results[int(resource_id)] = verdict
+        return results
+
+    async def close(self) -> None:
+        """Close the underlying HTTP client."""
+        await self._client.close()
+
+
+async def _query_batches(batches: List[List[K8sResource]], target_k8s_version: str,
+                         ai_config: Optional[Dict[str, Any]]) -> List[List[Optional[Dict[str, Any]]]]:
+    client = AsyncModelClient(ai_config)
+    try:
+        return await asyncio.gather(*(client.query_batch(batch, target_k8s_version) for batch in batches))
+    finally:
+        await client.close()
+
+
+def query_batches_async(batches: List[List[K8sResource]], target_k8s_version: str,
+                        ai_config: Optional[Dict[str, Any]] = None) -> List[List[Optional[Dict[str, Any]]]]:
+    """
+    Query the model about batches of resources concurrently from synchronous code.
+
+    Runs its own event loop; when called from a thread that already runs one
+    (e.g. an API request handler), the loop is started on a helper thread.
+
+    Args:
+        batches: Batches of resources, e.g. from pack_batches()
+        target_k8s_version: The target Kubernetes version
+        ai_config: The ``ai_model`` configuration section. Loaded if None.
+
+    Returns:
+        Per-batch lists with the verdict for each resource, or None where the query failed
+    """
+    coroutine = _query_batches(batches, target_k8s_version, ai_config)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(bind_run(asyncio.run), coroutine).result()
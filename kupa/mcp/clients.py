@@ -0,0 +1,162 @@
+"""
+Long-lived network clients shared by the model client and the docs fetcher.
+
+Creating a client per request pays for a new TCP connection and TLS
+handshake every time. The clients here are created once per process and
+keep connections alive in a pool sized for concurrent checks.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+
+from kupa.config import load_config
+
+# Initialize the logger
+logger = logging.getLogger('kupa.mcp.clients')
+
+OLLAMA_BASE_URL = "http://localhost:11434"
+
+_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+_openai_clients: Dict[Tuple, OpenAI] = {}
+_ollama_models: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+
+def get_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """
+    Get the (connect, read) timeout for HTTP requests from the ``http`` settings.
+
+    Args:
+        read_timeout: Read timeout to use instead of ``http.read_timeout``
+
+    Returns:
+        Tuple of connect and read timeouts in seconds
+    """
+    http_config = load_config().get("http", {})
+    if read_timeout is None:
+        read_timeout = http_config.get("read_timeout", 60)
+    return http_config.get("connect_timeout", 5), read_timeout
+
+
+def get_http_session() -> requests.Session:
+    """
+    Get the process-wide HTTP session.
+
+    The session keeps connections alive, with a connection pool per host
+    sized by the ``http.pool_size`` setting.
+
+    Returns:
+        The shared requests session
+    """
+    global _http_session
+
+    with _lock:
+        if _http_session is None:
+            pool_size = load_config().get("http", {}).get("pool_size", 16)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def get_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    Get a shared OpenAI client.
+
+    Args:
+        api_key: The API key. Defaults to the OPENAI_API_KEY environment variable.
+
+    Returns:
+        An OpenAI client, reused for every call with the same settings
+    """
+    if api_key is None:
+        api_key = os.environ.get('OPENAI_API_KEY', 'your-api-key')
+
+    ai_config = load_config().get("ai_model", {})
+    connect_timeout, read_timeout = get_timeout(ai_config.get("read_timeout", 120))
+    base_url = ai_config.get("base_url")
+    key = (api_key, base_url, connect_timeout, read_timeout)
+
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            kwargs = {
+                "api_key": api_key,
+                "timeout": openai.Timeout(read_timeout, connect=connect_timeout)
+            }
+            if base_url:
+                kwargs["base_url"] = base_url
+            client = OpenAI(**kwargs)
+            _openai_clients[key] = client
+        return client
+
+
+def _discover_ollama_model(requested_model: str, base_url: str) -> str:
+    """Pick the Ollama model to use from the models the server has available."""
+    models_response = get_http_session().get(f"{base_url}/api/tags", timeout=get_timeout())
+    models_response.raise_for_status()
+    available_models = models_response.json().get("models", [])
+    available_model_names = [model.get("name").split(":")[0] for model in available_models]
+
+    # Make sure we have a model that exists
+    if any(requested_model.startswith(name) for name in available_model_names):
+        return requested_model
+
+    logger.warning(f"Model {requested_model} not found in Ollama. Available models: {available_model_names}")
+    if "llama3" in available_model_names:
+        logger.info("Falling back to llama3 model")
+        return "llama3"
+
+    logger.warning(f"No suitable models found in Ollama. Using first available: {available_model_names[0]}")
+    return available_model_names[0]
+
+
+def resolve_ollama_model(requested_model: str, base_url: str = OLLAMA_BASE_URL) -> str:
+    """
+    Resolve the Ollama model to use, caching the answer.
+
+    The model list is fetched from ``/api/tags`` at most once per
+    ``ai_model.ollama_model_ttl`` seconds instead of before every query.
+
+    Args:
+        requested_model: The model name from the configuration
+        base_url: The Ollama server URL
+
+    Returns:
+        The name of an available model
+    """
+    ttl = load_config().get("ai_model", {}).get("ollama_model_ttl", 300)
+    key = (requested_model, base_url)
+
+    with _lock:
+        cached = _ollama_models.get(key)
+    if cached is not None and time.time() - cached[1] < ttl:
+        return cached[0]
+
+    logger.info("Checking available Ollama models...")
+    model = _discover_ollama_model(requested_model, base_url)
+    with _lock:
+        _ollama_models[key] = (model, time.time())
+    return model
+
+
+def reset_clients() -> None:
+    """Close and forget all shared clients and cached Ollama model lookups."""
+    global _http_session
+
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
+        _openai_clients.clear()
+        _ollama_models.clear()
@@ -4,11 +4,14 @@ External fetcher for retrieving Kubernetes breaking changes information from off
 
 import logging
 import re
-import requests
+import threading
 from bs4 import BeautifulSoup
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Hashable, List, Optional, Tuple
 
+from kupa.analyzer.runs import current_run
 from kupa.config import load_config
+from kupa.mcp.clients import get_http_session, get_timeout
+from kupa.mcp.http_cache import get_http_cache
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -17,6 +20,98 @@ if TYPE_CHECKING:
 # Initialize the logger
 logger = logging.getLogger('kupa.mcp.external_fetcher')
 
+
+class DocsCache:
+    """
+    Thread-safe memo for documents fetched from the Kubernetes docs.
+    
+    Each key is computed at most once: concurrent callers asking for the same
+    key wait for the first one instead of fetching the document again. Failed
+    fetches (None) are memoized too, so an unreachable source is only tried
+    once per run. Each run holds its own cache (see _get_docs_cache), so a
+    long-running server sees fresh docs and retries unreachable sources on
+    the next run without one job wiping another's cache.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Any] = {}
+        self._pending: Dict[Hashable, threading.Lock] = {}
+        
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Get the value for a key, computing it if it isn't cached yet.
+        
+        Args:
+            key: The cache key
+            compute: Function called without arguments to produce the value
+            
+        Returns:
+            The cached or freshly computed value
+        """
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._pending.setdefault(key, threading.Lock())
+            
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+                    
+            value = compute()
+            
+            with self._lock:
+                self._values[key] = value
+                self._pending.pop(key, None)
+            return value
+            
+    def clear(self) -> None:
+        """Drop all cached values."""
+        with self._lock:
+            self._values.clear()
+            
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
+
+
+def _get_docs_cache() -> DocsCache:
+    """Get the docs cache of the current run, creating it on first use."""
+    run = current_run()
+    with run.lock:
+        if run.docs_cache is None:
+            run.docs_cache = DocsCache()
+        return run.docs_cache
+
+
+def clear_docs_cache() -> None:
+    """Clear the docs cache of the current run."""
+    _get_docs_cache().clear()
+
+
+def _get_text(url: str) -> str:
+    """
+    Fetch the text of a URL, through the persistent HTTP cache if it is enabled.
+    
+    Args:
+        url: The URL to fetch from
+        
+    Returns:
+        The content as text
+        
+    Raises:
+        Exception: If the content can't be fetched
+    """
+    cache = get_http_cache()
+    if cache is not None:
+        return cache.get(url, timeout=get_timeout())
+        
+    response = get_http_session().get(url, timeout=get_timeout())
+    response.raise_for_status()
+    return response.text
+
+
 def _fetch_k8s_docs(url: str) -> Optional[str]:
     """
     Fetch content from Kubernetes documentation.
@@ -28,9 +123,7 @@ def _fetch_k8s_docs(url: str) -> Optional[str]:
         The content as text, or None if the fetch fails
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.text
+        return _get_text(url)
     except Exception as e:
         logger.warning(f"Error fetching from {url}: {e}")
         return None
@@ -64,9 +157,7 @@ def _fetch_changelog(version: str) -> Optional[Dict[str, Any]]:
         changelog_content = None
         for url in changelog_urls:
             try:
-                response = requests.get(url)
-                response.raise_for_status()
-                changelog_content = response.text
+                changelog_content = _get_text(url)
                 break
             except:
                 continue
@@ -75,45 +166,155 @@ def _fetch_changelog(version: str) -> Optional[Dict[str, Any]]:
             logger.warning(f"Could not fetch changelog for version {version}")
             return None
             
-        # Parse the changelog for breaking changes
-        changes = {
-            "api_changes": [],
-            "deprecations": [],
-            "removals": [],
-            "other_changes": []
-        }
+        return _parse_changelog(changelog_content)
+        
+    except Exception as e:
+        logger.warning(f"Error parsing changelog for version {version}: {e}")
+        return None
+
+
+def _parse_changelog(changelog_content: str) -> Dict[str, List[str]]:
+    """
+    Categorise the breaking-change bullet points of a changelog.
+    
+    Args:
+        changelog_content: The changelog markdown
         
-        # Look for sections indicating breaking changes
-        sections = re.split(r'#+\s+', changelog_content)
-        for section in sections:
-            section_lower = section.lower()
+    Returns:
+        Dictionary mapping change categories to lists of bullet points
+    """
+    changes = {
+        "api_changes": [],
+        "deprecations": [],
+        "removals": [],
+        "other_changes": []
+    }
+    
+    # Look for sections indicating breaking changes
+    sections = re.split(r'#+\s+', changelog_content)
+    for section in sections:
+        section_lower = section.lower()
+        
+        if any(term in section_lower for term in ["deprecat", "breaking", "removal", "api change"]):
+            # Extract bullet points
+            bullets = re.findall(r'\*\s+([^\n]+)', section)
             
-            if any(term in section_lower for term in ["deprecat", "breaking", "removal", "api change"]):
-                # Extract bullet points
-                bullets = re.findall(r'\*\s+([^\n]+)', section)
-                
-                # Categorize the changes
-                for bullet in bullets:
-                    if "API" in bullet or "apiVersion" in bullet:
-                        changes["api_changes"].append(bullet)
-                    elif "deprecat" in bullet.lower():
-                        changes["deprecations"].append(bullet)
-                    elif "remov" in bullet.lower():
-                        changes["removals"].append(bullet)
-                    else:
-                        changes["other_changes"].append(bullet)
-                        
-        return changes
+            # Categorize the changes
+            for bullet in bullets:
+                if "API" in bullet or "apiVersion" in bullet:
+                    changes["api_changes"].append(bullet)
+                elif "deprecat" in bullet.lower():
+                    changes["deprecations"].append(bullet)
+                elif "remov" in bullet.lower():
+                    changes["removals"].append(bullet)
+                else:
+                    changes["other_changes"].append(bullet)
+                    
+    return changes
+
+
+def get_changelog(version: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the categorised changelog for a version, fetching it at most once per process.
+    
+    Args:
+        version: The Kubernetes version to get the changelog for
+        
+    Returns:
+        Dictionary containing change information, or None if it couldn't be fetched
+    """
+    config = load_config()
+    key = ("changelog", config["external_sources"]["changelog_url"], version.lstrip('v'))
+    return _get_docs_cache().get_or_compute(key, lambda: _fetch_changelog(version))
+
+
+def _load_api_reference_headings(api_ref_url: str) -> Optional[List[Tuple[str, Any]]]:
+    """
+    Fetch and parse the API reference page.
+    
+    Args:
+        api_ref_url: URL of the generated API reference
+        
+    Returns:
+        List of (lowercased heading text, heading element) pairs in document
+        order, or None if the page couldn't be fetched or parsed
+    """
+    try:
+        content = _fetch_k8s_docs(api_ref_url)
+        if not content:
+            return None
+            
+        soup = BeautifulSoup(content, 'html.parser')
+        return [(section.text.lower(), section) for section in soup.find_all(['h1', 'h2', 'h3'])]
         
     except Exception as e:
-        logger.warning(f"Error parsing changelog for version {version}: {e}")
+        logger.warning(f"Error parsing API reference: {e}")
         return None
 
 
+def _get_api_reference_headings(api_ref_url: str) -> Optional[List[Tuple[str, Any]]]:
+    """Get the parsed API reference headings, fetching the page at most once per process."""
+    return _get_docs_cache().get_or_compute(
+        ("api_reference", api_ref_url), 
+        lambda: _load_api_reference_headings(api_ref_url)
+    )
+
+
+def _extract_version_info(headings: List[Tuple[str, Any]], kind: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract the version information for a resource kind from the API reference.
+    
+    Args:
+        headings: Parsed API reference headings from _load_api_reference_headings()
+        kind: The resource kind to look up
+        
+    Returns:
+        Dictionary containing API reference information, or None if the kind isn't documented
+    """
+    # Look for the resource kind in the API reference
+    kind_lower = kind.lower()
+    resource_section = next((section for text, section in headings if kind_lower in text), None)
+    
+    if not resource_section:
+        return None
+        
+    # Look for version information
+    version_info = {
+        "current_versions": [],
+        "deprecated_versions": [],
+        "replacement_version": None
+    }
+    
+    # Find version information in the surrounding text
+    for sibling in resource_section.find_next_siblings():
+        text = sibling.text.lower()
+        
+        # Look for version information
+        if "version" in text:
+            if "deprecated" in text or "removed" in text:
+                # Extract versions using regex
+                versions = re.findall(r'[v\d\.]+\d+', text)
+                version_info["deprecated_versions"].extend(versions)
+            elif "use" in text or "replace" in text:
+                # Extract replacement version
+                versions = re.findall(r'[v\d\.]+\d+', text)
+                if versions:
+                    version_info["replacement_version"] = versions[0]
+            else:
+                # Extract current versions
+                versions = re.findall(r'[v\d\.]+\d+', text)
+                version_info["current_versions"].extend(versions)
+                
+    return version_info
+
+
 def _check_api_reference(resource: 'K8sResource', target_version: str) -> Optional[Dict[str, Any]]:
     """
     Check Kubernetes API reference for changes to a specific resource.
     
+    The reference page is downloaded and parsed once per process, and the
+    version information is memoized per kind.
+    
     Args:
         resource: The Kubernetes resource to check
         target_version: The target Kubernetes version
@@ -126,51 +327,14 @@ def _check_api_reference(resource: 'K8sResource', target_version: str) -> Option
     api_ref_url = config["external_sources"]["api_reference_url"]
     
     try:
-        # Fetch API reference
-        content = _fetch_k8s_docs(api_ref_url)
-        if not content:
-            return None
-            
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Look for the resource kind in the API reference
-        resource_section = None
-        for section in soup.find_all(['h1', 'h2', 'h3']):
-            if resource.kind.lower() in section.text.lower():
-                resource_section = section
-                break
-                
-        if not resource_section:
+        headings = _get_api_reference_headings(api_ref_url)
+        if not headings:
             return None
             
-        # Look for version information
-        version_info = {
-            "current_versions": [],
-            "deprecated_versions": [],
-            "replacement_version": None
-        }
-        
-        # Find version information in the surrounding text
-        for sibling in resource_section.find_next_siblings():
-            text = sibling.text.lower()
-            
-            # Look for version information
-            if "version" in text:
-                if "deprecated" in text or "removed" in text:
-                    # Extract versions using regex
-                    versions = re.findall(r'[v\d\.]+\d+', text)
-                    version_info["deprecated_versions"].extend(versions)
-                elif "use" in text or "replace" in text:
-                    # Extract replacement version
-                    versions = re.findall(r'[v\d\.]+\d+', text)
-                    if versions:
-                        version_info["replacement_version"] = versions[0]
-                else:
-                    # Extract current versions
-                    versions = re.findall(r'[v\d\.]+\d+', text)
-                    version_info["current_versions"].extend(versions)
-                        
-        return version_info
+        return _get_docs_cache().get_or_compute(
+            ("api_reference_kind", api_ref_url, resource.kind),
+            lambda: _extract_version_info(headings, resource.kind)
+        )
         
     except Exception as e:
         logger.warning(f"Error checking API reference: {e}")
@@ -197,11 +361,12 @@ def fetch_from_k8s_docs(resource: 'K8sResource', target_k8s_version: str) -> Dic
         - description: Description of the breaking change
         - recommended_action: Recommended action to fix it
         - updated_content: Updated resource content
+        - error: Which sources couldn't be fetched, only present if some couldn't
     """
     logger.info(f"Checking external sources for {resource} targeting version {target_k8s_version}")
     
     # Get changelog information
-    changelog = _fetch_changelog(target_k8s_version)
+    changelog = get_changelog(target_k8s_version)
     
     # Check API reference
     api_info = _check_api_reference(resource, target_k8s_version)
@@ -215,6 +380,15 @@ def fetch_from_k8s_docs(resource: 'K8sResource', target_k8s_version: str) -> Dic
         "updated_content": resource.content.copy()
     }
     
+    # Without every source, "no breaking change" is only a guess
+    missing = []
+    if changelog is None:
+        missing.append("changelog")
+    if not _get_api_reference_headings(load_config()["external_sources"]["api_reference_url"]):
+        missing.append("API reference")
+    if missing:
+        result["error"] = f"Could not fetch the {' and '.join(missing)} for {target_k8s_version}"
+    
     # Check for API version deprecation/removal
     if api_info:
         current_version = resource.api_version
@@ -0,0 +1,195 @@
+"""
+Persistent HTTP cache for documents fetched from the Kubernetes docs.
+
+Responses are stored on disk together with their ETag and Last-Modified
+validators. Fresh entries (younger than the TTL) are served without any
+network access; stale entries are revalidated with a conditional request,
+so an unchanged document costs a single 304 response instead of a full
+download. In offline mode only the cache is consulted.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+
+from kupa.config import load_config
+from kupa.mcp.clients import get_http_session
+
+# Initialize the logger
+logger = logging.getLogger('kupa.mcp.http_cache')
+
+
+class OfflineCacheMiss(Exception):
+    """Raised when a URL is requested in offline mode and isn't in the cache."""
+
+
+class HTTPCache:
+    """On-disk HTTP cache with conditional revalidation."""
+
+    def __init__(self, directory: str, ttl: float = 86400, offline: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory the cached responses are stored in
+            ttl: Seconds a cached response is served without revalidation
+            offline: If True, never touch the network and serve from cache only
+        """
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.offline = offline
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        """Get the metadata and body file paths for a URL."""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return f"{base}.json", f"{base}.body"
+
+    def _load(self, url: str) -> Optional[Dict[str, Any]]:
+        """Load the cached entry for a URL, or None if there isn't a usable one."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("url") != url:
+            return None
+        return meta
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        """Write a file so readers never see a partial write."""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _store(self, url: str, meta: Dict[str, Any], body: Optional[bytes] = None) -> None:
+        """Store the metadata (and optionally the body) for a URL."""
+        meta_path, body_path = self._paths(url)
+        meta = {key: value for key, value in meta.items() if key != "body"}
+
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                # Body first, so the metadata never points at a missing body
+                if body is not None:
+                    self._write_atomic(body_path, body)
+                self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not write HTTP cache entry for {url}: {e}")
+
+    @staticmethod
+    def _decode(entry: Dict[str, Any]) -> str:
+        """Decode a cached body using the encoding of the original response."""
+        return entry["body"].decode(entry.get("encoding") or 'utf-8', errors='replace')
+
+    def get(self, url: str, timeout: Optional[Any] = None) -> str:
+        """
+        Get the text of a URL, using the cache where possible.
+
+        Args:
+            url: The URL to fetch
+            timeout: Timeout passed to requests for network fetches
+
+        Returns:
+            The response body as text
+
+        Raises:
+            OfflineCacheMiss: In offline mode, if the URL isn't cached
+            requests.RequestException: If the fetch fails and nothing is cached
+        """
+        entry = self._load(url)
+
+        if entry is not None:
+            age = time.time() - entry.get("fetched_at", 0)
+            if self.offline or age < self.ttl:
+                logger.debug(f"HTTP cache hit for {url}")
+                return self._decode(entry)
+
+        if self.offline:
+            raise OfflineCacheMiss(f"{url} is not cached and offline mode is enabled")
+
+        # Revalidate with the stored validators
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = get_http_session().get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and entry is not None:
+                logger.debug(f"HTTP cache revalidated {url}")
+                entry["fetched_at"] = time.time()
+                self._store(url, entry)
+                return self._decode(entry)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if entry is None:
+                raise
+            logger.warning(f"Error fetching {url}: {e}. Serving stale cached copy.")
+            return self._decode(entry)
+
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "fetched_at": time.time()
+        }
+        self._store(url, meta, response.content)
+        return response.text
+
+
+_http_cache: Optional[HTTPCache] = None
+_http_cache_settings = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """
+    Get the process-wide HTTP cache configured in ``external_sources.http_cache``.
+
+    The ``KUPA_OFFLINE`` environment variable turns on offline mode regardless
+    of the configuration.
+
+    Returns:
+        The HTTP cache, or None if the cache is disabled
+    """
+    global _http_cache, _http_cache_settings
+
+    config = load_config()
+    cache_config = config.get("external_sources", {}).get("http_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+
+    offline = cache_config.get("offline", False) or os.environ.get("KUPA_OFFLINE", "") not in ("", "0", "false")
+    settings = (
+        cache_config.get("directory", "~/.cache/kupa/http"),
+        cache_config.get("ttl", 86400),
+        bool(offline)
+    )
+
+    with _http_cache_lock:
+        if _http_cache is None or settings != _http_cache_settings:
+            _http_cache = HTTPCache(*settings)
+            _http_cache_settings = settings
+        return _http_cache
@@ -4,65 +4,65 @@ Model Context Protocol (MCP) client for querying AI models about Kubernetes brea
 
 import logging
 import os
+import re
 import json
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 import requests
 
-import openai
-from openai import OpenAI
-
 from kupa.analyzer import K8sResource
+from kupa.analyzer.concurrency import provider_slot
+from kupa.analyzer.runs import bind_run, current_run
 from kupa.config import load_config
+from kupa.mcp.clients import (
+    OLLAMA_BASE_URL, get_http_session, get_openai_client, get_timeout, resolve_ollama_model
+)
+from kupa.mcp.response_cache import get_response_cache, make_cache_key
+from kupa.mcp.slimming import slim_resource, to_prompt_json, record_prompt_savings
 
 # Initialize the logger
 logger = logging.getLogger('kupa.mcp.model_client')
 
-def query_model_for_changes(resource: K8sResource, target_k8s_version: str) -> Dict[str, Any]:
-    """
-    Query the AI model for breaking changes in the given Kubernetes resource.
-    
-    Args:
-        resource: The Kubernetes resource to check
-        target_k8s_version: The target Kubernetes version
-        
-    Returns:
-        Dict with the model's response including:
-        - is_confident: Whether the model is confident in its answer
-        - has_breaking_change: Whether a breaking change was detected
-        - change_type: The type of breaking change (if any)
-        - description: Description of the breaking change
-        - recommended_action: Recommended action to fix the issue
-        - updated_content: Updated resource content with fixes applied
-    """
-    try:
-        # Load configuration
-        config = load_config()
-        ai_config = config.get("ai_model", {})
-        
-        # Get model settings
-        model_provider = ai_config.get("provider", "openai")
-        model_name = ai_config.get("model", "gpt-4-turbo")
-        temperature = ai_config.get("temperature", 0.1)
-        max_tokens = ai_config.get("max_tokens", 4000)
-        
-        # Format the query for the model
-        resource_yaml = json.dumps(resource.content, indent=2)
-        prompt = f"""
+# Bump whenever the prompt changes so cached responses for the old prompt are not reused
+PROMPT_VERSION = "2"
+
+SYSTEM_PROMPT = "You are a Kubernetes expert assistant that helps identify breaking changes in Kubernetes resources when upgrading versions."
+
+_UNPARSED_DESCRIPTION = "Could not parse model response. Using static fallback information."
+
+def _get_provider(ai_config: Dict[str, Any]) -> str:
+    """Get the model provider that queries will be sent to."""
+    if os.environ.get("MODEL_PROVIDER") == "ollama":
+        return "ollama"
+    return ai_config.get("provider", "openai").lower()
+
+
+def _resource_prompt_json(resource: K8sResource) -> str:
+    """Serialize the slimmed resource content for a prompt."""
+    resource_json = to_prompt_json(slim_resource(resource.content).content)
+    record_prompt_savings(resource.content, resource_json)
+    return resource_json
+
+
+def _build_prompt(resource: K8sResource, target_k8s_version: str) -> str:
+    """Build the prompt asking about a single resource."""
+    resource_yaml = _resource_prompt_json(resource)
+    return f"""
         I have a Kubernetes resource of kind {resource.kind} with apiVersion {resource.api_version}.
         I want to know if there are any breaking changes when upgrading to Kubernetes version {target_k8s_version}.
-        
+
         Here is the resource:
         ```yaml
         {resource_yaml}
         ```
-        
+
         Please analyze this resource and tell me:
         1. Are there any breaking changes for this resource in Kubernetes {target_k8s_version}?
         2. If yes, what is the change type (API_DEPRECATED, FIELD_REMOVED, etc.)?
         3. Description of the breaking change
         4. Recommended action to fix it
         5. The updated YAML that would fix the issue
-        
+
         Please format your response as JSON with the following structure:
         {{
             "has_breaking_change": true/false,
@@ -72,128 +72,274 @@ def query_model_for_changes(resource: K8sResource, target_k8s_version: str) -> D
             "updated_content": {{}} // the fixed resource as JSON
         }}
         """
-        
-        if os.environ.get("MODEL_PROVIDER") == "ollama":
-            try:
-                # First check if the Ollama server is running and which models are available
-                logger.info("Using Ollama as model provider. Checking available models...")
-                ollama_models_url = "http://localhost:11434/api/tags"
-                models_response = requests.get(ollama_models_url)
-                models_response.raise_for_status()
-                available_models = models_response.json().get("models", [])
-                
-                # Get model name from config (default to llama3)
-                ollama_model = ai_config.get("model", "llama3")
-                available_model_names = [model.get("name").split(":")[0] for model in available_models]
-                
-                # Make sure we have a model that exists
-                if not any(ollama_model.startswith(name) for name in available_model_names):
-                    logger.warning(f"Model {ollama_model} not found in Ollama. Available models: {available_model_names}")
-                    if "llama3" in available_model_names:
-                        logger.info("Falling back to llama3 model")
-                        ollama_model = "llama3"
-                    else:
-                        logger.warning(f"No suitable models found in Ollama. Using first available: {available_model_names[0]}")
-                        ollama_model = available_model_names[0]
-                
-                # Query local Ollama server
-                logger.info(f"Querying Ollama with model: {ollama_model}")
-                ollama_url = "http://localhost:11434/api/generate"
-                ollama_payload = {
-                    "model": ollama_model,
-                    "prompt": prompt,
-                    "stream": False
-                }
-                ollama_response = requests.post(ollama_url, json=ollama_payload)
-                ollama_response.raise_for_status()
-                response_json = ollama_response.json()
-                # Ollama returns the response in the 'response' field
-                response_text = response_json["response"]
-                logger.debug(f"Got response from Ollama: {response_text[:100]}...")
-                
-                # Helper function to extract JSON from potential free-form text
-                def extract_json_from_text(text):
-                    import re
-                    # Find JSON pattern between curly braces
-                    json_pattern = re.search(r'({[\s\S]*?})', text)
-                    if json_pattern:
-                        potential_json = json_pattern.group(1)
-                        try:
-                            return json.loads(potential_json)
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # Try with code block format ```json ... ```
-                    code_block_pattern = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
-                    if code_block_pattern:
-                        potential_json = code_block_pattern.group(1)
-                        try:
-                            return json.loads(potential_json)
-                        except json.JSONDecodeError:
-                            pass
-                    
-                    # Return a default response if no valid JSON found
-                    logger.warning("Could not extract valid JSON from Ollama response")
-                    return {
-                        "has_breaking_change": True,
-                        "change_type": "API_DEPRECATED",
-                        "description": "Could not parse model response. Using static fallback information.",
-                        "recommended_action": "Check manually or try again.",
-                        "updated_content": {}
-                    }
-
-                # Try to extract JSON from the response
-                try:
-                    model_response = extract_json_from_text(response_text)
-                    # Create a mock response object that matches the expected structure
-                    response = type('OllamaResponse', (), {"choices": [type('Choice', (), {"message": type('Message', (), {"content": json.dumps(model_response)})()})()]})()
-                except Exception as e:
-                    logger.error(f"Error extracting JSON from Ollama response: {e}")
-                    raise
-            except requests.exceptions.ConnectionError:
-                logger.error("Failed to connect to Ollama server. Is it running? Try: ollama serve")
-                raise
-            except requests.exceptions.HTTPError as e:
-                logger.error(f"HTTP error from Ollama: {e}")
-                raise
-            except KeyError as e:
-                logger.error(f"Unexpected response format from Ollama: {e}")
-                raise
-            except Exception as e:
-                logger.error(f"Unexpected error querying Ollama: {e}")
-                raise
-        elif model_provider.lower() == "openai":
-            # Initialize OpenAI client
-            client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY', 'your-api-key'))
-            
-            # Call the OpenAI API
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": "You are a Kubernetes expert assistant that helps identify breaking changes in Kubernetes resources when upgrading versions."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-        
-        # Parse the JSON response
-        response_text = response.choices[0].message.content
+
+
+def _build_batch_prompt(resources: Dict[str, K8sResource], target_k8s_version: str) -> str:
+    """Build the prompt asking about several resources, keyed by resource id."""
+    sections = []
+    for resource_id, resource in resources.items():
+        resource_json = _resource_prompt_json(resource)
+        sections.append(
+            f"Resource id: {resource_id}\n"
+            f"Kind: {resource.kind}, apiVersion: {resource.api_version}\n"
+            f"```yaml\n{resource_json}\n```"
+        )
+    resource_text = "\n\n".join(sections)
+
+    return f"""
+        I have {len(resources)} Kubernetes resources. For each of them I want to know if there are
+        any breaking changes when upgrading to Kubernetes version {target_k8s_version}.
+
+        {resource_text}
+
+        For every resource, tell me:
+        1. Are there any breaking changes for this resource in Kubernetes {target_k8s_version}?
+        2. If yes, what is the change type (API_DEPRECATED, FIELD_REMOVED, etc.)?
+        3. Description of the breaking change
+        4. Recommended action to fix it
+        5. The updated YAML that would fix the issue
+
+        Please format your response as JSON with one verdict per resource id:
+        {{
+            "results": [
+                {{
+                    "id": "the resource id",
+                    "has_breaking_change": true/false,
+                    "change_type": "string",
+                    "description": "string",
+                    "recommended_action": "string",
+                    "updated_content": {{}} // the fixed resource as JSON
+                }}
+            ]
+        }}
+        """
+
+
+def _extract_json_from_text(text: str) -> Dict[str, Any]:
+    """Extract a JSON object from free-form model output."""
+    # Find JSON pattern between curly braces
+    json_pattern = re.search(r'({[\s\S]*?})', text)
+    if json_pattern:
+        potential_json = json_pattern.group(1)
+        try:
+            return json.loads(potential_json)
+        except json.JSONDecodeError:
+            pass
+
+    # Try with code block format ```json ... ```
+    code_block_pattern = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
+    if code_block_pattern:
+        potential_json = code_block_pattern.group(1)
+        try:
+            return json.loads(potential_json)
+        except json.JSONDecodeError:
+            pass
+
+    # Return a default response if no valid JSON found
+    logger.warning("Could not extract valid JSON from Ollama response")
+    return {
+        "has_breaking_change": True,
+        "change_type": "API_DEPRECATED",
+        "description": _UNPARSED_DESCRIPTION,
+        "recommended_action": "Check manually or try again.",
+        "updated_content": {}
+    }
+
+
+def _query_ollama(prompt: str, ai_config: Dict[str, Any]) -> str:
+    """
+    Send a prompt to the local Ollama server.
+
+    Args:
+        prompt: The prompt to send
+        ai_config: The ``ai_model`` configuration section
+
+    Returns:
+        The raw text of the model's reply
+    """
+    try:
+        # The available models are cached, so this doesn't cost a round trip per query
+        logger.info("Using Ollama as model provider.")
+        ollama_model = resolve_ollama_model(ai_config.get("model", "llama3"))
+
+        # Query local Ollama server
+        logger.info(f"Querying Ollama with model: {ollama_model}")
+        ollama_url = f"{OLLAMA_BASE_URL}/api/generate"
+        ollama_payload = {
+            "model": ollama_model,
+            "prompt": prompt,
+            "stream": False
+        }
+        ollama_response = get_http_session().post(
+            ollama_url, json=ollama_payload, timeout=get_timeout(ai_config.get("read_timeout", 120))
+        )
+        ollama_response.raise_for_status()
+        response_json = ollama_response.json()
+        # Ollama returns the response in the 'response' field
+        response_text = response_json["response"]
+        logger.debug(f"Got response from Ollama: {response_text[:100]}...")
+        return response_text
+    except requests.exceptions.ConnectionError:
+        logger.error("Failed to connect to Ollama server. Is it running? Try: ollama serve")
+        raise
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"HTTP error from Ollama: {e}")
+        raise
+    except KeyError as e:
+        logger.error(f"Unexpected response format from Ollama: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error querying Ollama: {e}")
+        raise
+
+
+def _query_openai(prompt: str, ai_config: Dict[str, Any]) -> str:
+    """
+    Send a prompt to the OpenAI chat completions API.
+
+    Args:
+        prompt: The prompt to send
+        ai_config: The ``ai_model`` configuration section
+
+    Returns:
+        The raw JSON text of the model's reply
+    """
+    # Reuse the shared OpenAI client and its connection pool
+    client = get_openai_client()
+
+    # Call the OpenAI API
+    response = client.chat.completions.create(
+        model=ai_config.get("model", "gpt-4-turbo"),
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        temperature=ai_config.get("temperature", 0.1),
+        max_tokens=ai_config.get("max_tokens", 4000)
+    )
+    return response.choices[0].message.content
+
+
+def _query_provider(prompt: str, ai_config: Dict[str, Any]) -> str:
+    """Send a prompt to the configured provider and return the raw reply text."""
+    provider = _get_provider(ai_config)
+    if provider == "ollama":
+        return _query_ollama(prompt, ai_config)
+    if provider == "openai":
+        return _query_openai(prompt, ai_config)
+    raise ValueError(f"Unsupported model provider: {provider}")
+
+
+def _add_confidence(model_response: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the is_confident flag to a parsed model verdict."""
+    # Add confidence level based on the model's ability to provide an answer
+    is_confident = True
+    if "confidence" in model_response:
+        is_confident = model_response["confidence"] > 0.7
+    elif "I'm not sure" in model_response.get("description", "") or "uncertain" in model_response.get("description", "").lower():
+        is_confident = False
+
+    # Add confidence to the response
+    model_response["is_confident"] = is_confident
+    return model_response
+
+
+def _cache_key(resource: K8sResource, target_k8s_version: str, ai_config: Dict[str, Any]) -> str:
+    """Get the response cache key for a resource query."""
+    # Fields removed by slimming don't affect the answer, so they don't affect the key either
+    return make_cache_key(
+        slim_resource(resource.content).content, target_k8s_version, _get_provider(ai_config),
+        ai_config.get("model", "gpt-4-turbo"), PROMPT_VERSION
+    )
+
+
+def _restore_updated_content(resource: K8sResource, model_response: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the model's updated content back onto the fields slimming removed from the prompt."""
+    updated_content = model_response.get("updated_content")
+    if isinstance(updated_content, dict) and updated_content:
+        model_response["updated_content"] = slim_resource(resource.content).restore(updated_content)
+    return model_response
+
+
+def _store_response(cache_key: str, model_response: Dict[str, Any]) -> None:
+    """Store a verdict in the response cache, unless it is a placeholder."""
+    response_cache = get_response_cache()
+    # Don't cache placeholder responses for replies we couldn't parse
+    if response_cache is not None and model_response.get("description") != _UNPARSED_DESCRIPTION:
+        response_cache.put(cache_key, model_response)
+
+
+# Marks a resource prefetch_model_responses() didn't handle
+_NOT_PREFETCHED = object()
+
+
+def _query_uncached(resource: K8sResource, target_k8s_version: str, ai_config: Dict[str, Any],
+                    cache_key: str) -> Dict[str, Any]:
+    """
+    Ask the model about a single resource without looking at the response cache, and cache the answer.
+
+    Raises:
+        Exception: If the provider can't be queried or its reply can't be parsed
+    """
+    # Format the query for the model
+    prompt = _build_prompt(resource, target_k8s_version)
+    response_text = _query_provider(prompt, ai_config)
+
+    # Parse the JSON response
+    if _get_provider(ai_config) == "ollama":
+        model_response = _extract_json_from_text(response_text)
+    else:
         model_response = json.loads(response_text)
-        
-        # Add confidence level based on the model's ability to provide an answer
-        is_confident = True
-        if "confidence" in model_response:
-            is_confident = model_response["confidence"] > 0.7
-        elif "I'm not sure" in model_response.get("description", "") or "uncertain" in model_response.get("description", "").lower():
-            is_confident = False
-            
-        # Add confidence to the response
-        model_response["is_confident"] = is_confident
-        
-        return model_response
-        
+
+    model_response = _add_confidence(model_response)
+    _store_response(cache_key, model_response)
+    return model_response
+
+
+def query_model_for_changes(resource: K8sResource, target_k8s_version: str) -> Dict[str, Any]:
+    """
+    Query the AI model for breaking changes in the given Kubernetes resource.
+
+    Args:
+        resource: The Kubernetes resource to check
+        target_k8s_version: The target Kubernetes version
+
+    Returns:
+        Dict with the model's response including:
+        - is_confident: Whether the model is confident in its answer
+        - has_breaking_change: Whether a breaking change was detected
+        - change_type: The type of breaking change (if any)
+        - description: Description of the breaking change
+        - recommended_action: Recommended action to fix the issue
+        - updated_content: Updated resource content with fixes applied
+        - error: Why the model couldn't be queried, only present if it couldn't
+    """
+    try:
+        # Load configuration
+        config = load_config()
+        ai_config = config.get("ai_model", {})
+
+        # Use a verdict from a batched request or the response cache if there is one
+        cache_key = _cache_key(resource, target_k8s_version, ai_config)
+        run = current_run()
+        with run.lock:
+            prefetched_response = run.prefetched.pop(cache_key, _NOT_PREFETCHED)
+        if prefetched_response is not None and prefetched_response is not _NOT_PREFETCHED:
+            logger.info(f"Using batched model response for {resource}")
+            return _restore_updated_content(resource, prefetched_response)
+
+        # A failed prefetch already missed the response cache in this run
+        response_cache = get_response_cache()
+        if response_cache is not None and prefetched_response is _NOT_PREFETCHED:
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.info(f"Using cached model response for {resource}")
+                return _restore_updated_content(resource, cached_response)
+
+        model_response = _query_uncached(resource, target_k8s_version, ai_config, cache_key)
+        return _restore_updated_content(resource, model_response)
+
     except Exception as e:
         logger.error(f"Error querying AI model: {e}")
         # Return a default response indicating the model couldn't provide an answer
@@ -203,5 +349,200 @@ def query_model_for_changes(resource: K8sResource, target_k8s_version: str) -> D
             "change_type": None,
             "description": f"Error querying AI model: {str(e)}",
             "recommended_action": "Please check manually or try again later.",
-            "updated_content": resource.content
+            "updated_content": resource.content,
+            "error": str(e)
         }
+
+
+def _estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(resources: List[K8sResource], token_budget: int,
+                 max_batch_size: int) -> List[List[K8sResource]]:
+    """
+    Pack resources into batches that fit a prompt token budget.
+
+    Resources are measured in the slimmed, compact form they take in the
+    prompt. A resource that on its own exceeds the budget gets a batch of
+    its own.
+
+    Args:
+        resources: The resources to pack
+        token_budget: Approximate maximum number of resource tokens per batch
+        max_batch_size: Maximum number of resources per batch
+
+    Returns:
+        List of batches, preserving resource order
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for resource in resources:
+        tokens = _estimate_tokens(to_prompt_json(slim_resource(resource.content).content))
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(resource)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch_reply(response_text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Split a batched reply into per-resource verdicts.
+
+    Args:
+        response_text: The raw reply, either {"results": [...]} or a bare JSON array
+
+    Returns:
+        Dictionary mapping resource ids to their verdicts. Items that are
+        malformed are left out.
+    """
+    text = response_text.strip()
+    code_block = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
+    if code_block:
+        text = code_block.group(1)
+
+    reply = json.loads(text)
+    items = reply.get("results", []) if isinstance(reply, dict) else reply
+    if not isinstance(items, list):
+        return {}
+
+    verdicts = {}
+    for item in items:
+        if isinstance(item, dict) and "id" in item and isinstance(item.get("has_breaking_change"), bool):
+            verdicts[str(item.pop("id"))] = item
+    return verdicts
+
+
+def query_model_for_changes_batch(resources: List[K8sResource],
+                                  target_k8s_version: str) -> List[Optional[Dict[str, Any]]]:
+    """
+    Query the AI model about several resources in a single request.
+
+    The reply is split back into per-resource verdicts. Resources whose
+    verdict is missing or malformed are retried individually, without
+    looking at the response cache again.
+
+    Args:
+        resources: The Kubernetes resources to check
+        target_k8s_version: The target Kubernetes version
+
+    Returns:
+        List with the model's response for each resource, in the same order
+        and in the same format as query_model_for_changes(), or None where
+        the query failed
+    """
+    config = load_config()
+    ai_config = config.get("ai_model", {})
+    results: List[Optional[Dict[str, Any]]] = [None] * len(resources)
+
+    # Skip resources whose verdict is already cached
+    pending = {}
+    response_cache = get_response_cache()
+    for index, resource in enumerate(resources):
+        cached_response = response_cache.get(_cache_key(resource, target_k8s_version, ai_config)) \
+            if response_cache is not None else None
+        if cached_response is not None:
+            results[index] = cached_response
+        else:
+            pending[str(index)] = resource
+
+    verdicts = {}
+    if len(pending) > 1:
+        logger.info(f"Querying AI model about {len(pending)} resources in one request")
+        try:
+            prompt = _build_batch_prompt(pending, target_k8s_version)
+            verdicts = _parse_batch_reply(_query_provider(prompt, ai_config))
+        except Exception as e:
+            logger.warning(f"Error querying AI model with a batch: {e}. Retrying resources individually.")
+
+    for resource_id, resource in pending.items():
+        index = int(resource_id)
+        verdict = verdicts.get(resource_id)
+        if verdict is None:
+            try:
+                results[index] = _query_uncached(resource, target_k8s_version, ai_config,
+                                                 _cache_key(resource, target_k8s_version, ai_config))
+            except Exception as e:
+                logger.warning(f"Error querying AI model for {resource}: {e}")
+            continue
+
+        verdict = _add_confidence(verdict)
+        _store_response(_cache_key(resource, target_k8s_version, ai_config), verdict)
+        results[index] = verdict
+
+    return results
+
+
+def prefetch_model_responses(resources: List[K8sResource], target_k8s_version: str,
+                             max_in_flight: int = 1) -> int:
+    """
+    Fetch model verdicts for many resources ahead of the per-resource checks.
+
+    The verdicts are kept in the current run's state (see
+    kupa.analyzer.runs), so that the following query_model_for_changes()
+    call for each resource in the same run returns without a network round
+    trip. With
+    ``ai_model.batch.enabled`` several resources are sent per request; with
+    ``ai_model.async_client.enabled`` (OpenAI-compatible providers only) the
+    requests go through the rate-limited asyncio client.
+
+    Args:
+        resources: The Kubernetes resources that are about to be checked
+        target_k8s_version: The target Kubernetes version
+        max_in_flight: Maximum number of requests sent at the same time by
+            the thread-based path
+
+    Returns:
+        The number of requests made (batches count once)
+    """
+    config = load_config()
+    ai_config = config.get("ai_model", {})
+    batch_config = ai_config.get("batch", {})
+    provider = _get_provider(ai_config)
+
+    if batch_config.get("enabled", False):
+        batches = pack_batches(
+            resources,
+            token_budget=batch_config.get("token_budget", 12000),
+            max_batch_size=batch_config.get("max_resources", 20)
+        )
+    else:
+        batches = [[resource] for resource in resources]
+
+    if ai_config.get("async_client", {}).get("enabled", False) and provider == "openai":
+        from kupa.mcp.async_client import query_batches_async
+        batch_results = query_batches_async(batches, target_k8s_version, ai_config)
+    else:
+        def run_batch(batch):
+            with provider_slot(provider):
+                return query_model_for_changes_batch(batch, target_k8s_version)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="kupa-batch") as executor:
+            batch_results = list(executor.map(bind_run(run_batch), batches))
+
+    run = current_run()
+    with run.lock:
+        for batch, results in zip(batches, batch_results):
+            for resource, model_response in zip(batch, results):
+                # Failed queries (None) are left to the regular per-resource check,
+                # which then skips the response cache lookup already made here
+                run.prefetched[_cache_key(resource, target_k8s_version, ai_config)] = model_response
+
+    logger.info(f"Prefetched model verdicts for {len(resources)} resources in {len(batches)} requests")
+    return len(batches)
+
+
+def clear_prefetched() -> None:
+    """Drop the current run's prefetched verdicts that were not used."""
+    run = current_run()
+    with run.lock:
+        run.prefetched.clear()
@@ -0,0 +1,192 @@
+"""
+Persistent, content-addressed cache for AI model responses.
+
+Responses are keyed by a hash of the normalized resource content, the
+target version, the provider, the model and the prompt version, so an
+identical resource analyzed again (in any repository) is answered from the
+cache without a network call. Entries expire after a TTL and the least
+recently used entries are evicted once the cache grows past its size limit.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from kupa.config import load_config
+
+# Initialize the logger
+logger = logging.getLogger('kupa.mcp.response_cache')
+
+
+def make_cache_key(content: Dict[str, Any], target_k8s_version: str, provider: str,
+                   model: str, prompt_version: str) -> str:
+    """
+    Build the cache key for a model query.
+
+    Args:
+        content: The resource content sent to the model
+        target_k8s_version: The target Kubernetes version
+        provider: The model provider (e.g. 'openai', 'ollama')
+        model: The model name
+        prompt_version: Version of the prompt template
+
+    Returns:
+        A hex digest identifying the query
+    """
+    canonical = json.dumps({
+        "content": content,
+        "target": target_k8s_version.lstrip('v'),
+        "provider": provider.lower(),
+        "model": model,
+        "prompt_version": prompt_version
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed model response cache with TTL and LRU eviction."""
+
+    def __init__(self, path: str, ttl: float = 604800, max_entries: int = 50000):
+        """
+        Initialize the cache. The database is opened on first use.
+
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds a response stays valid
+            max_entries: Maximum number of responses kept
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating it if needed. Must be called with the lock held."""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            A fresh copy of the cached response, or None on a miss
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is not None and now - row[1] > self.ttl:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    connection.commit()
+                    row = None
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                connection.commit()
+                self.hits += 1
+                return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading model response cache: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Store a response, evicting expired and least recently used entries.
+
+        Args:
+            key: Key from make_cache_key()
+            response: The model response to store
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(response, default=str), now, now)
+                )
+                connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+                count = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.max_entries:
+                    connection.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing model response cache: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Get the hit and miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_settings = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache configured in ``ai_model.response_cache``.
+
+    Returns:
+        The response cache, or None if it is disabled
+    """
+    global _response_cache, _response_cache_settings
+
+    config = load_config()
+    cache_config = config.get("ai_model", {}).get("response_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+
+    settings = (
+        cache_config.get("path", "~/.cache/kupa/responses.sqlite"),
+        cache_config.get("ttl", 604800),
+        cache_config.get("max_entries", 50000)
+    )
+
+    with _response_cache_lock:
+        if _response_cache is None or settings != _response_cache_settings:
+            _response_cache = ResponseCache(*settings)
+            _response_cache_settings = settings
+        return _response_cache
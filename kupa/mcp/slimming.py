@@ -0,0 +1,200 @@
+"""
+Resource slimming for model prompts.
+
+Resources exported from a cluster carry a lot of data that is irrelevant to
+API compatibility: status, managed fields, the last-applied-configuration
+annotation, server-set metadata and large ConfigMap payloads. Slimming
+removes or truncates that data before the resource is sent to the model,
+and restores it onto the model's updated content afterwards, so nothing is
+lost from the manifests that are written back.
+"""
+
+import copy
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from kupa.config import load_config
+from kupa.analyzer.runs import current_run
+
+# Initialize the logger
+logger = logging.getLogger('kupa.mcp.slimming')
+
+TRUNCATION_MARKER = "...<truncated by kupa: {length} characters>"
+
+
+class SlimmedResource:
+    """A slimmed copy of a resource plus what is needed to restore the removed data."""
+
+    def __init__(self, content: Dict[str, Any], dropped: List[Tuple[Tuple[str, ...], Any]],
+                 truncated: Dict[str, str]):
+        """
+        Initialize the slimmed resource.
+
+        Args:
+            content: The slimmed resource content
+            dropped: (path, value) pairs of the fields that were removed
+            truncated: Mapping of truncated strings to their original values
+        """
+        self.content = content
+        self.dropped = dropped
+        self.truncated = truncated
+
+    def restore(self, updated_content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge the model's updated content back onto the data that was removed.
+
+        Removed fields are put back wherever the model's output doesn't set
+        them, and truncated strings are replaced by their original values.
+
+        Args:
+            updated_content: The updated content returned by the model
+
+        Returns:
+            The updated content with the removed data restored
+        """
+        if not isinstance(updated_content, dict):
+            return updated_content
+
+        restored = _restore_strings(copy.deepcopy(updated_content), self.truncated)
+
+        for path, value in self.dropped:
+            parent = restored
+            for key in path[:-1]:
+                child = parent.get(key)
+                if child is None:
+                    child = parent[key] = {}
+                if not isinstance(child, dict):
+                    break
+                parent = child
+            else:
+                parent.setdefault(path[-1], copy.deepcopy(value))
+
+        return restored
+
+
+def _restore_strings(value: Any, truncated: Dict[str, str]) -> Any:
+    """Replace truncated strings anywhere in a value with their original text."""
+    if not truncated:
+        return value
+    if isinstance(value, dict):
+        return {key: _restore_strings(item, truncated) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore_strings(item, truncated) for item in value]
+    if isinstance(value, str):
+        return truncated.get(value, value)
+    return value
+
+
+def _truncate_strings(value: Any, max_length: int, truncated: Dict[str, str]) -> Any:
+    """Truncate long strings anywhere in a value, remembering the originals."""
+    if isinstance(value, dict):
+        return {key: _truncate_strings(item, max_length, truncated) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_truncate_strings(item, max_length, truncated) for item in value]
+    if isinstance(value, str) and len(value) > max_length:
+        short = value[:max_length] + TRUNCATION_MARKER.format(length=len(value))
+        truncated[short] = value
+        return short
+    return value
+
+
+def _get_slimming_config() -> Dict[str, Any]:
+    """Get the ``ai_model.slimming`` configuration section."""
+    return load_config().get("ai_model", {}).get("slimming", {})
+
+
+def slim_resource(content: Dict[str, Any], settings: Optional[Dict[str, Any]] = None) -> SlimmedResource:
+    """
+    Remove and truncate fields that are irrelevant to API compatibility checks.
+
+    Args:
+        content: The full resource content
+        settings: The slimming settings. If None, the ``ai_model.slimming``
+            configuration section is used.
+
+    Returns:
+        The slimmed resource. The original content is not modified.
+    """
+    if settings is None:
+        settings = _get_slimming_config()
+    if not settings.get("enabled", True) or not isinstance(content, dict):
+        return SlimmedResource(content, [], {})
+
+    slimmed = copy.deepcopy(content)
+    dropped = []
+
+    # Remove whole fields
+    for field_path in settings.get("drop_fields", []):
+        path = tuple(field_path.split("."))
+        parent = slimmed
+        for key in path[:-1]:
+            parent = parent.get(key) if isinstance(parent, dict) else None
+            if parent is None:
+                break
+        if isinstance(parent, dict) and path[-1] in parent:
+            dropped.append((path, parent.pop(path[-1])))
+
+    # Remove annotations (their keys contain dots, so they are listed separately)
+    annotations = slimmed.get("metadata", {}).get("annotations") if isinstance(slimmed.get("metadata"), dict) else None
+    if isinstance(annotations, dict):
+        for annotation in settings.get("drop_annotations", []):
+            if annotation in annotations:
+                dropped.append((("metadata", "annotations", annotation), annotations.pop(annotation)))
+        if not annotations:
+            slimmed["metadata"].pop("annotations")
+
+    # Truncate long strings, e.g. ConfigMap payloads and embedded scripts
+    truncated = {}
+    max_length = settings.get("max_value_length", 0)
+    if max_length:
+        slimmed = _truncate_strings(slimmed, max_length, truncated)
+
+    return SlimmedResource(slimmed, dropped, truncated)
+
+
+def to_prompt_json(content: Dict[str, Any]) -> str:
+    """Serialize resource content for a prompt, compactly if slimming is enabled."""
+    if _get_slimming_config().get("compact_json", True):
+        return json.dumps(content, separators=(',', ':'), default=str)
+    return json.dumps(content, indent=2, default=str)
+
+
+def record_prompt_savings(original: Dict[str, Any], prompt_json: str) -> None:
+    """
+    Record how many tokens slimming saved for a resource sent to the model.
+
+    Args:
+        original: The full resource content
+        prompt_json: The serialized (slimmed) content that was sent instead
+    """
+    original_tokens = len(json.dumps(original, indent=2, default=str)) // 4
+    slimmed_tokens = len(prompt_json) // 4
+    run = current_run()
+    with run.lock:
+        run.slimming["resources"] += 1
+        run.slimming["original_tokens"] += original_tokens
+        run.slimming["slimmed_tokens"] += slimmed_tokens
+
+
+def get_slimming_stats() -> Dict[str, int]:
+    """
+    Get the slimming counters of the current run.
+
+    Returns:
+        Dictionary with the number of resources sent, their estimated tokens
+        before and after slimming, and the tokens saved
+    """
+    run = current_run()
+    with run.lock:
+        stats = dict(run.slimming)
+    stats["tokens_saved"] = stats["original_tokens"] - stats["slimmed_tokens"]
+    return stats
+
+
+def reset_slimming_stats() -> None:
+    """Reset the slimming counters of the current run."""
+    run = current_run()
+    with run.lock:
+        for key in run.slimming:
+            run.slimming[key] = 0
@@ -1,14 +1,26 @@
 """
 Output module for writing results to files with timestamps.
+
+Updated files are written by splicing the changed documents into the
+original bytes of the file: unchanged documents, their comments and their
+formatting stay byte-identical, and only the changed documents are
+serialized again. The same output can be rendered in memory, for the
+API, with render_updated_files().
 """
 
 import os
+import zlib
+import difflib
 import logging
-import yaml
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
+from kupa import yaml_io
 from kupa.analyzer import BreakingChange
+from kupa.analyzer.prescan import prescan_data, scan_header, split_documents
+
+# (kind, apiVersion, namespace, name) of a resource
+ResourceKey = Tuple[Any, Any, Optional[str], Any]
 
 # Initialize the logger
 logger = logging.getLogger('kupa.output')
@@ -22,7 +34,7 @@ def write_yaml_file(file_path: str, content: Dict[str, Any]) -> None:
         content: The dictionary to write as YAML
     """
     with open(file_path, 'w') as f:
-        yaml.dump(content, f, default_flow_style=False)
+        yaml_io.dump(content, f, default_flow_style=False)
         
 
 def generate_timestamped_path(original_path: str) -> str:
@@ -57,54 +69,289 @@ def write_local_results(directory: str, breaking_changes: List[BreakingChange])
         logger.info("No breaking changes detected. No files will be written.")
         return
         
-    file_changes = {}
-    for change in breaking_changes:
-        file_path = change.resource.file_path
-        
-        # Group changes by file path
-        if file_path not in file_changes:
-            file_changes[file_path] = []
-        file_changes[file_path].append(change)
-    
     # Process each file that has changes
-    for file_path, changes in file_changes.items():
-        # Read the original YAML file
-        with open(file_path, 'r') as f:
-            documents = list(yaml.safe_load_all(f))
-            
-        # Apply changes to the documents
-        for change in changes:
-            resource = change.resource
-            for i, doc in enumerate(documents):
-                # Find the matching document in the file
-                if is_same_resource(doc, resource.content):
-                    # Replace with updated content
-                    documents[i] = change.updated_content
-                    break
-        
+    for file_path, changes in group_by_file(breaking_changes).items():
         # Write the updated documents to a new timestamped file
         new_file_path = generate_timestamped_path(file_path)
-        with open(new_file_path, 'w') as f:
-            yaml.dump_all(documents, f, default_flow_style=False)
+        write_updated_file(file_path, changes, new_file_path)
             
         logger.info(f"Updated file written to: {new_file_path}")
         
         # Create a diff file with explanations
         diff_path = f"{new_file_path}.diff.txt"
         with open(diff_path, 'w') as f:
-            f.write(f"# Changes made to {os.path.basename(file_path)}\n")
-            f.write(f"# Original file: {file_path}\n")
-            f.write(f"# Updated file: {new_file_path}\n\n")
-            
-            for change in changes:
-                f.write(f"## Resource: {change.resource.kind}/{change.resource.api_version} '{change.resource.name}'\n")
-                f.write(f"Change type: {change.change_type}\n")
-                f.write(f"Description: {change.description}\n")
-                f.write(f"Recommended action: {change.recommended_action}\n\n")
+            f.write(format_explanation(file_path, new_file_path, changes))
                 
         logger.info(f"Explanation file written to: {diff_path}")
 
 
+def render_updated_files(files: Dict[str, bytes], 
+                         breaking_changes: List[BreakingChange]) -> List[Dict[str, str]]:
+    """
+    Produce the updated files of an in-memory analysis, without touching disk.
+    
+    Only the files with breaking changes are rendered, each by splicing its
+    changed documents into the original content.
+    
+    Args:
+        files: The original content of each file, by file name, as passed
+            to kupa.analyzer.analyze_documents()
+        breaking_changes: The breaking changes found in those files
+        
+    Returns:
+        One entry per changed file with its name (``original_file``), the
+        updated content (``updated_content``), a unified diff (``diff``)
+        and the explanation of the changes (``explanation``)
+    """
+    rendered = []
+    for file_path, changes in group_by_file(breaking_changes).items():
+        original = files[file_path]
+        updated = updated_file_content(original, changes)
+        original_text = original.decode('utf-8', errors='replace')
+        updated_text = updated.decode('utf-8', errors='replace')
+        diff = difflib.unified_diff(
+            original_text.splitlines(keepends=True), updated_text.splitlines(keepends=True),
+            fromfile=f"a/{file_path}", tofile=f"b/{file_path}"
+        )
+        rendered.append({
+            "original_file": file_path,
+            "updated_content": updated_text,
+            "diff": "".join(diff),
+            "explanation": format_explanation(file_path, None, changes)
+        })
+    return rendered
+
+
+def group_by_file(breaking_changes: List[BreakingChange]) -> Dict[str, List[BreakingChange]]:
+    """Group breaking changes by the file of their resource, keeping their order."""
+    file_changes = {}
+    for change in breaking_changes:
+        file_changes.setdefault(change.resource.file_path, []).append(change)
+    return file_changes
+
+
+def format_explanation(file_path: str, updated_path: Optional[str], changes: List[BreakingChange]) -> str:
+    """
+    Format the explanation of the changes made to a file.
+    
+    Args:
+        file_path: The original file
+        updated_path: The updated file, if it was written to disk
+        changes: The breaking changes for the file
+        
+    Returns:
+        The explanation text
+    """
+    lines = [f"# Changes made to {os.path.basename(file_path)}\n", f"# Original file: {file_path}\n"]
+    if updated_path is not None:
+        lines.append(f"# Updated file: {updated_path}\n")
+    lines.append("\n")
+    
+    for change in changes:
+        lines.append(f"## Resource: {change.resource.kind}/{change.resource.api_version} '{change.resource.name}'\n")
+        lines.append(f"Change type: {change.change_type}\n")
+        lines.append(f"Description: {change.description}\n")
+        lines.append(f"Recommended action: {change.recommended_action}\n\n")
+    return "".join(lines)
+
+
+def resource_key(doc: Dict[str, Any]) -> Optional[ResourceKey]:
+    """
+    Get the key identifying a Kubernetes resource document.
+    
+    Args:
+        doc: The parsed document
+        
+    Returns:
+        (kind, apiVersion, namespace, name), with the same defaults the
+        analyzer uses, or None if the document isn't a Kubernetes resource
+    """
+    if not (isinstance(doc, dict) and doc.get('kind') and doc.get('apiVersion')):
+        return None
+    metadata = doc.get('metadata') or {}
+    return doc['kind'], doc['apiVersion'], metadata.get('namespace'), metadata.get('name', 'unnamed')
+
+
+def load_documents(data: bytes) -> List[Tuple[Any, Optional[int]]]:
+    """
+    Load the documents of a YAML file with their positions.
+    
+    Documents are split and parsed the same way the analyzer does, so their
+    positions match the spans of the analyzed resources.
+    
+    Args:
+        data: The content of the YAML file
+        
+    Returns:
+        (document, byte offset or None) pairs in file order
+    """
+    documents = prescan_data(data)
+    if documents is not None:
+        return [(doc, span[0]) for doc, span in documents]
+    return [(doc, None) for doc in yaml_io.load_all(data)]
+
+
+def match_changes(documents: List[Tuple[Any, Optional[int]]],
+                  changes: List[BreakingChange]) -> List[Tuple[Any, Optional[BreakingChange]]]:
+    """
+    Match breaking changes to the documents of their file.
+    
+    Changes are indexed by the position of their resource's document and by
+    resource key, so matching is a dictionary lookup per document rather
+    than a scan of the file per change. Each change is matched at most once.
+    
+    Args:
+        documents: (document, byte offset or None) pairs from load_documents()
+        changes: The breaking changes for the file
+        
+    Returns:
+        (document, matching change or None) pairs in file order
+    """
+    by_offset: Dict[int, BreakingChange] = {}
+    by_key: Dict[ResourceKey, List[BreakingChange]] = {}
+    for change in changes:
+        resource = change.resource
+        span = getattr(resource, 'span', None)
+        if isinstance(span, tuple):
+            by_offset[span[0]] = change
+        else:
+            # Without a span the resource always keeps its content
+            by_key.setdefault(resource_key(resource.content), []).append(change)
+    
+    matched = []
+    for doc, offset in documents:
+        change = by_offset.pop(offset, None) if offset is not None else None
+        if change is None and by_key:
+            candidates = by_key.get(resource_key(doc))
+            if candidates:
+                change = candidates.pop(0)
+        matched.append((doc, change))
+    return matched
+
+
+def _leading_comments(document: bytes) -> int:
+    """Get the length of the blank and comment lines at the start of a document."""
+    position = 0
+    for line in document.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped and not stripped.startswith(b"#"):
+            break
+        position += len(line)
+    return position
+
+
+def splice_changes(data: bytes, changes: List[BreakingChange]) -> Optional[bytes]:
+    """
+    Splice the updated content of breaking changes into a YAML file's bytes.
+    
+    Each change replaces the document of its resource, found by the byte
+    span the analyzer recorded or, for resources without a valid span, by
+    resource key. Only documents whose kind and apiVersion could match are
+    parsed for the key. Comments at the start of a replaced document are
+    kept; everything outside the replaced documents is copied unchanged.
+    
+    Args:
+        data: The original content of the file
+        changes: The breaking changes for the file
+        
+    Returns:
+        The updated content, or None if the file can't be split into
+        documents and has to be rewritten in full
+    """
+    spans = split_documents(data)
+    if spans is None or data[:3] == b'\xef\xbb\xbf':
+        return None
+    starts = {start: end for start, end in spans}
+    
+    replacements: Dict[int, BreakingChange] = {}
+    by_key: Dict[ResourceKey, List[BreakingChange]] = {}
+    for change in changes:
+        if change.updated_content is None:
+            continue
+        span = getattr(change.resource, 'span', None)
+        if isinstance(span, tuple):
+            offset, length, checksum = span
+            if starts.get(offset) == offset + length and zlib.crc32(data[offset:offset + length]) == checksum:
+                replacements[offset] = change
+                continue
+            logger.debug(f"Span of {change.resource} is out of date, matching it by key")
+        # Without a span the resource always keeps its content
+        by_key.setdefault(resource_key(change.resource.content), []).append(change)
+    
+    if by_key:
+        headers = {key[:2] for key in by_key if key is not None}
+        for start, end in spans:
+            if start in replacements:
+                continue
+            header = scan_header(data[start:end])
+            if header is not None and header not in headers:
+                continue
+            candidates = by_key.get(resource_key(yaml_io.load(data[start:end])))
+            if candidates:
+                replacements[start] = candidates.pop(0)
+        unmatched = sum(len(candidates) for candidates in by_key.values())
+        if unmatched:
+            logger.warning(f"{unmatched} changed resources were not found in their file")
+    
+    parts = []
+    position = 0
+    for start in sorted(replacements):
+        end = starts[start]
+        keep = start + _leading_comments(data[start:end])
+        parts.append(data[position:keep])
+        parts.append(yaml_io.dump(replacements[start].updated_content, default_flow_style=False).encode('utf-8'))
+        position = end
+    parts.append(data[position:])
+    return b"".join(parts)
+
+
+def updated_file_content(data: bytes, changes: List[BreakingChange]) -> bytes:
+    """
+    Get the content of a YAML file with the updated content of its breaking changes.
+    
+    The changed documents are spliced into the original content (see
+    splice_changes()). Content that can't be split into documents is parsed
+    and dumped in full instead.
+    
+    Args:
+        data: The original content of the file
+        changes: The breaking changes for the file
+        
+    Returns:
+        The updated content
+    """
+    updated = splice_changes(data, changes)
+    if updated is None:
+        documents = [
+            change.updated_content if change is not None and change.updated_content is not None else doc
+            for doc, change in match_changes(load_documents(data), changes)
+        ]
+        updated = yaml_io.dump_all(documents, default_flow_style=False).encode('utf-8')
+    return updated
+
+
+def write_updated_file(file_path: str, changes: List[BreakingChange],
+                       output_path: Optional[str] = None) -> None:
+    """
+    Write a YAML file with the updated content of its breaking changes.
+    
+    The updated content is written at once (see updated_file_content()).
+    
+    Args:
+        file_path: Path of the original YAML file
+        changes: The breaking changes for the file
+        output_path: Where to write the updated file. If None, the original
+            file is overwritten.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    
+    updated = updated_file_content(data, changes)
+    
+    with open(output_path or file_path, 'wb') as f:
+        f.write(updated)
+
+
 def is_same_resource(doc1: Dict[str, Any], doc2: Dict[str, Any]) -> bool:
     """
     Check if two Kubernetes resource documents are the same.
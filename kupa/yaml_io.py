@@ -0,0 +1,83 @@
+"""
+YAML I/O for KuPa.
+
+All YAML reading and writing goes through this module. It uses the
+libyaml-backed ``CSafeLoader``/``CSafeDumper`` when PyYAML was built with
+libyaml, which is many times faster, and falls back to the pure-Python
+``SafeLoader``/``SafeDumper`` otherwise. Both load the same safe subset of
+YAML and produce the same output.
+"""
+
+import logging
+from typing import Any, Iterator, List, Optional, IO, Union
+
+import yaml
+
+logger = logging.getLogger('kupa.yaml_io')
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    LIBYAML = False
+
+YAMLError = yaml.YAMLError
+
+Stream = Union[str, bytes, IO]
+
+
+def load(stream: Stream) -> Any:
+    """
+    Load a single YAML document.
+
+    Args:
+        stream: YAML text or an open file
+
+    Returns:
+        The parsed document
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_all(stream: Stream) -> Iterator[Any]:
+    """
+    Load every document of a multi-document YAML stream, lazily.
+
+    Args:
+        stream: YAML text or an open file
+
+    Returns:
+        An iterator over the parsed documents
+    """
+    return yaml.load_all(stream, Loader=SafeLoader)
+
+
+def dump(data: Any, stream: Optional[IO] = None, **kwargs) -> Optional[str]:
+    """
+    Dump a single YAML document.
+
+    Args:
+        data: The document to dump
+        stream: Open file to write to. If None, the YAML text is returned.
+        **kwargs: Formatting options passed to yaml.dump (e.g. default_flow_style)
+
+    Returns:
+        The YAML text if no stream was given, otherwise None
+    """
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+def dump_all(documents: List[Any], stream: Optional[IO] = None, **kwargs) -> Optional[str]:
+    """
+    Dump several YAML documents separated by ``---``.
+
+    Args:
+        documents: The documents to dump
+        stream: Open file to write to. If None, the YAML text is returned.
+        **kwargs: Formatting options passed to yaml.dump_all (e.g. default_flow_style)
+
+    Returns:
+        The YAML text if no stream was given, otherwise None
+    """
+    return yaml.dump_all(documents, stream, Dumper=SafeDumper, **kwargs)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the memory held by parsed Kubernetes resources.
+
+Generates a synthetic corpus of Kubernetes manifests, parses it, and uses
+tracemalloc to measure the memory the resources hold with their content
+loaded and after it is released.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+# Make the kupa package importable when running from a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kupa.analyzer import find_yaml_files, parse_k8s_yaml
+
+from benchmark_parse import generate_corpus
+
+
+def measure(yaml_files: list, release: bool) -> tuple:
+    """Parse the corpus and return (resource count, bytes held, peak bytes, seconds)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    resources = []
+    for yaml_file in yaml_files:
+        file_resources = parse_k8s_yaml(yaml_file)
+        if release:
+            for resource in file_resources:
+                resource.release()
+        resources.extend(file_resources)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(resources), current, peak, elapsed
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the memory held by parsed resources")
+    parser.add_argument("--files", type=int, default=2000, help="Number of YAML files to generate")
+    parser.add_argument("--docs-per-file", type=int, default=5, help="Documents per YAML file")
+
+    args = parser.parse_args()
+
+    corpus_dir = tempfile.mkdtemp(prefix="kupa-bench-")
+    try:
+        print(f"Generating {args.files} files with {args.docs_per_file} documents each in {corpus_dir}...")
+        generate_corpus(corpus_dir, args.files, args.docs_per_file)
+        yaml_files = sorted(find_yaml_files(corpus_dir))
+
+        print(f"{'content':>10} {'resources':>10} {'held (MiB)':>12} {'peak (MiB)':>12} {'bytes/res':>10} {'seconds':>8}")
+        for release in (False, True):
+            count, current, peak, elapsed = measure(yaml_files, release)
+            label = "released" if release else "loaded"
+            print(f"{label:>10} {count:>10} {current / 1048576:>12.1f} {peak / 1048576:>12.1f} "
+                  f"{current // max(count, 1):>10} {elapsed:>8.2f}")
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the parallel YAML parsing stage.
+
+Generates a synthetic corpus of Kubernetes manifests and times the lazy
+walk and parse used by the analyzer (iter_yaml_files() feeding
+iter_parsed_files()) with an increasing number of worker processes.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Make the kupa package importable when running from a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kupa import yaml_io
+from kupa.analyzer import iter_parsed_files
+from kupa.analyzer.walker import iter_yaml_files
+
+
+def generate_documents(index: int, docs_per_file: int) -> list:
+    """Build the documents of one synthetic multi-document Kubernetes manifest."""
+    documents = []
+    for j in range(docs_per_file):
+        documents.append({
+            "apiVersion": "apps/v1beta2" if j % 2 else "apps/v1",
+            "kind": "Deployment",
+            "metadata": {
+                "name": f"app-{index}-{j}",
+                "namespace": "default",
+                "labels": {"app": f"app-{index}-{j}", "tier": "backend"}
+            },
+            "spec": {
+                "replicas": 3,
+                "selector": {"matchLabels": {"app": f"app-{index}-{j}"}},
+                "template": {
+                    "metadata": {"labels": {"app": f"app-{index}-{j}"}},
+                    "spec": {
+                        "containers": [
+                            {
+                                "name": "app",
+                                "image": "nginx:1.25",
+                                "ports": [{"containerPort": 80}],
+                                "env": [{"name": f"VAR_{k}", "value": str(k)} for k in range(10)]
+                            }
+                        ]
+                    }
+                }
+            }
+        })
+    return documents
+
+
+def generate_corpus(directory: str, files: int, docs_per_file: int) -> None:
+    """Write a synthetic corpus of multi-document Kubernetes manifests."""
+    for i in range(files):
+        with open(os.path.join(directory, f"manifest-{i}.yaml"), "w") as f:
+            yaml_io.dump_all(generate_documents(i, docs_per_file), f)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark parallel YAML parsing")
+    parser.add_argument("--files", type=int, default=2000, help="Number of YAML files to generate")
+    parser.add_argument("--docs-per-file", type=int, default=5, help="Documents per YAML file")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="Largest worker count to measure")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Files handed to a worker at a time")
+
+    args = parser.parse_args()
+
+    corpus_dir = tempfile.mkdtemp(prefix="kupa-bench-")
+    try:
+        print(f"Generating {args.files} files with {args.docs_per_file} documents each in {corpus_dir}...")
+        generate_corpus(corpus_dir, args.files, args.docs_per_file)
+
+        worker_counts = sorted({1, 2, 4, 8, 16, args.max_workers})
+        worker_counts = [w for w in worker_counts if w <= args.max_workers]
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>10} {'resources':>10} {'speedup':>8}")
+        for workers in worker_counts:
+            start = time.perf_counter()
+            resources = sum(
+                len(parsed) for _, parsed in iter_parsed_files(
+                    iter_yaml_files(corpus_dir), workers=workers, chunk_size=args.chunk_size
+                )
+            )
+            elapsed = time.perf_counter() - start
+
+            if baseline is None:
+                baseline = elapsed
+            print(f"{workers:>8} {elapsed:>10.2f} {resources:>10} {baseline / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(corpus_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark for YAML loading and dumping.
+
+Generates a synthetic corpus of Kubernetes manifests in memory and compares
+the throughput of the pure-Python SafeLoader/SafeDumper with the loader and
+dumper used by kupa.yaml_io (libyaml-backed when available).
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import yaml
+
+# Make the kupa package importable when running from a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kupa import yaml_io
+from benchmark_parse import generate_documents
+
+
+def measure(label: str, function, size_mb: float) -> float:
+    """Time one run of a function and print its throughput."""
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:>10.2f} {size_mb / elapsed:>10.1f}")
+    return elapsed
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark YAML loading and dumping")
+    parser.add_argument("--files", type=int, default=500, help="Number of manifest files to simulate")
+    parser.add_argument("--docs-per-file", type=int, default=5, help="Documents per manifest file")
+
+    args = parser.parse_args()
+
+    corpus = [generate_documents(i, args.docs_per_file) for i in range(args.files)]
+    texts = [yaml.dump_all(documents, Dumper=yaml.SafeDumper) for documents in corpus]
+    size_mb = sum(len(text) for text in texts) / 1e6
+
+    print(f"Corpus: {args.files} files, {args.files * args.docs_per_file} documents, {size_mb:.1f} MB")
+    print(f"libyaml available: {yaml_io.LIBYAML}")
+    print(f"{'':<24} {'seconds':>10} {'MB/s':>10}")
+
+    pure_load = measure("load (pure Python)", lambda: [
+        list(yaml.load_all(text, Loader=yaml.SafeLoader)) for text in texts], size_mb)
+    fast_load = measure("load (kupa.yaml_io)", lambda: [
+        list(yaml_io.load_all(text)) for text in texts], size_mb)
+    pure_dump = measure("dump (pure Python)", lambda: [
+        yaml.dump_all(documents, Dumper=yaml.SafeDumper, default_flow_style=False) for documents in corpus], size_mb)
+    fast_dump = measure("dump (kupa.yaml_io)", lambda: [
+        yaml_io.dump_all(documents, default_flow_style=False) for documents in corpus], size_mb)
+
+    print(f"Speedup: load {pure_load / fast_load:.1f}x, dump {pure_dump / fast_dump:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
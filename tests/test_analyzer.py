@@ -3,13 +3,14 @@ Tests for the analyzer module.
 """
 
 import os
+import sys
 import pytest
 from unittest.mock import patch, MagicMock
 
 # Import the functions directly to avoid circular imports during test execution
 from kupa.analyzer import (
-    analyze_directory, parse_k8s_yaml, find_yaml_files, check_for_breaking_changes,
-    BreakingChange
+    analyze_directory, parse_k8s_yaml, parse_yaml_files, find_yaml_files, 
+    check_for_breaking_changes, BreakingChange
 )
 
 
@@ -40,6 +41,20 @@ def test_parse_k8s_yaml(temp_k8s_dir):
     assert resources[0].namespace == "default"
 
 
+def test_parse_yaml_files_parallel(temp_k8s_dir):
+    """Test that parsing with a process pool matches a serial parse."""
+    yaml_files = sorted(find_yaml_files(temp_k8s_dir))
+    
+    serial = parse_yaml_files(yaml_files, workers=1)
+    parallel = parse_yaml_files(yaml_files, workers=2, chunk_size=1)
+    
+    # Same resources, in the same order
+    assert len(parallel) == 3
+    assert [(r.kind, r.name, r.file_path) for r in parallel] == \
+        [(r.kind, r.name, r.file_path) for r in serial]
+    assert [r.content for r in parallel] == [r.content for r in serial]
+
+
 @patch('kupa.mcp.external_fetcher.fetch_from_k8s_docs')
 @patch('kupa.mcp.model_client.query_model_for_changes')
 def test_check_for_breaking_changes_model_confident(mock_query, mock_fetch, sample_k8s_resource):
@@ -63,7 +78,9 @@ def test_check_for_breaking_changes_model_confident(mock_query, mock_fetch, samp
     
     # Set up environment for OpenAI API key
     with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-        breaking_change = check_for_breaking_changes(sample_k8s_resource, "v1.25")
+        # Model before the static table, so the model is actually consulted
+        breaking_change = check_for_breaking_changes(sample_k8s_resource, "v1.25",
+                                                     tiers=["openai", "docs", "static"])
     
         # Check if we detected the breaking change
         assert breaking_change is not None
@@ -105,7 +122,9 @@ def test_check_for_breaking_changes_model_not_confident(mock_query, mock_fetch,
     
     # Set up environment for OpenAI API key
     with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
-        breaking_change = check_for_breaking_changes(sample_k8s_resource, "v1.25")
+        # Model before the static table, so the model is actually consulted
+        breaking_change = check_for_breaking_changes(sample_k8s_resource, "v1.25",
+                                                     tiers=["openai", "docs", "static"])
         
         # Check if we detected the breaking change
         assert breaking_change is not None
@@ -117,6 +136,64 @@ def test_check_for_breaking_changes_model_not_confident(mock_query, mock_fetch,
         mock_fetch.assert_called_once()
 
 
+@patch('kupa.mcp.external_fetcher.fetch_from_k8s_docs')
+@patch('kupa.mcp.model_client.query_model_for_changes')
+def test_static_tier_short_circuits_network(mock_query, mock_fetch, sample_k8s_resource):
+    """Test that a static hit resolves the resource without the model or the docs."""
+    from kupa.analyzer.tiers import get_tier_stats, reset_tier_stats
+    reset_tier_stats()
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        breaking_change = check_for_breaking_changes(sample_k8s_resource, "v1.25")
+    
+    assert breaking_change.change_type == "API_REMOVED"
+    assert breaking_change.updated_content["apiVersion"] == "apps/v1"
+    mock_query.assert_not_called()
+    mock_fetch.assert_not_called()
+    assert get_tier_stats() == {"calls": {"static": 1}, "hits": {"static": 1}, "errors": {}}
+
+
+@patch('kupa.mcp.external_fetcher.fetch_from_k8s_docs')
+@patch('kupa.mcp.model_client.query_model_for_changes')
+def test_tier_errors_are_recorded_per_resource(mock_query, mock_fetch, sample_k8s_resource):
+    """Test that a failed model query or docs fetch is remembered for the resource."""
+    from kupa.analyzer.tiers import get_tier_stats, pop_tier_errors, reset_tier_stats
+    mock_query.return_value = {"is_confident": False, "has_breaking_change": False, "error": "offline"}
+    mock_fetch.return_value = {"found_breaking_change": False, "error": "Could not fetch the changelog"}
+    reset_tier_stats()
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        assert check_for_breaking_changes(sample_k8s_resource, "v1.25", tiers=["openai", "docs"]) is None
+    
+    assert get_tier_stats()["errors"] == {"openai": 1, "docs": 1}
+    assert get_tier_stats()["hits"] == {"none": 1}
+    assert pop_tier_errors([sample_k8s_resource]) == [True]
+    assert pop_tier_errors([sample_k8s_resource]) == [False]
+
+
+@patch('kupa.mcp.external_fetcher.fetch_from_k8s_docs')
+@patch('kupa.mcp.model_client.query_model_for_changes')
+def test_stable_resources_skip_network_tiers(mock_query, mock_fetch, sample_k8s_resource):
+    """Test that known-stable API versions skip the model and docs unless asked."""
+    from kupa.analyzer.tiers import get_tier_stats, reset_tier_stats
+    sample_k8s_resource.api_version = "apps/v1"
+    mock_query.return_value = {"is_confident": True, "has_breaking_change": False}
+    mock_fetch.return_value = {"found_breaking_change": False}
+    reset_tier_stats()
+    
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        assert check_for_breaking_changes(sample_k8s_resource, "v1.25") is None
+        mock_query.assert_not_called()
+        mock_fetch.assert_not_called()
+        assert get_tier_stats()["hits"] == {"stable": 1}
+        
+        with patch('kupa.analyzer.skip_stable_enabled', return_value=False):
+            assert check_for_breaking_changes(sample_k8s_resource, "v1.25") is None
+        mock_query.assert_called_once()
+        mock_fetch.assert_called_once()
+        assert get_tier_stats()["hits"] == {"stable": 1, "none": 1}
+
+
 @patch('kupa.mcp.external_fetcher.fetch_from_k8s_docs')
 @patch('kupa.analyzer.check_for_breaking_changes')
 def test_analyze_directory(mock_check, mock_fetch, temp_k8s_dir):
@@ -157,3 +234,214 @@ def test_analyze_directory(mock_check, mock_fetch, temp_k8s_dir):
     api_versions = [r.resource.api_version for r in results]
     assert "apps/v1beta2" in api_versions
     assert "extensions/v1beta1" in api_versions
+
+
+def test_check_resources_concurrent(temp_k8s_dir):
+    """Test that resources are checked concurrently and results keep their order."""
+    import threading
+    import time
+    from kupa.analyzer import check_resources
+    
+    resources = parse_yaml_files(sorted(find_yaml_files(temp_k8s_dir)))
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+    
+    def slow_check(resource, version):
+        with lock:
+            in_flight.append(resource)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(resource)
+        return resource.name
+    
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=slow_check):
+        results = check_resources(resources * 4, "v1.25", max_in_flight=3)
+    
+    assert results == [r.name for r in resources * 4]
+    assert max(peak) == 3
+
+
+def test_provider_slot_limits_concurrency():
+    """Test that per-provider limits cap concurrent calls to that provider."""
+    import threading
+    import time
+    from kupa.analyzer.concurrency import configure_provider_limits, provider_slot
+    
+    configure_provider_limits({"openai": 2, "docs": 0})
+    active = []
+    peak = []
+    lock = threading.Lock()
+    
+    def call(provider):
+        with provider_slot(provider):
+            with lock:
+                active.append(provider)
+                peak.append(active.count(provider))
+            time.sleep(0.05)
+            with lock:
+                active.remove(provider)
+    
+    try:
+        threads = [threading.Thread(target=call, args=("openai",)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max(peak) == 2
+        
+        # Unlimited providers are not throttled
+        with provider_slot("docs"):
+            pass
+    finally:
+        configure_provider_limits()
+
+
+def test_iter_breaking_changes_streams_in_order(temp_k8s_dir):
+    """Test that findings are yielded before later files are checked, in analyze_directory order."""
+    import copy
+    from kupa.analyzer import iter_breaking_changes
+    from kupa.config import load_config
+    
+    checked = []
+    
+    def check(resource, version):
+        checked.append(resource.file_path)
+        if "beta" in resource.api_version:
+            return BreakingChange(resource, "API_REMOVED", "removed", "update", resource.content)
+        return None
+    
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=check):
+        expected = [c.resource.file_path for c in analyze_directory(temp_k8s_dir, "v1.25")]
+        
+        checked.clear()
+        config = copy.deepcopy(load_config())
+        config["analysis"]["stream_window"] = 1
+        with patch('kupa.analyzer.load_config', return_value=config):
+            stream = iter_breaking_changes(temp_k8s_dir, "v1.25", max_in_flight=1)
+            first = next(stream)
+            # With a window of one resource, the first finding arrives before the rest is checked
+            assert checked[-1] == first.resource.file_path
+            assert len(checked) < 3
+            
+            assert [first.resource.file_path] + [c.resource.file_path for c in stream] == expected
+
+
+def test_analyze_documents_checkpoints_each_window():
+    """Test that in-memory analyses call the checkpoint per window and stop when it raises."""
+    import copy
+    from kupa.analyzer import analyze_documents
+    from kupa.config import load_config
+    
+    files = {
+        f"{name}.yaml": f"apiVersion: policy/v1beta1\nkind: PodDisruptionBudget\nmetadata:\n  name: {name}\n".encode()
+        for name in ("first", "second", "third")
+    }
+    checked = []
+    
+    def check(resource, version):
+        checked.append(resource.name)
+        return BreakingChange(resource, "API_REMOVED", "removed", "update", resource.content)
+    
+    class Stop(Exception):
+        pass
+    
+    def checkpoint(resources_checked):
+        checkpoints.append(resources_checked)
+        if resources_checked >= 2:
+            raise Stop()
+    
+    config = copy.deepcopy(load_config())
+    config["analysis"]["stream_window"] = 1
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=check), \
+            patch('kupa.analyzer.load_config', return_value=config):
+        checkpoints = []
+        assert len(analyze_documents(files, "v1.25", dedup=False, checkpoint=checkpoints.append)) == 3
+        assert checkpoints == [0, 1, 2]
+        
+        checked.clear()
+        checkpoints = []
+        with pytest.raises(Stop):
+            analyze_documents(files, "v1.25", dedup=False, checkpoint=checkpoint)
+        assert checked == ["first", "second"]
+
+
+def test_latest_alias_is_resolved(tmp_path):
+    """Test that the ``latest`` alias works as a target and stable resources don't break it."""
+    from kupa.analyzer import analyze_documents, is_known_stable
+    from kupa.config import get_kubernetes_version
+    
+    deployment = (
+        b"apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: web\n"
+        b"spec:\n  template:\n    spec:\n      containers: [{name: web, image: nginx}]\n"
+    )
+    (tmp_path / "web.yaml").write_bytes(deployment)
+    
+    assert analyze_documents({"web.yaml": deployment}, "latest") == []
+    assert analyze_directory(str(tmp_path), "latest") == []
+    
+    resource = parse_k8s_yaml(str(tmp_path / "web.yaml"))[0]
+    assert is_known_stable(resource, get_kubernetes_version("latest"))
+    assert not is_known_stable(resource, "latest")
+
+
+def test_iter_parsed_files_parallel(temp_k8s_dir):
+    """Test that lazily parsing with a process pool yields files in order."""
+    from kupa.analyzer import iter_parsed_files
+    
+    yaml_files = sorted(find_yaml_files(temp_k8s_dir)) * 3
+    parsed = list(iter_parsed_files(yaml_files, workers=2, chunk_size=1))
+    
+    assert [f for f, _ in parsed] == yaml_files
+    assert [[r.name for r in resources] for _, resources in parsed] == \
+        [[r.name for r in parse_k8s_yaml(f)] for f in yaml_files]
+
+
+def test_resource_content_is_released_and_reloaded(tmp_path):
+    """Test that released content is parsed again from the document's span."""
+    path = tmp_path / "multi.yaml"
+    path.write_text(
+        "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: first\n"
+        "---\n"
+        "apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: second\n  namespace: default\n"
+    )
+    first, second = parse_k8s_yaml(str(path))
+    original = second.content
+    
+    assert not hasattr(second, "__dict__")
+    assert second.kind is sys.intern("Deployment")
+    
+    second.release()
+    assert second._content is None
+    assert second.content == original
+    assert first.content["metadata"]["name"] == "first"
+    
+    # The document changed on disk since it was parsed
+    second.release()
+    path.write_text(path.read_text().replace("second", "changed"))
+    with pytest.raises(ValueError):
+        second.content
+
+
+def test_resource_without_span_keeps_content(tmp_path):
+    """Test that resources from a full parse (no spans) never drop their content."""
+    path = tmp_path / "directive.yaml"
+    path.write_text("%YAML 1.1\n---\napiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: cm\n")
+    resource, = parse_k8s_yaml(str(path))
+    
+    assert resource.span is None
+    resource.release()
+    assert resource.content["metadata"]["name"] == "cm"
+
+
+def test_parse_k8s_version_is_cached():
+    """Test that versions are parsed once and compared as Version objects."""
+    from kupa.analyzer import parse_k8s_version, is_known_stable
+    
+    assert parse_k8s_version("v1.25") is parse_k8s_version("v1.25")
+    assert parse_k8s_version("v1.25.3") > parse_k8s_version("1.25")
+    
+    resource = MagicMock(kind="Deployment", api_version="apps/v1")
+    assert is_known_stable(resource, "v1.25")
+    assert not is_known_stable(MagicMock(kind="Deployment", api_version="apps/v1beta1"), "v1.25")
@@ -0,0 +1,160 @@
+"""
+Tests for the asyncio model client, against a local fake OpenAI-compatible server.
+"""
+
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from unittest.mock import patch
+
+from kupa.analyzer import K8sResource
+from kupa.mcp.async_client import TokenBucket, query_batches_async
+
+
+MODEL_REPLY = {
+    "has_breaking_change": True,
+    "change_type": "API_DEPRECATED",
+    "description": "apps/v1beta2 was removed in v1.16",
+    "recommended_action": "Use apps/v1 instead",
+    "updated_content": {"apiVersion": "apps/v1", "kind": "Deployment"}
+}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions, after replaying a scripted list of failures."""
+
+    failures = []  # (status, headers) tuples returned before succeeding
+    requests_seen = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.requests_seen.append(json.loads(body))
+
+        if self.failures:
+            status, headers = self.failures.pop(0)
+            payload = json.dumps({"error": {"message": "failure", "type": "error"}}).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        payload = json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(MODEL_REPLY)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    """Run a fake OpenAI-compatible server and return its base URL."""
+    FakeOpenAIHandler.failures = []
+    FakeOpenAIHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch('kupa.mcp.async_client.get_response_cache', return_value=None), \
+            patch('kupa.mcp.model_client.get_response_cache', return_value=None):
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def _ai_config(base_url, **async_settings):
+    settings = {"max_retries": 4, "backoff_base": 0.01, "backoff_max": 0.05, "max_concurrency": 4}
+    settings.update(async_settings)
+    return {"model": "gpt-test", "base_url": base_url, "async_client": settings}
+
+
+def _resources(count):
+    return [
+        K8sResource(
+            kind="Deployment", api_version="apps/v1beta2", name=f"app-{i}", namespace="default",
+            file_path="/tmp/test.yaml",
+            content={"apiVersion": "apps/v1beta2", "kind": "Deployment", "metadata": {"name": f"app-{i}"}}
+        )
+        for i in range(count)
+    ]
+
+
+def test_retries_on_rate_limit_and_server_errors(fake_openai):
+    """Test that 429 and 5xx responses are retried without losing verdicts."""
+    FakeOpenAIHandler.failures = [(429, {"Retry-After": "0"}), (503, {}), (500, {})]
+
+    results = query_batches_async([[r] for r in _resources(5)], "v1.25", _ai_config(fake_openai))
+
+    assert [verdicts[0]["change_type"] for verdicts in results] == ["API_DEPRECATED"] * 5
+    assert all(verdicts[0]["is_confident"] for verdicts in results)
+    assert len(FakeOpenAIHandler.requests_seen) == 8
+
+
+def test_retry_after_is_honoured(fake_openai):
+    """Test that the client waits as long as Retry-After asks."""
+    FakeOpenAIHandler.failures = [(429, {"Retry-After": "0.3"})]
+
+    start = time.monotonic()
+    results = query_batches_async([_resources(1)], "v1.25", _ai_config(fake_openai))
+
+    assert time.monotonic() - start >= 0.3
+    assert results[0][0]["has_breaking_change"] is True
+
+
+def test_non_retryable_errors_give_up(fake_openai):
+    """Test that client errors are not retried and leave the verdict empty."""
+    FakeOpenAIHandler.failures = [(400, {})]
+
+    results = query_batches_async([_resources(1)], "v1.25", _ai_config(fake_openai))
+
+    assert results == [[None]]
+    assert len(FakeOpenAIHandler.requests_seen) == 1
+
+
+def test_token_bucket_paces_requests():
+    """Test that the token bucket limits the request rate."""
+    async def run():
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 10 per second
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.29
+
+
+def test_rate_limit_is_shared_between_calls(fake_openai):
+    """Test that consecutive calls draw from one request budget."""
+    config = _ai_config(fake_openai, requests_per_minute=30)  # one every 2 seconds, a burst of 30
+
+    # The first call uses up the whole burst allowance
+    start = time.monotonic()
+    query_batches_async([[r] for r in _resources(30)], "v1.25", config)
+    first = time.monotonic() - start
+
+    # The second call has to wait for the bucket to refill instead of starting with a fresh one
+    start = time.monotonic()
+    results = query_batches_async([_resources(1)], "v1.25", config)
+    assert time.monotonic() - start >= 1.5 - first
+    assert results[0][0]["has_breaking_change"] is True
@@ -93,3 +93,45 @@ def test_get_kubernetes_version():
         
         # Test with direct version
         assert get_kubernetes_version("v1.22.0") == "v1.22.0"
+
+
+def test_load_config_reloads_edited_file(tmp_path):
+    """Test that the config file is parsed once and parsed again after it is edited."""
+    from kupa import yaml_io
+
+    config_file = tmp_path / "kupa.yaml"
+    config_file.write_text("kubernetes_versions:\n  latest: v1.29.0\n")
+
+    with patch('kupa.config.yaml_io.load', side_effect=yaml_io.load) as mock_load:
+        assert load_config(str(config_file))["kubernetes_versions"]["latest"] == "v1.29.0"
+        assert load_config(str(config_file))["kubernetes_versions"]["latest"] == "v1.29.0"
+        assert mock_load.call_count == 1
+
+        # An edit of the same size is picked up through the modification time
+        config_file.write_text("kubernetes_versions:\n  latest: v1.30.0\n")
+        stat = os.stat(config_file)
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert load_config(str(config_file))["kubernetes_versions"]["latest"] == "v1.30.0"
+
+        config_file.write_text("kubernetes_versions:\n  latest: v1.31.0\n  lts: v1.28.0\n")
+        assert load_config(str(config_file))["kubernetes_versions"]["lts"] == "v1.28.0"
+        assert mock_load.call_count == 3
+
+
+def test_load_config_returns_independent_copies(tmp_path):
+    """Test that changing a loaded config doesn't change the defaults or later loads."""
+    from kupa.config import DEFAULT_CONFIG
+
+    config_file = tmp_path / "kupa.yaml"
+    config_file.write_text("analysis:\n  resolution_order: [static, docs]\n")
+    default_tiers = list(DEFAULT_CONFIG["analysis"]["resolution_order"])
+
+    config = load_config(str(config_file))
+    config["analysis"]["resolution_order"].append("openai")
+    config["kubernetes_versions"]["latest"] = "v0.0.0"
+
+    assert DEFAULT_CONFIG["analysis"]["resolution_order"] == default_tiers
+    assert DEFAULT_CONFIG["kubernetes_versions"]["latest"] != "v0.0.0"
+    reloaded = load_config(str(config_file))
+    assert reloaded["analysis"]["resolution_order"] == ["static", "docs"]
+    assert reloaded["kubernetes_versions"]["latest"] == DEFAULT_CONFIG["kubernetes_versions"]["latest"]
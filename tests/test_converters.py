@@ -0,0 +1,178 @@
+"""
+Tests for the deterministic migration converters.
+"""
+
+import copy
+
+import pytest
+from unittest.mock import patch
+
+from kupa.analyzer import K8sResource, check_for_breaking_changes, check_static
+from kupa.analyzer.converters import ConversionError, convert, has_converter
+from kupa.analyzer.fields import get_field_rule_index
+
+
+def _resource(content):
+    return K8sResource(kind=content["kind"], api_version=content["apiVersion"], name="test", namespace=None,
+                       file_path="test.yaml", content=content)
+
+
+def test_convert_ingress():
+    """Test that Ingress backends, defaultBackend and pathType are converted."""
+    ingress = {
+        "apiVersion": "extensions/v1beta1",
+        "kind": "Ingress",
+        "metadata": {"name": "web"},
+        "spec": {
+            "backend": {"serviceName": "default", "servicePort": 80},
+            "rules": [{"host": "a.example.com", "http": {"paths": [
+                {"path": "/", "backend": {"serviceName": "web", "servicePort": "http"}},
+                {"path": "/api", "pathType": "Prefix", "backend": {"serviceName": "api", "servicePort": "8080"}}
+            ]}}]
+        }
+    }
+    original = copy.deepcopy(ingress)
+    converted = convert(ingress)
+
+    assert ingress == original
+    assert converted["apiVersion"] == "networking.k8s.io/v1"
+    assert converted["spec"]["defaultBackend"] == {"service": {"name": "default", "port": {"number": 80}}}
+    assert "backend" not in converted["spec"]
+    paths = converted["spec"]["rules"][0]["http"]["paths"]
+    assert paths[0] == {"path": "/", "pathType": "ImplementationSpecific",
+                        "backend": {"service": {"name": "web", "port": {"name": "http"}}}}
+    assert paths[1]["pathType"] == "Prefix"
+    assert paths[1]["backend"]["service"]["port"] == {"number": 8080}
+    # Nothing the field rules flag is left
+    assert get_field_rule_index().match(converted, "Ingress", "networking.k8s.io/v1beta1", "v1.22") == []
+
+
+def test_convert_crd():
+    """Test that CRD schemas, subresources and printer columns move into the versions."""
+    crd = {
+        "apiVersion": "apiextensions.k8s.io/v1beta1",
+        "kind": "CustomResourceDefinition",
+        "metadata": {"name": "widgets.example.com"},
+        "spec": {
+            "group": "example.com",
+            "version": "v1",
+            "scope": "Namespaced",
+            "names": {"kind": "Widget", "plural": "widgets"},
+            "validation": {"openAPIV3Schema": {"type": "object", "properties": {"spec": {"type": "object"}}}},
+            "subresources": {"status": {}},
+            "additionalPrinterColumns": [{"name": "Age", "type": "date", "JSONPath": ".metadata.creationTimestamp"}],
+            "preserveUnknownFields": False
+        }
+    }
+    converted = convert(crd)
+    spec = converted["spec"]
+
+    assert converted["apiVersion"] == "apiextensions.k8s.io/v1"
+    assert not {"version", "validation", "subresources", "additionalPrinterColumns", "preserveUnknownFields"} & set(spec)
+    version, = spec["versions"]
+    assert version["name"] == "v1" and version["served"] and version["storage"]
+    assert version["schema"] == crd["spec"]["validation"]
+    assert version["subresources"] == {"status": {}}
+    assert version["additionalPrinterColumns"] == [
+        {"name": "Age", "type": "date", "jsonPath": ".metadata.creationTimestamp"}
+    ]
+
+    # Without a schema, unknown fields stay preserved as they were in v1beta1
+    del crd["spec"]["validation"], crd["spec"]["preserveUnknownFields"]
+    schema = convert(crd)["spec"]["versions"][0]["schema"]["openAPIV3Schema"]
+    assert schema == {"type": "object", "x-kubernetes-preserve-unknown-fields": True}
+
+
+def test_convert_hpa_v2beta1():
+    """Test that v2beta1 metric targets are converted to the v2 form."""
+    hpa = {
+        "apiVersion": "autoscaling/v2beta1",
+        "kind": "HorizontalPodAutoscaler",
+        "spec": {"metrics": [
+            {"type": "Resource", "resource": {"name": "cpu", "targetAverageUtilization": 80}},
+            {"type": "Pods", "pods": {"metricName": "qps", "targetAverageValue": "1k"}},
+            {"type": "External", "external": {"metricName": "queue", "metricSelector": {"matchLabels": {"q": "a"}},
+                                              "targetValue": 30}}
+        ]}
+    }
+    metrics = convert(hpa)["spec"]["metrics"]
+    assert metrics[0]["resource"] == {"name": "cpu", "target": {"type": "Utilization", "averageUtilization": 80}}
+    assert metrics[1]["pods"] == {"metric": {"name": "qps"}, "target": {"type": "AverageValue", "averageValue": "1k"}}
+    assert metrics[2]["external"] == {"metric": {"name": "queue", "selector": {"matchLabels": {"q": "a"}}},
+                                      "target": {"type": "Value", "value": 30}}
+
+
+def test_convert_simple_migrations():
+    """Test the PDB, CronJob, HPA v2beta2 and workload converters."""
+    assert convert({"apiVersion": "policy/v1beta1", "kind": "PodDisruptionBudget",
+                    "spec": {"minAvailable": 1, "selector": {"matchLabels": {"app": "web"}}}})["apiVersion"] == "policy/v1"
+    with pytest.raises(ConversionError):
+        convert({"apiVersion": "policy/v1beta1", "kind": "PodDisruptionBudget", "spec": {"selector": {}}})
+
+    assert convert({"apiVersion": "batch/v1beta1", "kind": "CronJob",
+                    "spec": {"schedule": "* * * * *", "jobTemplate": {"spec": {}}}})["apiVersion"] == "batch/v1"
+    assert convert({"apiVersion": "autoscaling/v2beta2", "kind": "HorizontalPodAutoscaler",
+                    "spec": {}})["apiVersion"] == "autoscaling/v2"
+
+    statefulset = convert({"apiVersion": "apps/v1beta1", "kind": "StatefulSet",
+                           "spec": {"template": {"metadata": {"labels": {"app": "db"}}}}})
+    assert statefulset["spec"]["selector"] == {"matchLabels": {"app": "db"}}
+    assert statefulset["spec"]["updateStrategy"] == {"type": "OnDelete"}
+
+    assert not has_converter("Role", "rbac.authorization.k8s.io/v1beta1")
+    assert convert({"apiVersion": "rbac.authorization.k8s.io/v1beta1", "kind": "Role"}) is None
+
+
+def test_static_tier_uses_converters():
+    """Test that the static tier returns converted manifests and asks the model only when conversion fails."""
+    change = check_static(_resource({
+        "apiVersion": "networking.k8s.io/v1beta1", "kind": "Ingress",
+        "spec": {"backend": {"serviceName": "web", "servicePort": 80}}
+    }), "v1.22")
+    assert change.complete
+    assert change.updated_content["spec"]["defaultBackend"]["service"]["name"] == "web"
+
+    pdb = _resource({"apiVersion": "policy/v1beta1", "kind": "PodDisruptionBudget", "spec": {"selector": {}}})
+    assert not check_static(pdb, "v1.25").complete
+
+    model_result = {"has_breaking_change": True, "is_confident": True, "change_type": "API_REMOVED",
+                    "description": "model", "recommended_action": "model",
+                    "updated_content": {"apiVersion": "policy/v1", "kind": "PodDisruptionBudget", "spec": {}}}
+    with patch.dict('os.environ', {"OPENAI_API_KEY": "test-key", "MODEL_PROVIDER": ""}), \
+            patch('kupa.mcp.model_client.query_model_for_changes', return_value=model_result) as mock_query:
+        result = check_for_breaking_changes(pdb, "v1.25", tiers=["static", "openai", "docs"])
+        mock_query.assert_called_once()
+        # The deterministic finding is kept, with the model's manifest
+        assert result.description.startswith("policy/v1beta1 PodDisruptionBudget was removed")
+        assert result.updated_content == model_result["updated_content"]
+
+        mock_query.reset_mock()
+        check_for_breaking_changes(_resource({"apiVersion": "batch/v1beta1", "kind": "CronJob",
+                                              "spec": {"jobTemplate": {"spec": {}}}}),
+                                   "v1.25", tiers=["static", "openai"])
+        mock_query.assert_not_called()
+
+
+def test_converted_manifest_with_removed_fields_is_incomplete():
+    """Test that a conversion leaving removed fields in place is not marked complete."""
+    cronjob = {
+        "apiVersion": "batch/v1beta1",
+        "kind": "CronJob",
+        "metadata": {"name": "backup"},
+        "spec": {
+            "schedule": "0 * * * *",
+            "jobTemplate": {"spec": {"template": {
+                "metadata": {"annotations": {"seccomp.security.alpha.kubernetes.io/pod": "runtime/default"}},
+                "spec": {"containers": [{"name": "backup", "image": "backup:1"}]}
+            }}}
+        }
+    }
+    change = check_static(_resource(cronjob), "v1.25")
+
+    assert change.change_type == "API_REMOVED"
+    assert change.updated_content["apiVersion"] == "batch/v1"
+    assert not change.complete
+
+    # Without the annotation the conversion is complete
+    del cronjob["spec"]["jobTemplate"]["spec"]["template"]["metadata"]
+    assert check_static(_resource(cronjob), "v1.25").complete
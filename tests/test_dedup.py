@@ -0,0 +1,98 @@
+"""
+Tests for within-run deduplication of identical resources.
+"""
+
+import os
+
+from unittest.mock import patch
+
+from kupa.analyzer import K8sResource, BreakingChange, iter_breaking_changes
+from kupa.analyzer.dedup import ResourceDeduplicator
+
+
+def _deployment(name, namespace="default", image="nginx:1.25", labels=None):
+    return {
+        "apiVersion": "extensions/v1beta1",
+        "kind": "Deployment",
+        "metadata": {"name": name, "namespace": namespace, "labels": labels or {"app": name}},
+        "spec": {"template": {"spec": {"containers": [{"name": "web", "image": image}]}}}
+    }
+
+
+def _resource(content):
+    metadata = content["metadata"]
+    return K8sResource(kind=content["kind"], api_version=content["apiVersion"], name=metadata["name"],
+                       namespace=metadata.get("namespace"), file_path="test.yaml", content=content)
+
+
+def test_fingerprint_ignores_configured_fields():
+    """Test that resources only differing in name, namespace and labels share a fingerprint."""
+    deduplicator = ResourceDeduplicator()
+    web = _resource(_deployment("web"))
+    copy = _resource(_deployment("web-staging", namespace="staging", labels={"env": "staging"}))
+    other = _resource(_deployment("web", image="nginx:1.26"))
+
+    assert deduplicator.fingerprint(web) == deduplicator.fingerprint(copy)
+    assert deduplicator.fingerprint(web) != deduplicator.fingerprint(other)
+    # The resource itself is not modified
+    assert web.content["metadata"]["name"] == "web"
+
+    strict = ResourceDeduplicator(ignore_fields=[])
+    assert strict.fingerprint(web) != strict.fingerprint(copy)
+
+
+def test_fan_out_keeps_each_copy_metadata():
+    """Test that a shared verdict gets the copy's own name, namespace and labels."""
+    deduplicator = ResourceDeduplicator()
+    web = _resource(_deployment("web"))
+    copy = _resource(_deployment("web-staging", namespace="staging", labels={"env": "staging"}))
+
+    fingerprints, to_check = deduplicator.partition([web, copy])
+    assert to_check == [0]
+
+    updated = dict(web.content, apiVersion="apps/v1")
+    change = BreakingChange(web, "API_REMOVED", "removed", "Update apiVersion to apps/v1", updated)
+    deduplicator.record(fingerprints[0], change)
+
+    assert deduplicator.fan_out(web, fingerprints[0]) is change
+    shared = deduplicator.fan_out(copy, fingerprints[1])
+    assert shared.resource is copy
+    assert shared.change_type == "API_REMOVED"
+    assert shared.updated_content["apiVersion"] == "apps/v1"
+    assert shared.updated_content["metadata"] == {
+        "name": "web-staging", "namespace": "staging", "labels": {"env": "staging"}
+    }
+    assert change.updated_content["metadata"]["name"] == "web"
+
+    assert deduplicator.resources == 2
+    assert deduplicator.unique == 1
+    assert deduplicator.ratio == 2.0
+
+
+def test_iter_breaking_changes_checks_duplicates_once(tmp_path):
+    """Test that identical resources across files are checked once and all reported."""
+    import yaml
+
+    for environment in ("dev", "staging", "prod"):
+        with open(os.path.join(tmp_path, f"{environment}.yaml"), "w") as f:
+            yaml.dump(_deployment("web", namespace=environment), f)
+
+    checked = []
+
+    def check(resource, target_k8s_version, tiers=None):
+        checked.append(resource)
+        return BreakingChange(resource, "API_REMOVED", "removed", "Update apiVersion",
+                              dict(resource.content, apiVersion="apps/v1"))
+
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=check):
+        changes = list(iter_breaking_changes(str(tmp_path), "v1.25", workers=1, max_in_flight=1,
+                                             incremental=False, dedup=True))
+        assert len(checked) == 1
+        assert [change.updated_content["metadata"]["namespace"] for change in changes] == \
+            ["dev", "prod", "staging"]
+
+        checked.clear()
+        changes = list(iter_breaking_changes(str(tmp_path), "v1.25", workers=1, max_in_flight=1,
+                                             incremental=False, dedup=False))
+        assert len(checked) == 3
+        assert len(changes) == 3
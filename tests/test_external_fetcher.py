@@ -0,0 +1,125 @@
+"""
+Tests for the external fetcher module.
+"""
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+
+from kupa.analyzer import K8sResource
+from kupa.analyzer.runs import bind_run
+from kupa.mcp import external_fetcher
+from kupa.mcp.external_fetcher import fetch_from_k8s_docs, clear_docs_cache
+from kupa.mcp.clients import get_http_session
+from kupa.mcp.http_cache import HTTPCache
+
+
+CHANGELOG = """
+# v1.25.0
+
+## Deprecation
+
+* The policy/v1beta1 API version of PodSecurityPolicy is removed; use Pod Security Admission
+* Removed the deprecated flag --foo
+"""
+
+API_REFERENCE = """
+<html><body>
+<h2>Deployment v1 apps</h2>
+<p>Group version apps/v1</p>
+<h2>PodSecurityPolicy v1beta1 policy</h2>
+<p>This version is deprecated and removed in v1.25</p>
+</body></html>
+"""
+
+
+def _fake_get(url, **kwargs):
+    response = MagicMock(status_code=200, headers={}, encoding="utf-8")
+    response.raise_for_status.return_value = None
+    response.text = CHANGELOG if url.endswith(".md") else API_REFERENCE
+    response.content = response.text.encode("utf-8")
+    return response
+
+
+@pytest.fixture(autouse=True)
+def fresh_docs_cache(tmp_path):
+    """Make sure every test starts with empty in-memory and on-disk docs caches."""
+    clear_docs_cache()
+    with patch('kupa.mcp.external_fetcher.get_http_cache', return_value=HTTPCache(str(tmp_path))):
+        yield
+    clear_docs_cache()
+
+
+def _resource(i, kind="Deployment", api_version="apps/v1"):
+    return K8sResource(
+        kind=kind,
+        api_version=api_version,
+        name=f"app-{i}",
+        namespace="default",
+        file_path="/tmp/test.yaml",
+        content={"apiVersion": api_version, "kind": kind, "metadata": {"name": f"app-{i}"}}
+    )
+
+
+def test_docs_fetched_once_per_run():
+    """Test that many resources share a constant number of HTTP requests."""
+    with patch.object(get_http_session(), 'get', side_effect=_fake_get) as mock_get:
+        for i in range(200):
+            fetch_from_k8s_docs(_resource(i), "v1.25")
+            fetch_from_k8s_docs(_resource(i, "PodSecurityPolicy", "policy/v1beta1"), "v1.25")
+
+    # One changelog download and one API reference download
+    assert mock_get.call_count == 2
+
+
+def test_memoized_results_match_uncached():
+    """Test that memoized lookups return the same verdicts as the first lookup."""
+    psp = _resource(0, "PodSecurityPolicy", "policy/v1beta1")
+
+    with patch.object(get_http_session(), 'get', side_effect=_fake_get):
+        first = fetch_from_k8s_docs(psp, "v1.25")
+        second = fetch_from_k8s_docs(psp, "v1.25")
+
+    assert first == second
+    assert first["found_breaking_change"] is True
+    assert "PodSecurityPolicy" in first["description"]
+
+
+def test_failed_fetch_is_memoized():
+    """Test that an unreachable source is only tried once."""
+    with patch.object(get_http_session(), 'get', side_effect=ConnectionError("offline")) as mock_get:
+        for i in range(10):
+            result = fetch_from_k8s_docs(_resource(i), "v1.25")
+            assert result["found_breaking_change"] is False
+            assert result["error"] == "Could not fetch the changelog and API reference for v1.25"
+
+    # Three candidate changelog URLs and the API reference, each tried once
+    assert mock_get.call_count == 4
+    assert len(external_fetcher._get_docs_cache()) == 2
+
+
+def test_each_run_has_its_own_docs_cache():
+    """Test that runs start with an empty docs cache and leave other runs' caches alone."""
+    from kupa.analyzer import analyze_documents
+
+    with patch.object(get_http_session(), 'get', side_effect=ConnectionError("offline")):
+        fetch_from_k8s_docs(_resource(0), "v1.25")
+    outer_cache = external_fetcher._get_docs_cache()
+    assert len(outer_cache) == 2
+
+    sizes = []
+
+    def check(resource, version):
+        cache = external_fetcher._get_docs_cache()
+        # Threads bound to the run share its cache
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(bind_run(external_fetcher._get_docs_cache)).result() is cache
+        sizes.append(len(cache))
+        clear_docs_cache()
+
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=check):
+        analyze_documents({"cm.yaml": b"apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: cm\n"}, "v1.25")
+
+    assert sizes == [0]
+    assert external_fetcher._get_docs_cache() is outer_cache
+    assert len(outer_cache) == 2
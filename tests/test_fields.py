@@ -0,0 +1,107 @@
+"""
+Tests for the field-level deprecation matcher.
+"""
+
+import pytest
+
+from kupa.analyzer import K8sResource, check_static
+from kupa.analyzer.fields import (
+    FieldRule, FieldRuleIndex, get_field_rule_index, load_field_rules, parse_path, format_path
+)
+
+
+INGRESS = {
+    "apiVersion": "extensions/v1beta1",
+    "kind": "Ingress",
+    "metadata": {"name": "web", "annotations": {"kubernetes.io/ingress.class": "nginx"}},
+    "spec": {
+        "backend": {"serviceName": "default", "servicePort": 80},
+        "rules": [
+            {"host": "a.example.com"},
+            {"http": {"paths": [
+                {"path": "/", "backend": {"serviceName": "web", "servicePort": 80}}
+            ]}}
+        ]
+    }
+}
+
+
+def test_parse_and_format_path():
+    """Test field path syntax round trips."""
+    assert parse_path('spec.rules[].http.*.name') == (
+        ("key", "spec"), ("key", "rules"), ("items", ""), ("key", "http"), ("any", ""), ("key", "name")
+    )
+    assert parse_path('metadata.annotations["a.io/*"]')[-1] == ("prefix", "a.io/")
+    assert format_path(["metadata", "annotations", "a.io/b", "x", 0]) == 'metadata.annotations["a.io/b"].x[0]'
+    with pytest.raises(ValueError):
+        parse_path("spec..rules")
+
+
+def test_packaged_rules_load():
+    """Test that the packaged field rules load."""
+    ids = {rule.id for rule in load_field_rules()}
+    assert {"ingress-service-name", "crd-validation", "seccomp-pod-annotation"} <= ids
+
+
+def test_match_reports_exact_paths():
+    """Test that findings carry the exact path and the change type for the target."""
+    index = get_field_rule_index()
+    findings = index.match(INGRESS, "Ingress", "extensions/v1beta1", "v1.22")
+    assert sorted((f.path, f.change_type) for f in findings) == [
+        ('metadata.annotations["kubernetes.io/ingress.class"]', "FIELD_DEPRECATED"),
+        ("spec.backend", "FIELD_REMOVED"),
+        ("spec.rules[1].http.paths[0].backend.serviceName", "FIELD_REMOVED"),
+        ("spec.rules[1].http.paths[0].backend.servicePort", "FIELD_REMOVED"),
+    ]
+
+    # Rules limited to the beta API versions don't match networking.k8s.io/v1
+    v1 = index.match(INGRESS, "Ingress", "networking.k8s.io/v1", "v1.22")
+    assert [f.path for f in v1] == ['metadata.annotations["kubernetes.io/ingress.class"]']
+    # Nothing applies before the rules do
+    assert index.match(INGRESS, "Ingress", "extensions/v1beta1", "v1.17") == []
+
+
+def test_pod_scoped_rules_follow_templates():
+    """Test that pod-scoped rules match pod templates, including key prefixes."""
+    cron_job = {"spec": {"jobTemplate": {"spec": {"template": {"metadata": {"annotations": {
+        "container.seccomp.security.alpha.kubernetes.io/app": "runtime/default",
+        "team": "web"
+    }}}}}}}
+    findings = get_field_rule_index().match(cron_job, "CronJob", "batch/v1", "v1.25")
+    assert [(f.rule.id, f.path) for f in findings] == [(
+        "seccomp-container-annotation",
+        'spec.jobTemplate.spec.template.metadata.annotations["container.seccomp.security.alpha.kubernetes.io/app"]'
+    )]
+
+
+def test_trie_is_compiled_per_target():
+    """Test that only the rules applying to a target version are compiled."""
+    index = FieldRuleIndex([
+        FieldRule(id="old", kinds=("Widget",), path="spec.old", description="gone", removed_in=(1, 20, 0)),
+        FieldRule(id="any", kinds=("Widget",), path="spec.*.legacy", description="deprecated",
+                  deprecated_in=(1, 25, 0)),
+    ])
+    document = {"spec": {"old": 1, "a": {"legacy": True}, "b": {"legacy": False}}}
+
+    assert [f.path for f in index.match(document, "Widget", "v1", "v1.19")] == []
+    assert [f.path for f in index.match(document, "Widget", "v1", "v1.20")] == ["spec.old"]
+    assert [f.path for f in index.match(document, "Widget", "v1", "v1.25")] == \
+        ["spec.old", "spec.a.legacy", "spec.b.legacy"]
+    assert index.for_target("v1.25") is index.for_target("1.25.0")
+    assert "Widget" not in index.for_target("v1.19")
+
+
+def test_check_static_reports_fields():
+    """Test that the static tier reports field findings with the API removal."""
+    resource = K8sResource(kind="Ingress", api_version="extensions/v1beta1", name="web", namespace=None,
+                           file_path="ingress.yaml", content=INGRESS)
+    change = check_static(resource, "v1.22")
+    assert change.change_type == "API_REMOVED"
+    assert "spec.rules[1].http.paths[0].backend.serviceName" in change.description
+    assert "Replace spec.backend with spec.defaultBackend" in change.recommended_action
+
+    service = K8sResource(kind="Service", api_version="v1", name="svc", namespace=None, file_path="svc.yaml",
+                          content={"apiVersion": "v1", "kind": "Service", "spec": {"topologyKeys": ["*"]}})
+    assert check_static(service, "v1.21").change_type == "FIELD_DEPRECATED"
+    assert check_static(service, "v1.22").change_type == "FIELD_REMOVED"
+    assert check_static(service, "v1.20") is None
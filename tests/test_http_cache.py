@@ -0,0 +1,101 @@
+"""
+Tests for the persistent HTTP cache.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from kupa.mcp.http_cache import HTTPCache, OfflineCacheMiss
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves a fixed document with an ETag and honours If-None-Match."""
+
+    body = b"# CHANGELOG\n\n* Removed extensions/v1beta1 Ingress\n"
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/markdown; charset=utf-8")
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Run a local stub HTTP server."""
+    StubHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fresh_entry_served_without_network(stub_server, tmp_path):
+    """Test that a fresh cached document doesn't hit the network."""
+    cache = HTTPCache(str(tmp_path), ttl=3600)
+    url = f"{stub_server}/CHANGELOG-1.25.md"
+
+    assert cache.get(url) == StubHandler.body.decode()
+    # A new cache instance (e.g. a new CLI run) reads from disk
+    assert HTTPCache(str(tmp_path), ttl=3600).get(url) == StubHandler.body.decode()
+    assert len(StubHandler.requests_seen) == 1
+
+
+def test_stale_entry_revalidated(stub_server, tmp_path):
+    """Test that stale entries are revalidated with a conditional request."""
+    cache = HTTPCache(str(tmp_path), ttl=0)
+    url = f"{stub_server}/CHANGELOG-1.25.md"
+
+    cache.get(url)
+    assert cache.get(url) == StubHandler.body.decode()
+
+    assert len(StubHandler.requests_seen) == 2
+    assert StubHandler.requests_seen[1]["If-None-Match"] == StubHandler.etag
+    assert StubHandler.requests_seen[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_offline_mode(stub_server, tmp_path):
+    """Test that offline mode serves cached documents only."""
+    url = f"{stub_server}/CHANGELOG-1.25.md"
+    HTTPCache(str(tmp_path), ttl=0).get(url)
+
+    offline = HTTPCache(str(tmp_path), ttl=0, offline=True)
+    assert offline.get(url) == StubHandler.body.decode()
+    with pytest.raises(OfflineCacheMiss):
+        offline.get(f"{stub_server}/CHANGELOG-1.26.md")
+
+    assert len(StubHandler.requests_seen) == 1
+
+
+def test_errors_not_cached(stub_server, tmp_path):
+    """Test that HTTP errors propagate and aren't stored."""
+    cache = HTTPCache(str(tmp_path))
+
+    with pytest.raises(requests.HTTPError):
+        cache.get(f"{stub_server}/missing")
+    with pytest.raises(requests.HTTPError):
+        cache.get(f"{stub_server}/missing")
+
+    assert len(StubHandler.requests_seen) == 2
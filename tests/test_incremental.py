@@ -0,0 +1,105 @@
+"""
+Tests for the incremental analysis cache.
+"""
+
+import os
+
+from unittest.mock import patch
+
+from kupa.analyzer import analyze_directory, BreakingChange
+
+
+def _fake_check(resource, version):
+    """Report every beta API version as a breaking change."""
+    if "beta" in resource.api_version:
+        return BreakingChange(
+            resource=resource,
+            change_type="API_REMOVED",
+            description=f"{resource.api_version} was removed",
+            recommended_action="Update apiVersion",
+            updated_content=dict(resource.content, apiVersion="v1")
+        )
+    return None
+
+
+def test_unchanged_files_are_not_reanalyzed(temp_k8s_dir):
+    """Test that a second run only checks the files that changed."""
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=_fake_check) as mock_check:
+        first = analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        assert mock_check.call_count == 3
+        assert os.path.exists(os.path.join(temp_k8s_dir, ".kupa-cache", "analysis.sqlite"))
+
+        mock_check.reset_mock()
+        second = analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        mock_check.assert_not_called()
+
+        # Cached results are rebuilt with the same verdicts and content
+        assert [(c.resource.file_path, c.resource.name, c.description) for c in second] == \
+            [(c.resource.file_path, c.resource.name, c.description) for c in first]
+        assert [c.updated_content for c in second] == [c.updated_content for c in first]
+        # Only the span is cached; the content is loaded again from the file
+        assert all(c.resource.span is not None for c in second)
+        assert [c.resource.content for c in second] == [c.resource.content for c in first]
+
+        # Editing one file only re-checks that file
+        with open(os.path.join(temp_k8s_dir, "configmap.yaml"), 'a') as f:
+            f.write("# edited\n")
+        mock_check.reset_mock()
+        analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        assert mock_check.call_count == 1
+
+        # A different target version is a different cache entry
+        mock_check.reset_mock()
+        analyze_directory(temp_k8s_dir, "v1.26", incremental=True)
+        assert mock_check.call_count == 3
+
+
+def test_knowledge_base_change_invalidates_cache(temp_k8s_dir):
+    """Test that changing the rules invalidates cached results."""
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=_fake_check) as mock_check:
+        analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+
+        mock_check.reset_mock()
+        with patch.dict('kupa.analyzer.DEPRECATED_API_VERSIONS', {("Foo", "example.com/v1"): {
+                "removed_in": "v1.25.0", "replacement": "example.com/v2", "description": "gone"}}):
+            analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        assert mock_check.call_count == 3
+
+
+def test_incremental_is_off_by_default(temp_k8s_dir):
+    """Test that no cache is written unless incremental analysis is enabled."""
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=_fake_check):
+        analyze_directory(temp_k8s_dir, "v1.25")
+    assert not os.path.exists(os.path.join(temp_k8s_dir, ".kupa-cache"))
+
+
+def test_files_with_tier_errors_are_not_cached(temp_k8s_dir):
+    """Test that a file whose check hit a tier error is checked again on the next run."""
+    from kupa.analyzer.tiers import record_tier_error
+
+    def flaky_check(resource, version):
+        if resource.kind == "ConfigMap":
+            record_tier_error("openai", resource)
+            return None
+        return _fake_check(resource, version)
+
+    with patch('kupa.analyzer.check_for_breaking_changes', side_effect=flaky_check) as mock_check:
+        analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        assert mock_check.call_count == 3
+
+        mock_check.reset_mock()
+        analyze_directory(temp_k8s_dir, "v1.25", incremental=True)
+        assert [call.args[0].kind for call in mock_check.call_args_list] == ["ConfigMap"]
+
+
+def test_prescan_setting_invalidates_cache(temp_k8s_dir):
+    """Test that turning the pre-scan on or off changes the knowledge base version."""
+    import copy
+    from kupa.analyzer.incremental import knowledge_base_version
+    from kupa.config import load_config
+
+    config = copy.deepcopy(load_config())
+    config["analysis"]["prescan"] = not config["analysis"].get("prescan", False)
+    with patch('kupa.analyzer.incremental.load_config', return_value=config):
+        toggled = knowledge_base_version()
+    assert toggled != knowledge_base_version()
@@ -0,0 +1,83 @@
+"""
+Tests for the API background jobs.
+"""
+
+import threading
+import time
+
+import pytest
+
+from kupa.api.jobs import JobManager, JobQueueFull, CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED
+
+
+def _wait_for(job, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while job.status not in statuses:
+        assert time.time() < deadline, f"job stayed {job.status}"
+        time.sleep(0.01)
+
+
+def test_job_runs_and_reports_result():
+    """Test that a job runs on a worker and its result and progress are kept."""
+    manager = JobManager(workers=1, max_queued=4, ttl=60)
+    try:
+        def work(job, value):
+            job.update(stage="working")
+            return value * 2
+
+        job = manager.submit("test", work, 21)
+        _wait_for(job, (SUCCEEDED,))
+        assert manager.get(job.id) is job
+        data = job.to_dict()
+        assert data["result"] == 42
+        assert data["progress"] == {"stage": "working"}
+        assert data["finished_at"] is not None
+
+        failing = manager.submit("test", lambda job: 1 / 0)
+        _wait_for(failing, (FAILED,))
+        assert "division" in failing.error
+    finally:
+        manager.shutdown()
+
+
+def test_queue_depth_and_cancellation():
+    """Test that the queue is bounded and queued and running jobs can be cancelled."""
+    manager = JobManager(workers=1, max_queued=1, ttl=60)
+    release = threading.Event()
+
+    def blocking(job):
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return "done"
+
+    try:
+        running = manager.submit("test", blocking)
+        _wait_for(running, (RUNNING,))
+        queued = manager.submit("test", blocking)
+        assert queued.status == QUEUED
+        with pytest.raises(JobQueueFull):
+            manager.submit("test", blocking)
+
+        # A queued job is cancelled at once and never starts
+        assert manager.cancel(queued.id).status == CANCELLED
+        assert queued.started_at is None
+
+        # A running job stops at its next check
+        manager.cancel(running.id)
+        _wait_for(running, (CANCELLED,))
+        assert running.result is None
+        assert manager.cancel("unknown") is None
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_finished_jobs_expire():
+    """Test that finished jobs are forgotten once their TTL has passed."""
+    manager = JobManager(workers=1, max_queued=1, ttl=0)
+    try:
+        job = manager.submit("test", lambda job: None)
+        _wait_for(job, (SUCCEEDED,))
+        assert manager.get(job.id) is None
+    finally:
+        manager.shutdown()
@@ -0,0 +1,109 @@
+"""
+Tests for multi-version matrix analysis.
+"""
+
+import pytest
+from unittest.mock import patch
+
+from kupa.analyzer import analyze_directory, check_static
+from kupa.analyzer.matrix import parse_version_spec
+
+
+def test_parse_version_spec():
+    """Test lists, ranges and aliases in a version specification."""
+    assert parse_version_spec("v1.25") == ["v1.25"]
+    assert parse_version_spec("v1.28, v1.22,v1.25,1.25") == ["v1.22", "v1.25", "v1.28"]
+    assert parse_version_spec("v1.20..v1.23") == ["v1.20", "v1.21", "v1.22", "v1.23"]
+    # "latest" is an alias for v1.28.0 in the default configuration
+    assert parse_version_spec("v1.26..latest") == ["v1.26", "v1.27", "v1.28.0"]
+
+    with pytest.raises(ValueError):
+        parse_version_spec("v1.25..v1.22")
+    with pytest.raises(ValueError):
+        parse_version_spec(" , ")
+
+
+def test_analyze_directory_matrix(temp_k8s_dir):
+    """Test that a single pass produces the verdicts for every version."""
+    with patch('kupa.analyzer.matrix._check_tiers', 
+               side_effect=lambda resource, version, tiers, static_result: static_result) as mock_check:
+        matrix = analyze_directory(temp_k8s_dir, ["v1.22", "v1.15", "v1.20"])
+
+    assert matrix.versions == ["v1.15", "v1.20", "v1.22"]
+    breaks = {row.resource.kind: matrix.first_breaking_version(row) for row in matrix.rows}
+    assert breaks == {"Deployment": "v1.20", "Ingress": "v1.22", "ConfigMap": None}
+
+    # Static findings depend on the version, so every version is checked
+    assert mock_check.call_count == 3 + 3 + 3
+    assert sorted(c.resource.kind for c in matrix.breaking_changes("v1.22")) == ["Deployment", "Ingress"]
+
+    table = matrix.format_table(base_dir=temp_k8s_dir).splitlines()
+    assert table[0].split() == ["FILE", "RESOURCE", "BREAKS", "IN", "v1.15", "v1.20", "v1.22"]
+    assert len(table) == 4
+    assert table[-1] == "2 of 3 resources break in at least one version"
+    deployment = next(line for line in table if line.startswith("deployment.yaml"))
+    assert deployment.split()[-4:] == ["v1.20", ".", "X", "X"]
+
+
+def test_static_findings_are_not_reused_across_versions():
+    """Test that each version gets the replacement still served in it."""
+    from kupa.analyzer import K8sResource
+    from kupa.analyzer.matrix import check_resource_versions
+
+    content = {"apiVersion": "flowcontrol.apiserver.k8s.io/v1beta1", "kind": "FlowSchema",
+               "metadata": {"name": "fs"}, "spec": {}}
+    resource = K8sResource(kind="FlowSchema", api_version=content["apiVersion"], name="fs", namespace=None,
+                           file_path="test.yaml", content=content)
+
+    changes = check_resource_versions(resource, ["v1.26", "v1.32"], ["static"])
+    assert [change.updated_content["apiVersion"] for change in changes] == [
+        "flowcontrol.apiserver.k8s.io/v1beta3", "flowcontrol.apiserver.k8s.io/v1"
+    ]
+
+
+def test_network_findings_are_reused_across_versions():
+    """Test that a model finding is reused for later versions while no static rule applies."""
+    from kupa.analyzer import K8sResource, BreakingChange
+    from kupa.analyzer.matrix import check_resource_versions
+
+    content = {"apiVersion": "example.com/v1", "kind": "Widget", "metadata": {"name": "w"}}
+    resource = K8sResource(kind="Widget", api_version="example.com/v1", name="w", namespace=None,
+                           file_path="test.yaml", content=content)
+    change = BreakingChange(resource, "API_REMOVED", "removed", "Update", content)
+
+    with patch('kupa.analyzer.matrix._check_tiers', return_value=change) as mock_check:
+        changes = check_resource_versions(resource, ["v1.25", "v1.26", "v1.27"], ["static", "openai"])
+    assert changes == [change, change, change]
+    assert mock_check.call_count == 1
+
+
+def test_static_rules_run_once_per_version():
+    """Test that the matrix passes its static result on instead of checking again."""
+    from kupa.analyzer import K8sResource
+    from kupa.analyzer.matrix import check_resource_versions
+
+    content = {"apiVersion": "flowcontrol.apiserver.k8s.io/v1beta1", "kind": "FlowSchema",
+               "metadata": {"name": "fs"}, "spec": {}}
+    resource = K8sResource(kind="FlowSchema", api_version=content["apiVersion"], name="fs", namespace=None,
+                           file_path="test.yaml", content=content)
+
+    with patch('kupa.analyzer.check_static', wraps=check_static) as inner, \
+            patch('kupa.analyzer.matrix.check_static', wraps=check_static) as outer:
+        changes = check_resource_versions(resource, ["v1.26", "v1.29", "v1.32"], ["static"])
+    assert inner.call_count + outer.call_count == 3
+    assert changes[-1].updated_content["apiVersion"] == "flowcontrol.apiserver.k8s.io/v1"
+
+
+def test_deprecations_are_checked_for_every_version():
+    """Test that a network deprecation finding is not reused for later versions."""
+    from kupa.analyzer import K8sResource, BreakingChange
+    from kupa.analyzer.matrix import check_resource_versions
+
+    content = {"apiVersion": "example.com/v1", "kind": "Widget", "metadata": {"name": "w"}}
+    resource = K8sResource(kind="Widget", api_version="example.com/v1", name="w", namespace=None,
+                           file_path="test.yaml", content=content)
+    change = BreakingChange(resource, "API_DEPRECATED", "deprecated", "Update", content)
+
+    with patch('kupa.analyzer.matrix._check_tiers', return_value=change) as mock_check:
+        check_resource_versions(resource, ["v1.25", "v1.26", "v1.27"], ["static", "openai"])
+    assert mock_check.call_count == 3
@@ -0,0 +1,260 @@
+"""
+Tests for the model client and its response cache.
+"""
+
+import os
+import json
+import copy
+import pytest
+from unittest.mock import patch, MagicMock
+
+from kupa.analyzer import K8sResource
+from kupa.mcp.model_client import (
+    query_model_for_changes, query_model_for_changes_batch, prefetch_model_responses,
+    pack_batches, clear_prefetched
+)
+from kupa.mcp.response_cache import ResponseCache, make_cache_key
+
+
+MODEL_REPLY = {
+    "has_breaking_change": True,
+    "change_type": "API_DEPRECATED",
+    "description": "apps/v1beta2 was removed in v1.16",
+    "recommended_action": "Use apps/v1 instead",
+    "updated_content": {"apiVersion": "apps/v1", "kind": "Deployment"}
+}
+
+
+def _openai_client(reply=MODEL_REPLY):
+    """Create a mock OpenAI client that answers every request with ``reply``."""
+    message = MagicMock(content=json.dumps(reply))
+    client = MagicMock()
+    client.chat.completions.create.return_value = MagicMock(choices=[MagicMock(message=message)])
+    return client
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    """Use a fresh on-disk response cache."""
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    with patch('kupa.mcp.model_client.get_response_cache', return_value=cache):
+        yield cache
+
+
+@pytest.fixture
+def openai_env():
+    """Select the OpenAI provider."""
+    env = {key: value for key, value in os.environ.items() if key != "MODEL_PROVIDER"}
+    env["OPENAI_API_KEY"] = "test-key"
+    with patch.dict(os.environ, env, clear=True):
+        yield
+
+
+def test_cache_hit_skips_network(sample_k8s_resource, response_cache, openai_env):
+    """Test that an identical resource is answered from the cache."""
+    client = _openai_client()
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client):
+        first = query_model_for_changes(sample_k8s_resource, "v1.25")
+        second = query_model_for_changes(sample_k8s_resource, "1.25")
+
+    assert client.chat.completions.create.call_count == 1
+    assert first == second
+    assert second["change_type"] == "API_DEPRECATED"
+    assert response_cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_cache_key_depends_on_content(sample_k8s_resource, response_cache, openai_env):
+    """Test that different content or target versions are not served from the cache."""
+    other = copy.deepcopy(sample_k8s_resource)
+    other.content["spec"]["replicas"] = 5
+
+    client = _openai_client()
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client):
+        query_model_for_changes(sample_k8s_resource, "v1.25")
+        query_model_for_changes(other, "v1.25")
+        query_model_for_changes(sample_k8s_resource, "v1.26")
+
+    assert client.chat.completions.create.call_count == 3
+
+
+def test_errors_are_not_cached(sample_k8s_resource, response_cache, openai_env):
+    """Test that failed queries are retried on the next call."""
+    client = MagicMock()
+    client.chat.completions.create.side_effect = RuntimeError("rate limited")
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client):
+        result = query_model_for_changes(sample_k8s_resource, "v1.25")
+
+    assert result["is_confident"] is False
+    assert result["error"] == "rate limited"
+    assert len(response_cache) == 0
+
+
+def test_response_cache_eviction(tmp_path):
+    """Test TTL expiry and LRU eviction."""
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    keys = [make_cache_key({"n": i}, "v1.25", "openai", "gpt-4-turbo", "1") for i in range(3)]
+
+    cache.put(keys[0], {"n": 0})
+    cache.put(keys[1], {"n": 1})
+    assert cache.get(keys[0]) == {"n": 0}  # keys[1] is now least recently used
+    cache.put(keys[2], {"n": 2})
+
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == {"n": 2}
+
+    expired = ResponseCache(str(tmp_path / "responses.sqlite"), ttl=-1)
+    assert expired.get(keys[2]) is None
+
+
+def _config_with(**ai_settings):
+    """Get the configuration with some ``ai_model`` settings replaced."""
+    from kupa.config import load_config
+
+    config = copy.deepcopy(load_config())
+    config["ai_model"].update(ai_settings)
+    return config
+
+
+def _resources(count):
+    return [
+        K8sResource(
+            kind="Deployment", api_version="apps/v1beta2", name=f"app-{i}", namespace="default",
+            file_path="/tmp/test.yaml",
+            content={"apiVersion": "apps/v1beta2", "kind": "Deployment", "metadata": {"name": f"app-{i}"}}
+        )
+        for i in range(count)
+    ]
+
+
+def test_pack_batches():
+    """Test that batches respect the size limit and keep resource order."""
+    resources = _resources(7)
+    batches = pack_batches(resources, token_budget=100000, max_batch_size=3)
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [r for batch in batches for r in batch] == resources
+
+    # Every resource is bigger than a tiny budget, so each gets its own batch
+    assert len(pack_batches(resources, token_budget=1, max_batch_size=3)) == 7
+
+
+def test_pack_batches_measures_the_slimmed_prompt():
+    """Test that fields slimmed out of the prompt don't count against the budget."""
+    resources = _resources(4)
+    for resource in resources:
+        resource.content["status"] = {"conditions": [{"message": "x" * 4000}]}
+        resource.content["metadata"]["managedFields"] = [{"manager": "kubectl", "fieldsV1": {"f:spec": {}}}] * 50
+
+    assert [len(batch) for batch in pack_batches(resources, token_budget=200, max_batch_size=10)] == [4]
+
+
+def test_batch_reply_split_and_retry(response_cache, openai_env):
+    """Test splitting a batched reply and retrying malformed items individually."""
+    resources = _resources(3)
+    batch_reply = {
+        "results": [
+            dict(MODEL_REPLY, id="0"),
+            {"id": "1", "has_breaking_change": "maybe"},  # malformed, retried
+            dict(MODEL_REPLY, id="2", has_breaking_change=False, change_type=None)
+        ]
+    }
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(batch_reply)))]),
+        MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(MODEL_REPLY)))])
+    ]
+
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client):
+        results = query_model_for_changes_batch(resources, "v1.25")
+
+    assert client.chat.completions.create.call_count == 2
+    assert [r["has_breaking_change"] for r in results] == [True, True, False]
+    assert all(r["is_confident"] for r in results)
+    assert "id" not in results[0]
+
+
+def test_prefetched_responses_skip_network(response_cache, openai_env):
+    """Test that prefetched verdicts answer the per-resource queries."""
+    resources = _resources(4)
+    batch_reply = {"results": [dict(MODEL_REPLY, id=str(i)) for i in range(4)]}
+    client = _openai_client(batch_reply)
+
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client), \
+            patch('kupa.mcp.model_client.load_config', return_value=_config_with(batch={"enabled": True})):
+        assert prefetch_model_responses(resources, "v1.25") == 1
+        # Bypass the response cache so only the prefetched verdicts can answer
+        with patch('kupa.mcp.model_client.get_response_cache', return_value=None):
+            results = [query_model_for_changes(r, "v1.25") for r in resources]
+    clear_prefetched()
+
+    assert client.chat.completions.create.call_count == 1
+    assert all(r["change_type"] == "API_DEPRECATED" for r in results)
+
+
+def test_failed_batch_falls_back_to_per_resource_queries(response_cache, openai_env):
+    """Test that failed batch verdicts aren't prefetched and each cache miss is counted once."""
+    from kupa.analyzer.runs import current_run
+
+    resources = _resources(2)
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        RuntimeError("batch failed"), RuntimeError("retry failed"), RuntimeError("retry failed"),
+        MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(MODEL_REPLY)))]),
+        MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(MODEL_REPLY)))])
+    ]
+
+    with patch('kupa.mcp.model_client.get_openai_client', return_value=client), \
+            patch('kupa.mcp.model_client.load_config', return_value=_config_with(batch={"enabled": True})):
+        assert query_model_for_changes_batch(resources, "v1.25") == [None, None]
+        assert response_cache.stats() == {"hits": 0, "misses": 2}
+
+        client.chat.completions.create.side_effect = [
+            RuntimeError("batch failed"), RuntimeError("retry failed"), RuntimeError("retry failed"),
+            MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(MODEL_REPLY)))]),
+            MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(MODEL_REPLY)))])
+        ]
+        prefetch_model_responses(resources, "v1.25")
+        assert all(verdict is None for verdict in current_run().prefetched.values())
+        # The per-resource checks query the model instead of using a failed verdict
+        results = [query_model_for_changes(r, "v1.25") for r in resources]
+    clear_prefetched()
+
+    assert all(r["change_type"] == "API_DEPRECATED" and "error" not in r for r in results)
+    assert response_cache.stats() == {"hits": 0, "misses": 4}
+
+
+def test_ollama_model_discovery_cached(sample_k8s_resource, response_cache):
+    """Test that /api/tags is queried once, not before every generate call."""
+    from kupa.mcp.clients import get_http_session, reset_clients
+
+    reset_clients()
+    tags = MagicMock(status_code=200)
+    tags.json.return_value = {"models": [{"name": "llama3:latest"}]}
+    generate = MagicMock(status_code=200)
+    generate.json.return_value = {"response": json.dumps(MODEL_REPLY)}
+
+    session = get_http_session()
+    with patch.dict(os.environ, {"MODEL_PROVIDER": "ollama"}), \
+            patch.object(session, 'get', return_value=tags) as mock_get, \
+            patch.object(session, 'post', return_value=generate) as mock_post, \
+            patch('kupa.mcp.model_client.get_response_cache', return_value=None):
+        for _ in range(5):
+            result = query_model_for_changes(sample_k8s_resource, "v1.25")
+            assert result["has_breaking_change"] is True
+
+    assert mock_get.call_count == 1
+    assert mock_post.call_count == 5
+    # Every request carries explicit (connect, read) timeouts
+    assert all(isinstance(call.kwargs["timeout"], tuple) for call in mock_post.call_args_list)
+    reset_clients()
+
+
+def test_openai_client_reused():
+    """Test that the OpenAI client is created once per settings."""
+    from kupa.mcp.clients import get_openai_client, reset_clients
+
+    reset_clients()
+    assert get_openai_client("key-1") is get_openai_client("key-1")
+    assert get_openai_client("key-1") is not get_openai_client("key-2")
+    reset_clients()
@@ -114,3 +114,136 @@ def test_write_local_results(tmp_path, monkeypatch):
         diff_content = f.read()
         assert "apps/v1beta2" in diff_content
         assert "API_DEPRECATED" in diff_content
+
+
+def test_write_local_results_matches_by_position(tmp_path, monkeypatch):
+    """Test that changes are matched to their own document in a multi-document file."""
+    from kupa.analyzer import BreakingChange, parse_k8s_yaml
+    
+    class MockDatetime:
+        @staticmethod
+        def now():
+            return MagicMock(strftime=lambda fmt: "20250515123456")
+    
+    monkeypatch.setattr('kupa.output.datetime', MockDatetime)
+    
+    # Two documents with the same key; only the second one is changed
+    documents = [
+        {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "config"}, "data": {"a": "1"}},
+        {"apiVersion": "policy/v1beta1", "kind": "PodDisruptionBudget", "metadata": {"name": "pdb"},
+         "spec": {"minAvailable": 1}},
+        {"apiVersion": "policy/v1beta1", "kind": "PodDisruptionBudget", "metadata": {"name": "pdb"},
+         "spec": {"minAvailable": 2}},
+    ]
+    test_file = os.path.join(tmp_path, "bundle.yaml")
+    with open(test_file, "w") as f:
+        yaml.dump_all(documents, f)
+    
+    resource = parse_k8s_yaml(test_file)[2]
+    assert resource.span is not None
+    updated_content = dict(resource.content, apiVersion="policy/v1")
+    change = BreakingChange(resource, "API_REMOVED", "removed", "Update apiVersion to policy/v1", updated_content)
+    
+    write_local_results(str(tmp_path), [change])
+    
+    with open(os.path.join(tmp_path, "bundle-updated-20250515123456.yaml"), "r") as f:
+        written = list(yaml.safe_load_all(f))
+    assert written[:2] == documents[:2]
+    assert written[2] == updated_content
+
+
+def test_write_updated_file_splices_changed_documents(tmp_path):
+    """Test that only changed documents are rewritten and the rest stays byte-identical."""
+    from kupa.analyzer import BreakingChange, parse_k8s_yaml
+    from kupa.output import write_updated_file
+    
+    original = (
+        "# Rendered bundle\n"
+        "apiVersion: v1\n"
+        "kind: ConfigMap\n"
+        "metadata: {name: config}  # flow style is kept\n"
+        "data:\n"
+        "  b: '2'\n"
+        "  a: '1'\n"
+        "---\n"
+        "# Source: templates/pdb.yaml\n"
+        "apiVersion: policy/v1beta1\n"
+        "kind: PodDisruptionBudget\n"
+        "metadata:\n"
+        "  name: pdb\n"
+        "spec:\n"
+        "  minAvailable: 1\n"
+        "---\n"
+        "apiVersion: v1\n"
+        "kind: Service\n"
+        "metadata:\n"
+        "  name: web\n"
+    )
+    test_file = os.path.join(tmp_path, "bundle.yaml")
+    with open(test_file, "w") as f:
+        f.write(original)
+    
+    resource = parse_k8s_yaml(test_file)[1]
+    change = BreakingChange(resource, "API_REMOVED", "removed", "Update apiVersion to policy/v1",
+                            dict(resource.content, apiVersion="policy/v1"))
+    
+    output_file = os.path.join(tmp_path, "updated.yaml")
+    write_updated_file(test_file, [change], output_file)
+    with open(output_file, "r") as f:
+        written = f.read()
+    
+    before, _, rest = original.partition("apiVersion: policy/v1beta1")
+    after = rest[rest.index("---\n"):]
+    assert written.startswith(before)
+    assert written.endswith(after)
+    assert "# Source: templates/pdb.yaml\n" in written
+    assert list(yaml.safe_load_all(written))[1]["apiVersion"] == "policy/v1"
+    
+    # A span that is out of date falls back to matching by key
+    resource.span = (0, 10, 0)
+    write_updated_file(test_file, [change])
+    with open(test_file, "r") as f:
+        assert f.read() == written
+
+
+def test_render_updated_files_in_memory(tmp_path, monkeypatch):
+    """Test that uploads are analyzed and rendered without writing any file."""
+    from kupa.analyzer import analyze_documents
+    from kupa.output import render_updated_files
+    
+    monkeypatch.chdir(tmp_path)
+    files = {
+        "apps/pdb.yaml": (
+            b"# PDB\n"
+            b"apiVersion: policy/v1beta1\n"
+            b"kind: PodDisruptionBudget\n"
+            b"metadata:\n"
+            b"  name: pdb\n"
+            b"spec:\n"
+            b"  minAvailable: 1\n"
+            b"  selector:\n"
+            b"    matchLabels: {app: web}\n"
+            b"---\n"
+            b"apiVersion: v1\n"
+            b"kind: Service\n"
+            b"metadata:\n"
+            b"  name: web\n"
+        ),
+        "config.yaml": b"apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: config\n",
+    }
+    
+    changes = analyze_documents(files, "v1.25", dedup=False)
+    assert [change.resource.file_path for change in changes] == ["apps/pdb.yaml"]
+    
+    rendered = render_updated_files(files, changes)
+    assert os.listdir(tmp_path) == []
+    assert len(rendered) == 1
+    
+    updated = rendered[0]
+    assert updated["original_file"] == "apps/pdb.yaml"
+    assert updated["updated_content"].startswith("# PDB\n")
+    assert updated["updated_content"].endswith("---\napiVersion: v1\nkind: Service\nmetadata:\n  name: web\n")
+    assert list(yaml.safe_load_all(updated["updated_content"]))[0]["apiVersion"] == "policy/v1"
+    assert "-apiVersion: policy/v1beta1" in updated["diff"]
+    assert "+apiVersion: policy/v1" in updated["diff"]
+    assert "PodDisruptionBudget/policy/v1beta1 'pdb'" in updated["explanation"]
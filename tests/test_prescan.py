@@ -0,0 +1,166 @@
+"""
+Tests for the YAML header pre-scan.
+"""
+
+import os
+
+import pytest
+from unittest.mock import patch
+
+from kupa import yaml_io
+from kupa.analyzer import parse_k8s_yaml, build_document_filter
+from kupa.analyzer.prescan import DocumentFilter, scan_header, split_documents, prescan_documents
+
+
+MULTI_DOCUMENT = b"""\
+# Leading comment
+apiVersion: apps/v1beta2  # old
+kind: Deployment
+metadata:
+  name: web
+---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: big
+data:
+  payload: |
+    kind: NotAHeader
+    ---
+    apiVersion: also-not
+---
+
+---
+kind: "Ingress"
+apiVersion: 'extensions/v1beta1'
+metadata:
+  name: ingress
+"""
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / "manifest.yaml"
+    path.write_bytes(MULTI_DOCUMENT)
+    return str(path)
+
+
+def test_split_and_scan_headers():
+    """Test splitting on document markers and reading top-level headers only."""
+    spans = split_documents(MULTI_DOCUMENT)
+    headers = [scan_header(MULTI_DOCUMENT[start:end]) for start, end in spans]
+
+    assert headers == [
+        ("Deployment", "apps/v1beta2"),
+        ("ConfigMap", "v1"),
+        None,  # blank document
+        ("Ingress", "extensions/v1beta1")
+    ]
+
+
+@pytest.mark.parametrize("document", [
+    b"apiVersion: v1\nkind: &k ConfigMap\n",           # anchor
+    b"apiVersion: v1\nkind: !!str ConfigMap\n",        # tag
+    b"apiVersion: v1\nkind: ConfigMap\nkind: Secret\n",  # duplicate key
+    b"{apiVersion: v1, kind: ConfigMap}\n",            # flow mapping
+    b"apiVersion: v1\nkind:\n  ConfigMap\n",           # value on the next line
+    b"apiVersion: v1\nkind: true\n",                   # not a string
+])
+def test_ambiguous_headers(document):
+    """Test that documents the scan can't read with certainty are reported as ambiguous."""
+    assert scan_header(document) is None
+
+
+@pytest.mark.parametrize("stream", [
+    b"%YAML 1.1\n---\napiVersion: v1\nkind: ConfigMap\n",
+    b"--- !!map\napiVersion: v1\nkind: ConfigMap\n",
+    b"apiVersion: v1\nkind: ConfigMap\n...\n",
+])
+def test_ambiguous_streams(stream):
+    """Test that streams with directives or marker-line content aren't split."""
+    assert split_documents(stream) is None
+
+
+def test_prescan_skips_unwanted_documents(manifest):
+    """Test that only wanted documents are parsed, matching a full parse."""
+    document_filter = DocumentFilter(exclude=frozenset({("ConfigMap", "v1")}))
+
+    with patch('kupa.analyzer.prescan.yaml_io.load', wraps=yaml_io.load) as mock_load:
+        resources = parse_k8s_yaml(manifest, document_filter)
+    assert mock_load.call_count == 2
+
+    full = parse_k8s_yaml(manifest)
+    assert [r.kind for r in full] == ["Deployment", "ConfigMap", "Ingress"]
+    assert [r.content for r in resources] == [full[0].content, full[2].content]
+
+
+def test_prescan_uses_mmap_for_large_files(manifest):
+    """Test that large files are scanned through mmap with the same result."""
+    document_filter = DocumentFilter(include=frozenset({("Ingress", "extensions/v1beta1")}))
+
+    with patch('kupa.analyzer.prescan.MMAP_THRESHOLD', 1):
+        documents = prescan_documents(manifest, document_filter)
+
+    assert [d["metadata"]["name"] for d, _ in documents] == ["ingress"]
+
+
+def test_prescan_falls_back_to_full_parse(tmp_path):
+    """Test that an ambiguous file is parsed in full."""
+    path = tmp_path / "anchors.yaml"
+    path.write_text("apiVersion: v1\nkind: &k ConfigMap\nmetadata:\n  name: cm\n")
+    document_filter = DocumentFilter(include=frozenset())
+
+    assert prescan_documents(str(path), document_filter) is None
+    assert [r.name for r in parse_k8s_yaml(str(path), document_filter)] == ["cm"]
+
+
+def test_build_document_filter():
+    """Test which documents the enabled tiers could flag."""
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "", "MODEL_PROVIDER": ""}):
+        static_only = build_document_filter("v1.25", tiers=["static", "openai"])
+        assert static_only.wants("Deployment", "apps/v1beta2")
+        assert not static_only.wants("Role", "rbac.authorization.k8s.io/v1")
+        # Field rules want their kinds too
+        assert static_only.wants("Ingress", "networking.k8s.io/v1")
+        assert static_only.wants("CustomResourceDefinition", "apiextensions.k8s.io/v1beta1")
+        assert not static_only.wants("CustomResourceDefinition", "apiextensions.k8s.io/v1")
+        # Not removed until v1.25
+        assert not build_document_filter("v1.20", tiers=["static"]).wants("PodDisruptionBudget", "policy/v1beta1")
+
+        with_docs = build_document_filter("v1.25", tiers=["static", "docs"])
+        assert with_docs.wants("Widget", "example.com/v1")
+        assert not with_docs.wants("ConfigMap", "v1")
+
+
+def test_prescan_keeps_stable_documents_with_field_rules():
+    """Test that the pre-scan doesn't skip stable APIs the field rules still apply to."""
+    import copy
+    from kupa.analyzer import analyze_documents
+    from kupa.config import load_config
+
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "", "MODEL_PROVIDER": ""}):
+        with_docs = build_document_filter("v1.25", tiers=["static", "docs"])
+    assert with_docs.wants("Deployment", "apps/v1")
+    assert with_docs.wants("Service", "v1")
+    assert not with_docs.wants("ConfigMap", "v1")
+
+    deployment = (
+        b"apiVersion: apps/v1\n"
+        b"kind: Deployment\n"
+        b"metadata:\n"
+        b"  name: web\n"
+        b"spec:\n"
+        b"  template:\n"
+        b"    metadata:\n"
+        b"      annotations:\n"
+        b"        seccomp.security.alpha.kubernetes.io/pod: runtime/default\n"
+        b"    spec:\n"
+        b"      containers: [{name: web, image: nginx}]\n"
+    )
+    config = copy.deepcopy(load_config())
+    config["analysis"].update(prescan=True, resolution_order=["static", "docs"])
+    with patch('kupa.analyzer.load_config', return_value=config), \
+            patch('kupa.analyzer.tiers.load_config', return_value=config):
+        changes = analyze_documents({"web.yaml": deployment}, "v1.25", dedup=False)
+
+    assert [change.change_type for change in changes] == ["FIELD_REMOVED"]
@@ -0,0 +1,68 @@
+"""
+Tests for the static API removal rules.
+"""
+
+import pytest
+
+from kupa.analyzer import K8sResource, check_static
+from kupa.analyzer.rules import (
+    ApiRemoval, ApiRemovalIndex, get_api_removal_index, load_api_removals, version_tuple
+)
+
+
+def _resource(kind, api_version):
+    return K8sResource(kind=kind, api_version=api_version, name="test", namespace=None,
+                       file_path="test.yaml", content={"apiVersion": api_version, "kind": kind})
+
+
+def test_version_tuple():
+    """Test parsing versions into integer tuples."""
+    assert version_tuple("v1.25") == (1, 25, 0)
+    assert version_tuple("1.28.3") == (1, 28, 3)
+    assert version_tuple("v1.29.0-rc.1") == (1, 29, 0)
+    with pytest.raises(ValueError):
+        version_tuple("latest")
+
+
+def test_packaged_rules_cover_upstream_removals():
+    """Test that the packaged rules load and include removals from every release with some."""
+    rules = load_api_removals()
+    releases = {rule.removed_in_label for rule in rules}
+    assert {"v1.16", "v1.22", "v1.25", "v1.26", "v1.27", "v1.29", "v1.32"} <= releases
+
+    index = get_api_removal_index()
+    assert index.by_gvk[("batch", "v1beta1", "CronJob")].replacement == "batch/v1"
+    assert index.lookup("CronJob", "batch/v1beta1", "v1.24") is None
+    assert index.lookup("CronJob", "batch/v1beta1", "v1.25").replacement == "batch/v1"
+    # Built once per target version
+    assert index.for_target("v1.25") is index.for_target("1.25.0")
+
+
+def test_replacement_chains_are_followed():
+    """Test that a replacement removed by the target version is followed to one still served."""
+    index = get_api_removal_index()
+    assert index.lookup("FlowSchema", "flowcontrol.apiserver.k8s.io/v1beta1", "v1.27").replacement == \
+        "flowcontrol.apiserver.k8s.io/v1beta3"
+    assert index.lookup("FlowSchema", "flowcontrol.apiserver.k8s.io/v1beta1", "v1.32").replacement == \
+        "flowcontrol.apiserver.k8s.io/v1"
+
+    cyclic = ApiRemovalIndex([
+        ApiRemoval("a", "v1", "Foo", (1, 20, 0), "b/v1"),
+        ApiRemoval("b", "v1", "Foo", (1, 20, 0), "a/v1"),
+    ])
+    assert cyclic.lookup("Foo", "a/v1", "v1.20").replacement == "a/v1"
+
+
+def test_check_static():
+    """Test static findings, including APIs without a replacement."""
+    change = check_static(_resource("Ingress", "extensions/v1beta1"), "v1.25")
+    assert change.change_type == "API_REMOVED"
+    assert change.updated_content["apiVersion"] == "networking.k8s.io/v1"
+    assert change.description == \
+        "extensions/v1beta1 Ingress was removed in Kubernetes v1.22. Use networking.k8s.io/v1 instead."
+
+    psp = check_static(_resource("PodSecurityPolicy", "policy/v1beta1"), "v1.25")
+    assert psp.updated_content["apiVersion"] == "policy/v1beta1"
+    assert "Pod Security Admission" in psp.recommended_action
+
+    assert check_static(_resource("Ingress", "networking.k8s.io/v1"), "v1.25") is None
@@ -0,0 +1,42 @@
+"""
+Tests for the per-run analysis state.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kupa.analyzer.runs import RunState, bind_run, current_run
+from kupa.analyzer.tiers import get_tier_stats, record_tier_call, reset_tier_stats
+from kupa.mcp.model_client import clear_prefetched
+
+
+def test_runs_keep_separate_stats_and_prefetched_verdicts():
+    """Test that one run's counters and prefetched verdicts don't leak into another."""
+    first, second = RunState(), RunState()
+    with first.activate():
+        record_tier_call("static")
+        current_run().prefetched["key"] = {"is_breaking_change": False}
+        with second.activate():
+            assert current_run() is second
+            record_tier_call("ollama")
+            reset_tier_stats()
+            clear_prefetched()
+        assert current_run() is first
+        assert get_tier_stats()["calls"] == {"static": 1}
+        assert first.prefetched == {"key": {"is_breaking_change": False}}
+    assert current_run() is not first
+
+
+def test_bind_run_carries_the_run_to_pool_threads():
+    """Test that callables wrapped with bind_run() use the run that was current when wrapped."""
+    run = RunState()
+
+    def count(_):
+        record_tier_call("static")
+        return threading.current_thread().name
+
+    with run.activate(), ThreadPoolExecutor(max_workers=2) as executor:
+        names = list(executor.map(bind_run(count), range(4)))
+
+    assert all(name != threading.current_thread().name for name in names)
+    assert run.tier_calls == {"static": 4}
@@ -0,0 +1,106 @@
+"""
+Tests for the API endpoints.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from kupa.analyzer import BreakingChange
+from kupa.api.jobs import JobManager, CANCELLED, RUNNING, SUCCEEDED
+from kupa.api.server import GithubRequest, analyze_github_stream
+
+
+def _read_stream(response):
+    async def read():
+        return [json.loads(chunk) async for chunk in response.body_iterator]
+    return asyncio.run(read())
+
+
+def _change(name):
+    resource = MagicMock(kind="Deployment", api_version="extensions/v1beta1", namespace="default",
+                         file_path=f"/repo/{name}.yaml")
+    resource.name = name
+    return BreakingChange(resource, "API_REMOVED", "removed", "Update apiVersion to apps/v1", None)
+
+
+def test_stream_runs_as_a_job(tmp_path):
+    """Test that the streaming endpoint runs on the job pool and streams its changes."""
+    manager = JobManager(workers=1, max_queued=1, ttl=60)
+    request = GithubRequest(repo_url="https://github.com/example/repo")
+    try:
+        with patch('kupa.api.server.get_job_manager', return_value=manager), \
+                patch('kupa.api.server.clone_repo', return_value=str(tmp_path)), \
+                patch('kupa.api.server.iter_breaking_changes',
+                      side_effect=lambda *args: (change for change in [_change("web"), _change("api")])):
+            response = analyze_github_stream(request)
+            job = manager.get(response.headers["X-Job-Id"])
+            lines = _read_stream(response)
+
+        assert [line.get("resource_name") for line in lines[:2]] == ["web", "api"]
+        assert lines[2] == {"status": "success", "total": 2}
+        assert job.kind == "github_stream"
+        assert job.status == SUCCEEDED
+    finally:
+        manager.shutdown()
+
+
+def test_stream_shares_the_job_limit_and_is_cancelled_on_disconnect(tmp_path):
+    """Test that streams count against the job queue and stop when the client goes away."""
+    manager = JobManager(workers=1, max_queued=1, ttl=60)
+    request = GithubRequest(repo_url="https://github.com/example/repo")
+    release = threading.Event()
+
+    def changes(*args):
+        yield _change("web")
+        release.wait(5)
+        yield _change("api")
+
+    try:
+        with patch('kupa.api.server.get_job_manager', return_value=manager), \
+                patch('kupa.api.server.clone_repo', return_value=str(tmp_path)), \
+                patch('kupa.api.server.iter_breaking_changes', side_effect=changes):
+            response = analyze_github_stream(request)
+            job = manager.get(response.headers["X-Job-Id"])
+            deadline = time.time() + 5
+            while job.status != RUNNING and time.time() < deadline:
+                time.sleep(0.01)
+
+            # The worker is busy with the stream, so the next one waits and the one after is refused
+            queued = manager.get(analyze_github_stream(request).headers["X-Job-Id"])
+            with pytest.raises(HTTPException) as error:
+                analyze_github_stream(request)
+            assert error.value.status_code == 503
+            manager.cancel(queued.id)
+
+            async def read_first():
+                iterator = response.body_iterator
+                first = await iterator.__anext__()
+                await iterator.aclose()
+                return json.loads(first)
+
+            assert asyncio.run(read_first())["resource_name"] == "web"
+            release.set()
+            job.future.result(timeout=5)
+
+        assert job.status == CANCELLED
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_kube_version_aliases_are_resolved_up_front():
+    """Test that version aliases are resolved and invalid versions rejected before queueing."""
+    from kupa.api.server import resolve_kube_version
+    from kupa.config import get_kubernetes_version
+
+    assert resolve_kube_version("latest") == get_kubernetes_version("latest")
+    assert resolve_kube_version("v1.25") == "v1.25"
+    with pytest.raises(HTTPException) as error:
+        resolve_kube_version("newest")
+    assert error.value.status_code == 422
@@ -0,0 +1,90 @@
+"""
+Tests for slimming resources before they are sent to the model.
+"""
+
+import json
+
+from unittest.mock import patch
+
+from kupa.analyzer import K8sResource
+from kupa.mcp.model_client import _build_prompt
+from kupa.mcp.slimming import slim_resource, get_slimming_stats, reset_slimming_stats, TRUNCATION_MARKER
+
+
+SETTINGS = {
+    "enabled": True,
+    "max_value_length": 32,
+    "drop_fields": ["status", "metadata.managedFields", "metadata.uid"],
+    "drop_annotations": ["kubectl.kubernetes.io/last-applied-configuration"]
+}
+
+LIVE_DEPLOYMENT = {
+    "apiVersion": "apps/v1beta2",
+    "kind": "Deployment",
+    "metadata": {
+        "name": "web",
+        "uid": "0c5b7b1e-4a2f-4c7e-9d6b-3f6c0f1a2b3c",
+        "managedFields": [{"manager": "kubectl", "operation": "Update"}],
+        "annotations": {
+            "kubectl.kubernetes.io/last-applied-configuration": '{"apiVersion":"apps/v1beta2"}',
+            "team": "web"
+        }
+    },
+    "spec": {
+        "replicas": 2,
+        "template": {"spec": {"containers": [{"name": "web", "args": ["x" * 100]}]}}
+    },
+    "status": {"replicas": 2, "readyReplicas": 2}
+}
+
+
+def test_slim_resource_drops_irrelevant_fields():
+    """Test that server-set fields are removed and long strings truncated."""
+    slimmed = slim_resource(LIVE_DEPLOYMENT, SETTINGS)
+
+    assert "status" not in slimmed.content
+    assert "managedFields" not in slimmed.content["metadata"]
+    assert "uid" not in slimmed.content["metadata"]
+    assert slimmed.content["metadata"]["annotations"] == {"team": "web"}
+    arg = slimmed.content["spec"]["template"]["spec"]["containers"][0]["args"][0]
+    assert arg == "x" * 32 + TRUNCATION_MARKER.format(length=100)
+    # The original is left alone
+    assert "status" in LIVE_DEPLOYMENT
+
+
+def test_restore_puts_removed_data_back():
+    """Test that the model's updated content gets the removed data back."""
+    slimmed = slim_resource(LIVE_DEPLOYMENT, SETTINGS)
+    updated = json.loads(json.dumps(slimmed.content))
+    updated["apiVersion"] = "apps/v1"
+    updated["spec"]["selector"] = {"matchLabels": {"app": "web"}}
+
+    restored = slimmed.restore(updated)
+
+    assert restored["apiVersion"] == "apps/v1"
+    assert restored["spec"]["selector"] == {"matchLabels": {"app": "web"}}
+    assert restored["status"] == LIVE_DEPLOYMENT["status"]
+    assert restored["metadata"]["uid"] == LIVE_DEPLOYMENT["metadata"]["uid"]
+    assert restored["metadata"]["annotations"] == LIVE_DEPLOYMENT["metadata"]["annotations"]
+    assert restored["spec"]["template"] == LIVE_DEPLOYMENT["spec"]["template"]
+
+
+def test_prompt_excludes_dropped_fields():
+    """Test that the prompt only carries the slimmed content and savings are counted."""
+    resource = K8sResource(
+        kind="Deployment", api_version="apps/v1beta2", name="web", namespace="default",
+        file_path="/tmp/web.yaml", content=LIVE_DEPLOYMENT
+    )
+    reset_slimming_stats()
+
+    with patch('kupa.mcp.slimming._get_slimming_config', return_value=dict(SETTINGS, compact_json=True)):
+        prompt = _build_prompt(resource, "v1.25")
+
+    assert "readyReplicas" not in prompt
+    assert "managedFields" not in prompt
+    assert "last-applied-configuration" not in prompt
+    assert '"replicas":2' in prompt
+
+    stats = get_slimming_stats()
+    assert stats["resources"] == 1
+    assert stats["tokens_saved"] > 0
@@ -0,0 +1,93 @@
+"""
+Tests for the repository walker.
+"""
+
+import os
+
+import pytest
+
+from kupa.analyzer.walker import IgnoreRules, iter_yaml_files
+
+
+def _touch(root, rel_path, content="kind: ConfigMap\n"):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def _walk(root, **kwargs):
+    return [os.path.relpath(path, root) for path in iter_yaml_files(str(root), **kwargs)]
+
+
+def test_walk_order_and_excluded_dirs(tmp_path):
+    """Test that files come out sorted, directories like .git are pruned and non-YAML is skipped."""
+    for rel_path in ["b.yaml", "a.yml", "z/c.yaml", "m/d.yaml", ".git/e.yaml",
+                     "node_modules/pkg/f.yaml", "notes.txt"]:
+        _touch(tmp_path, rel_path)
+
+    assert _walk(tmp_path) == ["a.yml", "b.yaml", "m/d.yaml", "z/c.yaml"]
+
+
+def test_ignore_files(tmp_path):
+    """Test .gitignore and .kupaignore patterns, including nested files and negation."""
+    for rel_path in ["app.yaml", "generated.yaml", "tmp/x.yaml", "charts/a/values.yaml",
+                     "charts/a/templates/deploy.yaml", "sub/keep.yaml", "sub/drop.yaml"]:
+        _touch(tmp_path, rel_path)
+    _touch(tmp_path, ".gitignore", "# build output\ntmp/\n*.yaml\n!app.yaml\n!**/templates/*.yaml\n!sub/*.yaml\n")
+    _touch(tmp_path, ".kupaignore", "generated.yaml\n")
+    _touch(tmp_path, "sub/.gitignore", "/drop.yaml\n")
+
+    assert _walk(tmp_path) == ["app.yaml", "charts/a/templates/deploy.yaml", "sub/keep.yaml"]
+    assert len(_walk(tmp_path, use_ignore_files=False)) == 7
+
+
+def test_ignore_rules_anchoring():
+    """Test that patterns with a slash are anchored and others match at any depth."""
+    rules = IgnoreRules("", ["/root-only.yaml", "any.yaml", "docs/", "a/**/b.yaml"])
+
+    assert rules.match("root-only.yaml", False) is True
+    assert rules.match("x/root-only.yaml", False) is None
+    assert rules.match("x/y/any.yaml", False) is True
+    assert rules.match("x/docs", True) is True
+    assert rules.match("x/docs", False) is None
+    assert rules.match("a/b.yaml", False) is True
+    assert rules.match("a/x/y/b.yaml", False) is True
+
+
+def test_size_and_depth_limits(tmp_path):
+    """Test that oversized files and overly deep directories are skipped."""
+    _touch(tmp_path, "small.yaml")
+    _touch(tmp_path, "large.yaml", "x: " + "y" * 1000 + "\n")
+    _touch(tmp_path, "1/2/3/deep.yaml")
+
+    assert _walk(tmp_path, max_file_size=100) == ["small.yaml", "1/2/3/deep.yaml"]
+    assert _walk(tmp_path, max_depth=2) == ["large.yaml", "small.yaml"]
+
+
+def test_symlink_loops(tmp_path):
+    """Test that symlinked directories are followed once and loops terminate."""
+    _touch(tmp_path, "real/app.yaml")
+    try:
+        os.symlink(str(tmp_path), str(tmp_path / "real" / "loop"))
+        os.symlink(str(tmp_path / "real"), str(tmp_path / "alias"))
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks are not supported here")
+
+    # "alias" and "real" are the same directory, so its files are found once
+    assert _walk(tmp_path) == ["alias/app.yaml"]
+    assert _walk(tmp_path, follow_symlinks=False) == ["real/app.yaml"]
+
+
+def test_walk_is_lazy(tmp_path):
+    """Test that paths are yielded before the walk finishes."""
+    _touch(tmp_path, "a.yaml")
+    os.makedirs(tmp_path / "later")
+    walker = iter_yaml_files(str(tmp_path))
+    first = next(walker)
+
+    # Subdirectories are only read once the consumer gets that far
+    _touch(tmp_path, "later/b.yaml")
+    assert os.path.basename(first) == "a.yaml"
+    assert [os.path.basename(path) for path in walker] == ["b.yaml"]
@@ -0,0 +1,75 @@
+"""
+Tests for the YAML I/O layer.
+"""
+
+import yaml
+
+from kupa import yaml_io
+
+
+MANIFESTS = """\
+# A comment
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: web
+  labels: &labels
+    app: web
+    version: "1.0"
+  annotations:
+    description: "Ünïcode — text"
+    created: 2024-01-15
+spec:
+  replicas: 3
+  paused: false
+  selector:
+    matchLabels: *labels
+  template:
+    spec:
+      containers:
+      - name: web
+        image: nginx:1.25
+        args: ["--port", "8080"]
+        command: null
+        resources:
+          limits: {cpu: 0.5, memory: 128Mi}
+---
+---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: scripts
+data:
+  run.sh: |
+    #!/bin/sh
+    echo "hello"
+  port: '8080'
+  octal: 0o755
+  ratio: 1e3
+"""
+
+
+def test_load_matches_pure_python_loader():
+    """Test that loading gives the same documents as the pure-Python SafeLoader."""
+    expected = list(yaml.load_all(MANIFESTS, Loader=yaml.SafeLoader))
+
+    assert list(yaml_io.load_all(MANIFESTS)) == expected
+    assert yaml_io.load("a: [1, 2]\nb: yes\n") == yaml.load("a: [1, 2]\nb: yes\n", Loader=yaml.SafeLoader)
+
+
+def test_dump_matches_pure_python_dumper():
+    """Test that dumping gives the same text as the pure-Python SafeDumper."""
+    documents = list(yaml.load_all(MANIFESTS, Loader=yaml.SafeLoader))
+
+    for options in ({}, {"default_flow_style": False}, {"sort_keys": False, "allow_unicode": True}):
+        assert yaml_io.dump_all(documents, **options) == \
+            yaml.dump_all(documents, Dumper=yaml.SafeDumper, **options)
+        assert yaml_io.dump(documents[0], **options) == \
+            yaml.dump(documents[0], Dumper=yaml.SafeDumper, **options)
+
+
+def test_round_trip():
+    """Test that dumped documents load back unchanged."""
+    documents = list(yaml_io.load_all(MANIFESTS))
+
+    assert list(yaml_io.load_all(yaml_io.dump_all(documents, default_flow_style=False))) == documents